@@ -11,7 +11,7 @@ using the functions made available in its sub modules.
 At import you will be prompted to choose whether you want to run the master server on the development or on the
 experimental stage since that's the only two opened stages thus far.
 
-The two important variables here are 'master' which is a custom multi-threaded master tcp server based on python base
+The two important variables here are 'master' which is a custom asynchronous master tcp server based on python base
 modules and 'MVC' which is a simple version control system to make the master aware of which "version" is available and
 running.
 
@@ -23,16 +23,17 @@ probably be recycled and applied for other similar projects that use a master-se
 
     Dependencies:
 
-        bfassist <- master -> bfaversioncontrol
-            \
+        bfassist <- master ---> bfaversioncontrol
+            \               \-> league
              -> network -> master
 
 
         note::  Author(s): Mitch last-check: 08.07.2021 """
 
 from bfassist.master.bfaversioncontrol import MasterVersionControl
+from bfassist.master.league import ROUND_WRITER
 from bfassist.network import *
-from bfassist.network.master import BFA_ThreadedMasterTCPServer
+from bfassist.network.master import BFA_AsyncMasterTCPServer
 
 
 # noinspection PyUnusedLocal
@@ -74,13 +75,13 @@ try:
         MVC = MasterVersionControl(
             SVN_BASE_URL, DEVELOPMENT_STAGE, DEVELOPMENT_ACTIVE_BRANCH, DEVELOPMENT_ACTIVE_CLIENT_REVISION
         )
-        master = BFA_ThreadedMasterTCPServer(HOST, DEVELOPMENT_STAGE_PORT, pemchain=CERT)
+        master = BFA_AsyncMasterTCPServer(HOST, DEVELOPMENT_STAGE_PORT, pemchain=CERT)
 
     elif stage in EXPERIMENTAL_STAGE:
         MVC = MasterVersionControl(
             SVN_BASE_URL, EXPERIMENTAL_STAGE, EXPERIMENTAL_ACTIVE_BRANCH, EXPERIMENTAL_ACTIVE_CLIENT_REVISION
         )
-        master = BFA_ThreadedMasterTCPServer(HOST, EXPERIMENTAL_STAGE_PORT, pemchain=CERT)
+        master = BFA_AsyncMasterTCPServer(HOST, EXPERIMENTAL_STAGE_PORT, pemchain=CERT)
     else:
         pass
 except OSError:
@@ -90,4 +91,5 @@ except OSError:
 def main():
     global master
 
+    ROUND_WRITER.start()
     master.startup()
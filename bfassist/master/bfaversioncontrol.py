@@ -11,8 +11,10 @@
 
         bfassist <- (master.)bfaversioncontrol
             |
-            \-> bfa_logging
-             -> network -> updatethread
+            |-> bfa_logging
+            |-> network -> updatethread
+            |-> network -> merkle
+            \-> network -> master -> foldersignatures   @MasterVersionControl.createPackageSignature
 
         note::  Author(s): Mitch last-check: 08.07.2021 """
 
@@ -23,6 +25,7 @@ from pathlib import Path
 
 from bfassist.bfa_logging import log
 from bfassist.network.updatethread import UpdateThread
+from bfassist.network.merkle import MerkleTree
 
 
 # noinspection PyUnusedLocal
@@ -75,33 +78,34 @@ class MasterVersionControl:
     @staticmethod
     def createPackageSignature():
         """ Functions that's similar to the folder signature creation of the master baserequesthandler. However, this
-        function only considers python modules, so files that end with '.py'.
+        function only considers python modules, so files that end with '.py'. Digests are taken from the folder
+        signature cache of the master.
 
             :return:    Dictionary containing the package signature of the entire c7 branch.
 
                 note::  Author(s): Mitch """
 
-        from bfassist.references import shaForFile
+        from bfassist.network.master.foldersignatures import FOLDER_SIGNATURES
 
         signature = {}
         for cPath in Path('.').glob('**/*'):
             if not cPath.is_dir() and str(cPath).endswith('.py'):
-                signature[str(cPath)] = shaForFile(str(cPath))
+                signature[str(cPath)] = FOLDER_SIGNATURES.digest(str(cPath))
+        FOLDER_SIGNATURES.save()
         return signature
 
     def updateSignature(self, new: dict):
-        """ Function to compare two package signatures.
+        """ Function to compare two package signatures. Their merkle trees are compared so only directories with
+        changes are looked at.
 
             :param new: The new package signature.
 
+            :return:    List of the names of the modules that changed.
+
                 note::  Author(s): Mitch """
 
-        differences = []
-        for file in new:
-            if file in self.packageSignature and new[file] == self.packageSignature[file]:
-                pass
-            else:
-                differences += new[file][:-3].replace('/', '.')
+        differences = [file[:-3].replace('/', '.')
+                       for file in MerkleTree(new).changedFiles(MerkleTree(self.packageSignature))]
 
         if differences:
             self.packageSignature = new
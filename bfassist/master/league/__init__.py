@@ -13,8 +13,9 @@ Everything here is therefore quite BF focused.
         league ---> players
                 |-> teams
                 |-> seasons
-                \-> servers
-                 -> bflstatistics
+                |-> servers
+                |-> bflstatistics
+                \-> ingestion
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
@@ -23,6 +24,7 @@ from bfassist.master.league.teams import LeagueTeams, LeagueTeam
 from bfassist.master.league.seasons import *
 from bfassist.master.league.servers import *
 from bfassist.master.league.bflstatistics import LeagueRound, LeagueRounds, BfPlayerRound, BfPlayerRounds
+from bfassist.master.league.ingestion import ROUND_WRITER
 
 
 # noinspection PyUnusedLocal
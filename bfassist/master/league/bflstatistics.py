@@ -20,6 +20,7 @@ statistics.
 
 from datetime import datetime
 from os import listdir
+from sqlite3 import Cursor
 
 from bfassist.references.eventlogs import importEventLog, importLogs
 from bfassist.sql import *
@@ -37,7 +38,7 @@ def __postload__(forClient: bool = True):
     pass
 
 
-class BfPlayerRound(DBStorable, table="playerroundstats", live=False):
+class BfPlayerRound(DBStorable, table="playerroundstats", live=False, cacheSize=4096):
     """ A BfPlayerRound is supposed to correspond to the global bfa perspective of a player round on a bfa client.
 
         :param PlayerRoundId:       Identifier of the stats of this player in this particular round.
@@ -94,7 +95,7 @@ class BfPlayerRound(DBStorable, table="playerroundstats", live=False):
 BfPlayerRounds = BfPlayerRound.storageDict
 
 
-class LeagueRound(DBStorable, table="roundstats", live=False):
+class LeagueRound(DBStorable, table="roundstats", live=False, cacheSize=1024):
     """ A league round is supposed to correspond to a bf round that's adjusted to bf league purposes.
 
         :param server:          A global bfa server representation.
@@ -122,17 +123,16 @@ class LeagueRound(DBStorable, table="roundstats", live=False):
                  ServerId: str = None, ResultIds: set = None, SettingsId: int = None, RoundId: int = None,
                  server: dict = None, settings: dict = None, results: dict = None):
 
-        if server and server['Ip'] + ':' + server['GamePort'] in LeagueServers:
-            self.server = LeagueServers[server['Ip'] + ':' + server['GamePort']]
+        if server and server['ip'] + ':' + str(server['gamePort']) in LeagueServers:
+            self.server = LeagueServers[server['ip'] + ':' + str(server['gamePort'])]
             if self.server.getBFAName() != server['BFAName']:
                 self.server.setBFAName(server['BFAName'])
-            if self.server.getLocalUP() != server['LocalUP']:
-                self.server.setLocalUP(server['LocalUP'])
-            if self.server.getBinaryDigest() != server['binaries']['Digest']:
-                if server['binaries']['Digest'] in ServerBinaries:
-                    self.server.setBinaryDigest(ServerBinaries[server['binaries']['Digest']])
-                else:
-                    BfServerBinary.fromDict(server['binaries'])
+            if self.server.getLocalUP() != int(server['local_monitoring']):
+                self.server.setLocalUP(int(server['local_monitoring']))
+            if self.server.getBinaryDigest() != server['dynamicExecutable']['Digest']:
+                if server['dynamicExecutable']['Digest'] not in ServerBinaries:
+                    BfServerBinary.fromDict(server['dynamicExecutable'])
+                self.server.setBinaryDigest(server['dynamicExecutable']['Digest'])
         else:
             self.server = BfServer.fromDict(server)
 
@@ -186,7 +186,8 @@ class LeagueRound(DBStorable, table="roundstats", live=False):
 
     @staticmethod
     def filterLogs():
-        """ Function that filters the stored logs to exclude obviously faulty ones.
+        """ Function that filters the stored logs to exclude obviously faulty ones. All rounds are checked at once with
+        a single aggregate query over the player rounds and the faulty ones are deleted in one batch.
 
         Filter conditions:
         (0)     If there were no livePlayers it is faulty.
@@ -198,23 +199,58 @@ class LeagueRound(DBStorable, table="roundstats", live=False):
         (4)     If there were less than 6 livePlayers on one side or less than 12 livePlayers in total then it should be
                 faulty.
 
+            :return:    Report of the deleted rounds as dictionary with the number of the filter condition that applied
+                        as keys and lists of the ids of the deleted rounds as values.
+
                 note::  Author(s): Mitch """
 
-        for leagueRound in LeagueRound.storageDict:
-            if leagueRound.getResultIds() != {''}:
-                if leagueRound.getDuration() < 180:
-                    leagueRound.delete()
-                elif leagueRound.getTicketsAllies() + leagueRound.getTicketsAxis() > 400 - 50:
-                    leagueRound.delete()
-                elif leagueRound.getScoreAllies() < 0 or leagueRound.getScoreAxis() < 0 or \
-                        leagueRound.getNumberOfNegativeScoresAllies() > 2 or \
-                        leagueRound.getNumberOfNegativeScoresAxis() > 2:
-                    leagueRound.delete()
-                elif leagueRound.countAllies() < 6 or leagueRound.countAxis() < 6 or \
-                        leagueRound.countAxis() + leagueRound.countAllies() < 12:
-                    leagueRound.delete()
-            else:
-                leagueRound.delete()
+        rounds = LeagueRound.storageDict
+        playerRounds = BfPlayerRound.storageDict
+
+        ret = rounds.connections.read(
+            "SELECT r.RoundId, r.ResultIds, (julianday(r.End) - julianday(r.Start)) * 86400, "
+            "r.TicketsAllies + r.TicketsAxis, IFNULL(p.ScoreAllies, 0), IFNULL(p.ScoreAxis, 0), "
+            "IFNULL(p.NegativeAllies, 0), IFNULL(p.NegativeAxis, 0), IFNULL(p.Allies, 0), IFNULL(p.Axis, 0) "
+            "FROM " + rounds.table + " AS r LEFT JOIN ("
+            "SELECT RoundId, "
+            "TOTAL(CASE WHEN TeamAtEnd = 2 THEN Score END) AS ScoreAllies, "
+            "TOTAL(CASE WHEN TeamAtEnd = 1 THEN Score END) AS ScoreAxis, "
+            "SUM(TeamAtEnd = 2 AND Score < 0) AS NegativeAllies, "
+            "SUM(TeamAtEnd = 1 AND Score < 0) AS NegativeAxis, "
+            "SUM(TeamAtEnd = 2) AS Allies, "
+            "SUM(TeamAtEnd = 1) AS Axis "
+            "FROM " + playerRounds.table + " GROUP BY RoundId) AS p ON p.RoundId = r.RoundId")
+
+        report = {rule: [] for rule in range(5)}
+        for RoundId, ResultIds, duration, tickets, scoreAllies, scoreAxis, negativeAllies, negativeAxis, allies, axis \
+                in ret:
+            if not ResultIds:
+                report[0].append(RoundId)
+            elif duration is not None and duration < 180:
+                report[1].append(RoundId)
+            elif tickets is not None and tickets > 400 - 50:
+                report[2].append(RoundId)
+            elif scoreAllies < 0 or scoreAxis < 0 or negativeAllies > 2 or negativeAxis > 2:
+                report[3].append(RoundId)
+            elif allies < 6 or axis < 6 or allies + axis < 12:
+                report[4].append(RoundId)
+
+        faulty = [(RoundId,) for rule in report for RoundId in report[rule]]
+        if faulty:
+            def deleteFaulty(cursor: Cursor):
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS faultyrounds (RoundId INTEGER PRIMARY KEY)")
+                cursor.execute("DELETE FROM faultyrounds")
+                cursor.executemany("INSERT INTO faultyrounds VALUES (?)", faulty)
+                cursor.execute("DELETE FROM " + playerRounds.table + " WHERE RoundId IN (SELECT RoundId FROM "
+                               "faultyrounds)")
+                cursor.execute("DELETE FROM " + rounds.table + " WHERE RoundId IN (SELECT RoundId FROM faultyrounds)")
+                cursor.execute("DROP TABLE faultyrounds")
+
+            rounds.connections.execute(deleteFaulty)
+            rounds.cache.clear()
+            playerRounds.cache.clear()
+
+        return report
 
     def delete(self):
         """ Function that overrides the delete function and deletes a league round as well as the bf player rounds
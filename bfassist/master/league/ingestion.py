@@ -0,0 +1,246 @@
+#############################################################################
+#
+#
+#   Ingestion Module to BFA c7 Master League
+#
+#
+#############################################################################
+""" This module provides the ingestion pipeline for the league rounds the clients send to the master. A round is
+validated and appended to a durable spool on disk, after which the client can be acknowledged right away. A background
+writer reads the spool in batches, drops rounds that are stored already and inserts the rounds of a batch and their
+player rounds in large transactions. Servers and server settings are looked up or created while the rounds are built.
+
+The spool is a journal of json lines. The offset up to which it was written to the database is committed after every
+batch, so rounds that weren't written when the master stopped are written after the next start.
+A round is identified by the address of its server and its start, so rounds that are spooled twice, e.g. because a
+client sent a round again after it didn't receive an acknowledgement, are stored once.
+
+    Dependencies:
+
+        league <- ingestion
+            |
+            |-> bflstatistics
+            |-> bfa_logging
+            \-> network -> journal
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+from datetime import datetime
+from threading import Thread, Event
+
+from bfassist.master.league.bflstatistics import LeagueRound, LeagueRounds, BfPlayerRound, BfPlayerRounds
+from bfassist.network.journal import Journal
+from bfassist.bfa_logging import log
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+ROUND_KEYS = ('Start', 'End', 'Winner', 'VType', 'TicketsAxis', 'TicketsAllies', 'server', 'settings', 'results')
+SERVER_KEYS = ('ip', 'gamePort', 'BFAName', 'dynamicExecutable', 'local_monitoring', 'hasHenkPatch')
+PLAYER_ROUND_KEYS = ('PlayerId', 'Keyhash', 'NameAtEnd', 'IsAi', 'TeamAtEnd', 'Score', 'Kills', 'Deaths', 'TeamKills',
+                     'Captures', 'Attacks', 'Defences', 'Objectives', 'ObjectiveTeamKills')
+
+
+def validateRound(roundDict: dict):
+    """ Function that validates a round sent by a client and brings its results into the form the master stores. A
+    player that was part of the round several times, e.g. after reconnecting, has a list of results, every one of them
+    is kept under a key of its own.
+
+        :param roundDict:   The round as dictionary.
+
+        :return:            The validated round as dictionary.
+
+        :raises ValueError: If the round is incomplete or malformed.
+
+            note::  Author(s): Mitch """
+
+    if not isinstance(roundDict, dict):
+        raise ValueError("A round has to be a dictionary.")
+    missing = [key for key in ROUND_KEYS if key not in roundDict]
+    if missing:
+        raise ValueError("The round is missing " + ', '.join(missing) + ".")
+
+    for key in ('Start', 'End'):
+        try:
+            datetime.strptime(roundDict[key], DATETIME_FORMAT)
+        except (TypeError, ValueError):
+            raise ValueError("The " + key + " of the round isn't a datetime: " + repr(roundDict[key]))
+
+    server = roundDict['server']
+    if not isinstance(server, dict) or any(key not in server for key in SERVER_KEYS):
+        raise ValueError("The server of the round is incomplete.")
+    if not isinstance(server['dynamicExecutable'], dict):
+        raise ValueError("The binary of the server of the round is unknown.")
+    if not isinstance(roundDict['settings'], dict):
+        raise ValueError("The settings of the round are missing.")
+    if not isinstance(roundDict['results'], dict):
+        raise ValueError("The results of the round have to be a dictionary.")
+
+    results = {}
+    for player_id, result in roundDict['results'].items():
+        playerRounds = result if isinstance(result, list) else [result]
+        for n, playerRound in enumerate(playerRounds):
+            if not isinstance(playerRound, dict) or any(key not in playerRound for key in PLAYER_ROUND_KEYS):
+                raise ValueError("The result of player " + str(player_id) + " is incomplete.")
+            results[str(player_id) + ('.' + str(n) if n else '')] = playerRound
+
+    return dict(roundDict, results=results)
+
+
+def roundIdentity(roundDict: dict):
+    """ Simple function to get the identity of a round, i.e. the address of its server and its start.
+
+        :param roundDict:   The round as dictionary.
+
+        :return:            Tuple of the address and the start as datetime.
+
+            note::  Author(s): Mitch """
+
+    return (roundDict['server']['ip'] + ':' + str(roundDict['server']['gamePort']),
+            datetime.strptime(roundDict['Start'], DATETIME_FORMAT))
+
+
+class LeagueRoundWriter(Thread):
+    """ Thread writing the spooled rounds to the database in batches.
+
+        :param spool:       The spool to write from.
+        :param batchSize:   The maximum number of rounds written in one batch.
+        :param interval:    Seconds the writer waits for new rounds before it checks the spool anyway.
+        :param wakeEvent:   Event that is set when a round was spooled.
+        :param stopEvent:   Event that is set to stop writing.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, spool: Journal, batchSize: int = 256, interval: float = 5., wakeEvent: Event = None,
+                 stopEvent: Event = None):
+
+        super().__init__(daemon=True, name='BFA-League-Rounds')
+        self.spool = spool
+        self.batchSize = batchSize
+        self.interval = interval
+        if wakeEvent:
+            self.wakeEvent = wakeEvent
+        else:
+            self.wakeEvent = Event()
+        if stopEvent:
+            self.stopEvent = stopEvent
+        else:
+            self.stopEvent = Event()
+
+    def spoolRound(self, roundDict: dict):
+        """ Validates a round, appends it to the spool and wakes the writer.
+
+            :param roundDict:   The round as dictionary.
+
+            :return:            True if the round was spooled, False if it's invalid.
+
+                note::  Author(s): Mitch """
+
+        try:
+            roundDict = validateRound(roundDict)
+        except ValueError as error:
+            log("Rejecting a league round: " + str(error), 2)
+            return False
+
+        self.spool.append(roundDict)
+        self.wakeEvent.set()
+        return True
+
+    def run(self):
+        """ Writes the spooled rounds until the writer is stopped. Rounds spooled before the writer started are written
+        first.
+
+                note::  Author(s): Mitch """
+
+        while not self.stopEvent.is_set():
+            self.drain()
+            self.wakeEvent.wait(self.interval)
+            self.wakeEvent.clear()
+        self.drain()
+
+    def drain(self):
+        """ Writes batches from the spool until it's empty.
+
+                note::  Author(s): Mitch """
+
+        while True:
+            rounds, offset = self.spool.read(self.batchSize)
+            if offset == self.spool.offset:
+                return
+            try:
+                self.writeRounds(rounds)
+            except Exception as error:
+                log("Writing a batch of " + str(len(rounds)) + " league rounds failed, writing them one by one: " +
+                    repr(error), 3)
+                for roundDict in rounds:
+                    try:
+                        self.writeRounds([roundDict])
+                    except Exception as roundError:
+                        log("Dropping the league round " + str(roundIdentity(roundDict)) + ": " + repr(roundError), 3)
+            self.spool.commit(offset)
+
+    @staticmethod
+    def writeRounds(rounds: list):
+        """ Writes rounds that aren't stored yet to the database. The rounds are inserted in one transaction and their
+        player rounds in the same one right after them.
+
+            :param rounds:  List of the validated rounds as dictionaries.
+
+            :return:        The number of rounds written.
+
+                note::  Author(s): Mitch """
+
+        fresh, identities = [], set()
+        for roundDict in rounds:
+            identity = roundIdentity(roundDict)
+            if identity in identities or LeagueRounds.connections.read(
+                    "SELECT 1 FROM " + LeagueRounds.table + " WHERE ServerId=? AND Start=? LIMIT 1", identity):
+                continue
+            identities.add(identity)
+            fresh.append(roundDict)
+        if not fresh:
+            return 0
+
+        leagueRounds = []
+
+        # noinspection PyUnusedLocal
+        def insertResults(cursor):
+            BfPlayerRounds.deferInserts()
+            try:
+                for leagueRound, results in leagueRounds:
+                    leagueRound.results = {
+                        key: BfPlayerRound.fromDict(dict(result, RoundId=leagueRound.getRoundId()))
+                        for key, result in results.items()}
+            finally:
+                BfPlayerRounds.insertDeferred()
+            for leagueRound, results in leagueRounds:
+                leagueRound.setResultIds(set(str(result.getPlayerRoundId())
+                                             for result in leagueRound.results.values()))
+
+        LeagueRounds.deferInserts()
+        try:
+            for roundDict in fresh:
+                leagueRounds.append((LeagueRound.fromDict(dict(roundDict, results=None)), roundDict['results']))
+        finally:
+            LeagueRounds.insertDeferred(insertResults)
+        return len(fresh)
+
+    def stop(self):
+        """ Stops writing after the spool was drained.
+
+                note::  Author(s): Mitch """
+
+        self.stopEvent.set()
+        self.wakeEvent.set()
+
+
+ROUND_WRITER = LeagueRoundWriter(Journal('bfassist/master/league/rounds.spool'))
@@ -17,6 +17,7 @@ players.
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
+from sqlite3 import Cursor
 
 from bfassist.sql import *
 
@@ -42,11 +43,15 @@ class LeaguePlayer(DBStorable, table='players', live=False):
         :param Team:        League team name of the player.
         :param Nomination:  League team name the player nominates.
 
+        :param insert:      Flag if the player should be inserted to the database right away.
+
             note::  Author(s): Mitch """
 
     def __init__(self, Keyhash: str, Alias: str, Aliases: set, Ips: set,
 
-                 Team: str = "", Nomination: str = ""):
+                 Team: str = "", Nomination: str = "",
+
+                 insert: bool = True):
         self.SKeyhash = Keyhash, VARCHAR(32), PRIMARY_KEY
         self.SAlias = Alias, VARCHAR(32)
         self.SAliases = Aliases, MEDIUMTEXT
@@ -54,7 +59,8 @@ class LeaguePlayer(DBStorable, table='players', live=False):
         self.STeam = Team, VARCHAR(32)
         self.SNomination = Nomination, VARCHAR(32)
 
-        self.insertToDB()
+        if insert:
+            self.insertToDB()
 
     def addAlias(self, inAlias: str):
         """ Function to add an alias to the set of aliases(including database update).
@@ -64,14 +70,9 @@ class LeaguePlayer(DBStorable, table='players', live=False):
                 note::  Author(s) : Mitch """
 
         self.getAliases().add(inAlias)
-        try:
-            self.__class__.storageDict.dbLock.acquire(True)
-            self.__class__.storageDict.db.execute("UPDATE players SET Aliases=? WHERE Keyhash=?",
-                                                  (";".join([x.replace(';', '\\&r01') for x in self.getAliases()]),
-                                                   self.getKeyhash(),))
-            self.__class__.storageDict.bfaSQLdatabase.commit()
-        finally:
-            self.__class__.storageDict.dbLock.release()
+        self.__class__.storageDict.connections.write("UPDATE players SET Aliases=? WHERE Keyhash=?",
+                                                     (";".join([x.replace(';', '\\&r01') for x in self.getAliases()]),
+                                                      self.getKeyhash(),))
 
     def addIp(self, inIp: str):
         """ Function to add an ip to the set of ips(including database update).
@@ -81,13 +82,8 @@ class LeaguePlayer(DBStorable, table='players', live=False):
                 note::  Author(s) : Mitch """
 
         self.getIps().add(inIp)
-        try:
-            self.__class__.storageDict.dbLock.acquire(True)
-            self.__class__.storageDict.db.execute("UPDATE players SET Ips=? WHERE Keyhash=?",
-                                                  (";".join(self.getIps()), self.getKeyhash(),))
-            self.__class__.storageDict.bfaSQLdatabase.commit()
-        finally:
-            self.__class__.storageDict.dbLock.release()
+        self.__class__.storageDict.connections.write("UPDATE players SET Ips=? WHERE Keyhash=?",
+                                                     (";".join(self.getIps()), self.getKeyhash(),))
 
     def __str__(self):
         return self.toString()
@@ -129,6 +125,77 @@ class LeaguePlayer(DBStorable, table='players', live=False):
         else:
             return False
 
+    @classmethod
+    def mergeMany(cls, records: list):
+        """ Function that merges player records synchronised by a client into the stored players. The aliases and ips
+        of known players are united with the ones of the records, unknown players are created. All players are written
+        in a single transaction and the known ones are read and updated set-based through temporary tables.
+
+            :param records:     List of player records as dictionaries containing the keyhash, current alias and lists
+                                of the aliases and ips of a player.
+
+            :return:            The number of players that were created or changed.
+
+            :raises ValueError: If a record is malformed.
+
+                note::  Author(s): Mitch """
+
+        for record in records:
+            if not isinstance(record, dict) or not isinstance(record.get('Keyhash'), str) or \
+                    not isinstance(record.get('Alias'), str) or not isinstance(record.get('Aliases'), list) or \
+                    not isinstance(record.get('Ips'), list):
+                raise ValueError("Malformed player record: " + repr(record))
+
+        players = cls.storageDict
+        players.flush()
+        reader = players.connections.getReader()
+        try:
+            reader.execute("CREATE TEMP TABLE IF NOT EXISTS playerkeys (Keyhash VARCHAR(32) PRIMARY KEY)")
+            reader.executemany("INSERT OR IGNORE INTO playerkeys VALUES (?)",
+                               [(record['Keyhash'],) for record in records])
+            known = {player.getKeyhash(): player for player in map(players.elementFromRow, reader.execute(
+                "SELECT * FROM " + players.table + " WHERE Keyhash IN (SELECT Keyhash FROM playerkeys)").fetchall())}
+        finally:
+            reader.rollback()
+
+        changes, created = {}, []
+        for record in records:
+            player = known.get(record['Keyhash'])
+            if player is None:
+                created.append(record)
+                continue
+            aliases = set(player.getAliases() or ()) | set(record['Aliases'])
+            ips = set(player.getIps() or ()) | set(record['Ips'])
+            if record['Alias'] != player.getAlias() or aliases != set(player.getAliases() or ()) or \
+                    ips != set(player.getIps() or ()):
+                changes[player.getKeyhash()] = player, record['Alias'], aliases, ips
+
+        # noinspection PyUnusedLocal
+        def updateKnown(cursor: Cursor):
+            if not changes:
+                return
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS playersync (Keyhash VARCHAR(32) PRIMARY KEY, "
+                           "Alias VARCHAR(32), Aliases MEDIUMTEXT, Ips TEXT)")
+            cursor.execute("DELETE FROM playersync")
+            cursor.executemany("INSERT INTO playersync VALUES (?, ?, ?, ?)",
+                               [(Keyhash, Alias, pySetToSQL(aliases), pySetToSQL(ips))
+                                for Keyhash, (player, Alias, aliases, ips) in changes.items()])
+            cursor.execute("UPDATE " + players.table + " SET (Alias, Aliases, Ips) = (SELECT Alias, Aliases, Ips FROM "
+                           "playersync WHERE playersync.Keyhash = " + players.table + ".Keyhash) WHERE Keyhash IN "
+                           "(SELECT Keyhash FROM playersync)")
+            cursor.execute("DROP TABLE playersync")
+
+        players.insertMany([cls(Keyhash=record['Keyhash'], Alias=record['Alias'], Aliases=set(record['Aliases']),
+                                Ips=set(record['Ips']), insert=False)
+                            for record in {record['Keyhash']: record for record in created}.values()], updateKnown)
+
+        for player, Alias, aliases, ips in changes.values():
+            player.__setattr__('__Alias', Alias)
+            player.__setattr__('__Aliases', aliases)
+            player.__setattr__('__Ips', ips)
+
+        return len(changes) + len({record['Keyhash'] for record in created})
+
     @classmethod
     def fromDict(cls, playerDict: dict):
         from bfassist.master.league import CURRENT_SEASON
@@ -263,7 +263,7 @@ class BfServer(DBStorable, table="bfservers", live=False):
     @classmethod
     def fromDict(cls, serverDict: dict):
         if serverDict:
-            return cls(Address=serverDict['ip'] + ':' + serverDict['gamePort'], BFAName=serverDict['BFAName'],
+            return cls(Address=serverDict['ip'] + ':' + str(serverDict['gamePort']), BFAName=serverDict['BFAName'],
                        binaries=serverDict['dynamicExecutable'], LocalUP=int(serverDict['local_monitoring']),
                        hasHenkPatch=serverDict['hasHenkPatch'])
         else:
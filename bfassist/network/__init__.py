@@ -33,6 +33,21 @@ functionality for that. Connection/disconnecting, sending/receiving strings, jso
 comparison of unique file-/folder-signatures using the sha256 from hashlib. The specific function for generating the sha
 of a file can be found in the references package.
 
+Messages between client and master are framed by the 'framing' module. Every message carries a header with its type and
+length, so neither side has to wait for a timeout to find out that a transmission ended and files can be streamed in
+chunks. Connections start with a short version handshake and both sides fall back to the old unframed protocol when
+talking to an older counterpart. Clients speaking the session protocol keep their connection to the master open between
+remote calls and resume the TLS session when reconnecting. The master issues a session token for the client signature,
+so the signature is only sent again when it changed or the master forgot about the session, e.g. after a restart.
+Functions registered in the 'batch_requests' of the request handler can also be called in batches, which sends several
+calls and receives all of their results in a single exchange.
+
+Clients speaking the framed protocol find out which files they need to update by comparing merkle trees of the full
+folder signature with the master, see the 'merkle' module. Only directories whose hashes differ are exchanged, so a poll
+without any changes on either side only compares the root hashes. The files themselves are then transferred compressed
+and, for files the client already has an older copy of, as a delta of only the blocks that changed, see the 'delta'
+module.
+
 At connection start the client transfers its network config to the server. Sadly the way the interaction with the config
 is done currently is very clunky and a bit ugly. Technically this deserves an own module and should be noted as a
 todo:: for the not so far future.
@@ -50,6 +65,9 @@ or not.
     Dependencies:
 
         network ------> updatethread
+            |       |-> framing
+            |       |-> merkle
+            |       |-> journal
             |       \-> client  (if configured as client) @startup
             |        -> master  (if configured as master) @startup
             \-> standalone      (if configured as client) @startup
@@ -13,6 +13,8 @@ corresponding server file are used to keep associated client and server function
         bfassist <- (network.client.)baseclient
             |
             |-> network
+            |-> network -> framing
+            |-> network -> merkle
             |-> bfa_logging
             |-> references
             \-> network -> client   @BFABaseClient.connect
@@ -21,13 +23,18 @@ corresponding server file are used to keep associated client and server function
         note::  Author(s): Mitch last-check: 09.07.2021 """
 
 import json
+from hashlib import sha256
 from pathlib import Path
 from time import sleep
 from socket import socket, AF_INET, SOCK_STREAM, SHUT_RDWR, timeout
-from ssl import wrap_socket
+from ssl import SSLContext, SSLSession, SSLEOFError, PROTOCOL_TLS_CLIENT, CERT_NONE
+from os import replace, remove
 from os.path import exists
 
 from bfassist.network import CONFIG
+import bfassist.network.framing as framing
+from bfassist.network.merkle import MerkleTree, joinPath
+from bfassist.network.delta import CODECS, ChunkReader, matchBlocks, missingRanges, decompressChunks, rebuildFile
 from bfassist.bfa_logging import log
 from bfassist.references import shaForFile
 
@@ -70,41 +77,74 @@ class BFABaseClient:
 
         :param client_socket:   Socket the client uses for communication, encrypted with TLS encryption.
         :param connected:       Flag if currently connected to the master.
+        :param protocolVersion: The protocol version agreed on with the master. None until the first handshake.
+        :param tlsContext:      The TLS context used for all connections to the master.
+        :param tlsSession:      The TLS session of the last connection to the master that can be resumed.
+        :param sessionToken:    Token of the session the master issued to this client.
+        :param signatureHash:   Hash of the client signature the master knows for the session of this client.
+        :param knownFiles:      Set of the files the master had in its full folder signature during the last update.
+        :param lastRevision:    The revision of the master as of the last complete update.
 
             note:: Author(s): Mitch """
 
-    def __init__(self, client_socket: socket = None, connected=False):
+    def __init__(self, client_socket: socket = None, connected=False, protocolVersion: int = None,
+                 tlsContext: SSLContext = None, tlsSession: SSLSession = None, sessionToken: str = None,
+                 signatureHash: str = None, knownFiles: set = None, lastRevision: dict = None):
 
+        if tlsContext:
+            self.tlsContext = tlsContext
+        else:
+            self.tlsContext = SSLContext(PROTOCOL_TLS_CLIENT)
+            self.tlsContext.check_hostname = False
+            self.tlsContext.verify_mode = CERT_NONE
         if client_socket:
             self.clientSocket = client_socket
         else:
             self.clientSocket = socket(AF_INET, SOCK_STREAM)
-        self.clientSocket = wrap_socket(self.clientSocket, server_side=False)
+        self.clientSocket = self.tlsContext.wrap_socket(self.clientSocket, server_side=False)
         self.connected = connected
+        self.protocolVersion = protocolVersion
+        self.tlsSession = tlsSession
+        self.sessionToken = sessionToken
+        self.signatureHash = signatureHash
+        if knownFiles:
+            self.knownFiles = knownFiles
+        else:
+            self.knownFiles = set()
+        self.lastRevision = lastRevision
+
+    def connect(self, attempts: int = 3):
+        """ Simple function to connect to the master. Resumes the TLS session of the last connection if possible. A
+        refused connection is tried again after a growing delay until the attempts are used up.
 
-    def connect(self):
-        """ Simple function to connect to the master.
+            :param attempts:    The maximum number of attempts to connect.
 
                 note:: Author(s): Mitch """
 
         from bfassist.network.client import BFA_MASTER_IP, BFA_MASTER_PORT
 
-        try:
-            self.clientSocket = socket(AF_INET, SOCK_STREAM)
-            self.clientSocket = wrap_socket(self.clientSocket, server_side=False)
-            self.clientSocket.connect((BFA_MASTER_IP, BFA_MASTER_PORT))
-            self.connected = True
+        for attempt in range(attempts):
+            try:
+                self.clientSocket = socket(AF_INET, SOCK_STREAM)
+                self.clientSocket = self.tlsContext.wrap_socket(self.clientSocket, server_side=False,
+                                                                session=self.tlsSession)
+                self.clientSocket.connect((BFA_MASTER_IP, BFA_MASTER_PORT))
+                self.connected = True
+                self.handshake()
+                return
+
+            except ConnectionRefusedError:
+                self.disconnect()
+                if attempt + 1 < attempts:
+                    sleep(2 ** attempt)
 
-        except ConnectionRefusedError:
-            sleep(1)
-            self.disconnect()
-            sleep(1)
-            self.connect()
+            except OSError:
+                sleep(1)
+                self.disconnect()
+                log("Required network is unavailable.", 3)
+                return
 
-        except OSError:
-            sleep(1)
-            self.disconnect()
-            log("Required network is unavailable.", 3)
+        log("The master refused the connection " + str(attempts) + " times.", 3)
 
     def disconnect(self):
         """ Simple function to disconnect from the master.
@@ -122,23 +162,43 @@ class BFABaseClient:
         """ Function to send a dictionary containing some information about this client. In particular:
         The stage, branch and revision installed on this client, if the league extensions are active and the global
         dictionary representations/signatures of the managed servers if there are any.
+        With a persistent session the signature is only sent when the master doesn't know it yet, otherwise the session
+        token and the hash of the signature are enough.
 
             note::  Author(s): Mitch """
         from bfassist.standalone import KERN
 
-        self.sendAsJSON({'CONFIG': CONFIG, 'SERVERS': KERN.getServerSignatures()})
+        signature = {'CONFIG': CONFIG, 'SERVERS': KERN.getServerSignatures()}
+        if not self.isPersistent():
+            self.sendAsJSON(signature)
+            if self.getResponse() == "Success: Client signature received.":
+                return
+            raise ConnectionError("Transmission of client signature failed.")
+
+        signatureHash = sha256(bytes(json.dumps(signature, sort_keys=True), 'utf-8')).hexdigest()
+        if self.sessionToken and signatureHash == self.signatureHash:
+            self.sendAsJSON({'SESSION': self.sessionToken, 'SIGNATURE': signatureHash})
+            if self.getResponse() == "Success: Client signature received.":
+                return
+
+        signature.update({'SESSION': self.sessionToken, 'SIGNATURE': signatureHash})
+        self.sendAsJSON(signature)
         if self.getResponse() == "Success: Client signature received.":
-            pass
+            self.sessionToken = self.getResponse()
+            self.signatureHash = signatureHash
         else:
             raise ConnectionError("Transmission of client signature failed.")
 
-    def declareRemoteCall(self, rfName: str, failure: str = ""):
-        """ Used to declare a remote call of a function on the bfa master.
+    #
+    def declareRemoteCall(self, rfName: str, failure: str = "", reconnect: bool = True):
+        """ Used to declare a remote call of a function on the bfa master. Reuses the connection of a persistent
+        session and reconnects once if the master closed it in the meantime.
 
-            :param rfName:  The name of the function to call on the bfa master.
-            :param failure: Log message in case of failure.
+            :param rfName:      The name of the function to call on the bfa master.
+            :param failure:     Log message in case of failure.
+            :param reconnect:   Flag if a broken connection should be reestablished to retry the call.
 
-            :return:        True if processed as expected, false otherwise.
+            :return:            True if processed as expected, false otherwise.
 
                 note::  Author(s): Mitch """
 
@@ -152,17 +212,125 @@ class BFABaseClient:
                 log(failure + "(TIMEOUT)", 3)
                 self.disconnect()
                 return False
-            except BrokenPipeError:
-                self.connected = False
+            except (BrokenPipeError, ConnectionResetError, SSLEOFError):
+                self.disconnect()
+                if not reconnect:
+                    log(failure + "(CONNECTION LOST)", 3)
+                    return False
                 self.connect()
-                return self.declareRemoteCall(rfName, failure)
+                return self.declareRemoteCall(rfName, failure, False)
             except ConnectionError:
                 log("Transmission of client signature failed!", 4)
                 self.disconnect()
                 return False
         else:
             self.connect()
-            return self.declareRemoteCall(rfName, failure)
+            if not self.connected:
+                return False
+            return self.declareRemoteCall(rfName, failure, False)
+
+    def finishRemoteCall(self):
+        """ Simple function to end a remote call. The connection stays open for the next call if the master keeps a
+        persistent session for this client.
+
+                note::  Author(s): Mitch """
+
+        if not self.isPersistent():
+            self.disconnect()
+
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+
+    def handshake(self):
+        """ Simple function to agree on the protocol version with the master. If the master doesn't answer the
+        handshake it only understands the legacy protocol, so the client reconnects and sticks with that.
+
+                note:: Author(s): Mitch """
+
+        if self.protocolVersion == framing.LEGACY_PROTOCOL_VERSION:
+            return
+
+        self.clientSocket.settimeout(5)
+        self.clientSocket.sendall(framing.handshakeBytes())
+        try:
+            version = framing.parseHandshake(framing.receiveExactly(self.clientSocket, len(framing.handshakeBytes())))
+        except OSError:
+            version = None
+
+        if version is None:
+            log("Master doesn't support the framed protocol. Falling back to the legacy protocol.", 2)
+            self.protocolVersion = framing.LEGACY_PROTOCOL_VERSION
+            self.disconnect()
+            self.connect()
+        else:
+            self.protocolVersion = version
+            self.tlsSession = self.clientSocket.session
+
+    def isFramed(self):
+        """ Simple function to check if messages are exchanged with the framed protocol.
+
+            :return:    True if the framed protocol is used, false for the legacy protocol.
+
+                note:: Author(s): Mitch """
+
+        return self.protocolVersion is not None and self.protocolVersion > framing.LEGACY_PROTOCOL_VERSION
+
+    def isPersistent(self):
+        """ Simple function to check if the connection is kept open for more than one remote call.
+
+            :return:    True if the master keeps a persistent session, false otherwise.
+
+                note:: Author(s): Mitch """
+
+        return self.protocolVersion is not None and self.protocolVersion >= framing.SESSION_PROTOCOL_VERSION
 
     def getResponse(self):
         """ Simple function to get a response. Assumes end of transmission when data wasn't received for more than 3
@@ -172,6 +340,9 @@ class BFABaseClient:
 
                 note::  Author(s): Mitch """
 
+        if self.isFramed():
+            return framing.receiveString(self.clientSocket)
+
         response = str(self.clientSocket.recv(1024), 'utf-8')
         timeOut = 3
         while response == '' and timeOut > 0:
@@ -181,13 +352,17 @@ class BFABaseClient:
 
         return response
 
+    #
     def getRestOfResponse(self):
         """ Simple function to receive the rest of a response.
 
-            :return:    Rest of the response.
+            :return:    Rest of the response. Always empty with the framed protocol.
 
                 note::  Author(s): Mitch """
 
+        if self.isFramed():
+            return ""
+
         response = ""
         rPart = ""
         self.clientSocket.settimeout(.5)
@@ -209,7 +384,10 @@ class BFABaseClient:
 
                 note::  Author(s): Mitch """
 
-        self.clientSocket.sendall(bytes(s, 'utf-8'))
+        if self.isFramed():
+            framing.sendString(self.clientSocket, s)
+        else:
+            self.clientSocket.sendall(bytes(s, 'utf-8'))
 
     def sendAsJSON(self, message):
         """ Simple function to transmit a message via json in utf-8 encoding given that it's json-encodable.
@@ -218,6 +396,9 @@ class BFABaseClient:
 
                 note::  Author(s): Mitch """
 
+        if self.isFramed():
+            framing.sendJSON(self.clientSocket, message)
+            return
         if isinstance(message, set):
             message = list(message)
         self.clientSocket.sendall(bytes(json.dumps(message), 'utf-8'))
@@ -229,8 +410,8 @@ class BFABaseClient:
 
                 note::  Author(s): Mitch """
 
-        data = self.getRequest()
-        data += self.getRestOfRequest()
+        data = self.getResponse()
+        data += self.getRestOfResponse()
         try:
             return json.loads(data)
         except json.JSONDecodeError as e:
@@ -253,14 +434,14 @@ class BFABaseClient:
             if success:
 
                 log(success, 1)
-            self.disconnect()
+            self.finishRemoteCall()
             return True
 
         else:
             if failure:
 
                 log(failure, 3)
-            self.disconnect()
+            self.finishRemoteCall()
             return False
 
     @staticmethod
@@ -285,21 +466,107 @@ class BFABaseClient:
 
     def calculateDifferences(self):
         """ This function calculates the difference of the global master client files with the one found on this local
-        client.
+        client. Masters speaking the framed protocol are compared by merkle tree.
 
             :return:    A list of all files/directories that are out of date with the global master client files.
 
                 note:: Author(s): Mitch """
 
+        if not self.connected:
+            self.connect()
+        if self.isFramed():
+            return self.calculateTreeDifferences()
+
         if not self.declareRemoteCall('calculateDifferences'):
             return False
 
         response = self.getResponse()
         response += self.getRestOfResponse()
-        self.disconnect()
+        self.finishRemoteCall()
         serverside = json.loads(response)
         return self.compareClientWith(serverside)
 
+    def calculateTreeDifferences(self):
+        """ This function calculates the difference of the global master client files with the one found on this local
+        client by comparing merkle trees. The local tree is built from the files the master had during the last update,
+        so starting at the root only directories whose hashes differ are listed by the master.
+
+            :return:    A set of all files that are out of date with the global master client files.
+
+                note:: Author(s): Mitch """
+
+        local = {}
+        for file in self.knownFiles:
+            local[file] = shaForFile(file) if Path(file).is_file() else None
+        localTree = MerkleTree(local)
+
+        if not self.declareRemoteCall('calculateTreeDifferences'):
+            return False
+
+        differences = set()
+        directories = {'': localTree.getRootHash()}
+        while directories:
+            self.sendAsJSON(directories)
+            listings = self.receiveJSON()
+            directories = {}
+            for dirPath, listing in listings.items():
+                self.knownFiles = {file for file in self.knownFiles if not self.isOutdatedBy(file, dirPath, listing)}
+                for name, (childHash, isDir) in listing.items():
+                    childPath = joinPath(dirPath, name)
+                    if isDir:
+                        directories[childPath] = localTree.hashes.get(childPath)
+                        continue
+                    self.knownFiles.add(childPath)
+                    if childPath not in local:
+                        local[childPath] = shaForFile(childPath) if Path(childPath).is_file() else None
+                    if local[childPath] != childHash:
+                        differences.add(childPath)
+
+        self.sendAsJSON({})
+        self.finishRemoteCall()
+        return differences
+
+    @staticmethod
+    def isOutdatedBy(file: str, dirPath: str, listing: dict):
+        """ Function to check if a known file has to be forgotten because of a new listing of a directory. That's the
+        case for files directly within the directory, they are known again if they are still listed, and for files
+        within subdirectories that aren't listed anymore.
+
+            :param file:    The path of the known file.
+            :param dirPath: The path of the listed directory.
+            :param listing: The listing of the directory.
+
+            :return:        True if the file has to be forgotten, false otherwise.
+
+                note:: Author(s): Mitch """
+
+        prefix = joinPath(dirPath, '')
+        if not file.startswith(prefix):
+            return False
+        name, _, rest = file[len(prefix):].partition('/')
+        return not rest or name not in listing or not listing[name][1]
+
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+
     def getFiles(self, update_list: set = None):
         """ Function to update a list of specified files.
 
@@ -310,54 +577,153 @@ class BFABaseClient:
         if update_list is False:
             return False
 
+        if not self.connected:
+            self.connect()
+        if self.isFramed() and self.protocolVersion >= framing.DELTA_PROTOCOL_VERSION:
+            return self.getDeltaFiles(update_list)
+
         if not self.declareRemoteCall('getFiles'):
             return False
 
         self.sendAsJSON(list(update_list))
 
-        firstPackets = b''
-        firstPacketsAsString = ''
+        if self.isFramed():
+            for file in update_list:
+                if not Path('./' + file).parent.exists():
+                    Path('./' + file).parent.mkdir(parents=True)
+                framing.receiveFile(self.clientSocket, './' + file)
+            self.finishRemoteCall()
+            return True
+
+        received = bytearray()
+        view = memoryview(bytearray(framing.CHUNK_SIZE))
 
         for file in update_list:
             if not Path('./' + file).parent.exists():
                 Path('./' + file).parent.mkdir(parents=True)
 
-            while "</FILESIZE>" not in firstPacketsAsString:
-                firstPackets += self.clientSocket.recv(1024)
-                firstPacketsAsString = str(firstPackets, 'utf-8', errors='ignore')
-
-            fileSizeStart = firstPacketsAsString.index('<FILESIZE>') + len('<FILESIZE>')
-            fileSizeEnd = firstPacketsAsString.index('</FILESIZE>')
-            fileSize = int(firstPacketsAsString[fileSizeStart:fileSizeEnd])
+            while b'</FILESIZE>' not in received:
+                n = self.clientSocket.recv_into(view)
+                if not n:
+                    log("Connection was closed while receiving " + file + ".", 3)
+                    self.disconnect()
+                    return False
+                received += view[:n]
 
-            firstDataStart = firstPackets.index(bytes('</FILESIZE>', 'utf-8')) + len(bytes('</FILESIZE>', 'utf-8'))
-            firstData = firstPackets[firstDataStart:]
-            firstDataSize = len(firstData)
+            fileSizeEnd = received.index(b'</FILESIZE>')
+            fileSize = int(received[received.index(b'<FILESIZE>') + len(b'<FILESIZE>'):fileSizeEnd])
+            del received[:fileSizeEnd + len(b'</FILESIZE>')]
 
             with open('./' + file, "wb") as f:
-                if firstDataSize > fileSize:
-                    f.write(firstData[:fileSize])
-                    firstPackets = firstData[fileSize:]
-                    firstPacketsAsString = str(firstPackets, 'utf-8', errors='ignore')
-                else:
-                    remainingDataSize = fileSize - firstDataSize
-                    f.write(firstData)
-                    while remainingDataSize > 1024:
-                        f.write(self.clientSocket.recv(1024))
-                        remainingDataSize -= 1024
-                    f.write(self.clientSocket.recv(remainingDataSize))
-                    firstPackets = b''
-                    firstPacketsAsString = ''
+                remainingDataSize = fileSize - min(fileSize, len(received))
+                f.write(received[:fileSize])
+                del received[:fileSize]
+                while remainingDataSize > 0:
+                    n = self.clientSocket.recv_into(view, min(remainingDataSize, len(view)))
+                    if not n:
+                        log("Connection was closed while receiving " + file + ".", 3)
+                        self.disconnect()
+                        return False
+                    f.write(view[:n])
+                    remainingDataSize -= n
 
         self.disconnect()
         return True
 
+    def getDeltaFiles(self, update_list: set, local: set = None):
+        """ Function to update a list of specified files with compressed transfers. For files the client already has
+        an older copy of only the blocks it's missing are transferred. Every file is written next to the old copy first
+        and only replaces it once its digest matches the one of the master.
+
+            :param update_list: List of files to be updated.
+            :param local:       Set of the files to update from the older copy, by default all that exist.
+
+            :return:            True if all files were updated, false otherwise.
+
+                note:: Author(s): Mitch """
+
+        if local is None:
+            local = {file for file in update_list if exists('./' + file)}
+
+        if not self.declareRemoteCall('getDeltaFiles'):
+            return False
+
+        self.sendAsJSON({'FILES': list(update_list), 'LOCAL': list(local), 'CODECS': CODECS})
+        offers = self.receiveJSON()
+
+        found, wanted = {}, {}
+        for file, offer in offers.items():
+            if 'BLOCKS' in offer:
+                found[file] = matchBlocks('./' + file, offer)
+                wanted[file] = missingRanges(offer, found[file])
+            else:
+                wanted[file] = None
+        self.sendAsJSON(wanted)
+
+        corrupted = set()
+        for file in wanted:
+            if not Path('./' + file).parent.exists():
+                Path('./' + file).parent.mkdir(parents=True)
+
+            codec = self.getResponse()
+            chunks = decompressChunks(framing.receiveChunks(self.clientSocket), codec)
+            if file in found:
+                reader = ChunkReader(chunks)
+                rebuildFile('./' + file, './' + file + '.part', offers[file], found[file], reader)
+                reader.drain()
+            else:
+                with open('./' + file + '.part', 'wb') as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+
+            if shaForFile('./' + file + '.part') == offers[file]['DIGEST']:
+                replace('./' + file + '.part', './' + file)
+            else:
+                remove('./' + file + '.part')
+                corrupted.add(file)
+
+        self.finishRemoteCall()
+
+        for file in set(update_list).difference(offers):
+            log("Master refused to send " + file + ".", 3)
+        if corrupted and local:
+            log("Delta transfer of " + str(corrupted) + " failed verification. Fetching the whole files instead.", 2)
+            return self.getDeltaFiles(corrupted, set())
+        return not corrupted and set(update_list).issubset(offers)
+
+    def getRevision(self):
+        """ This function asks the master for its current revision. That's the stage, branch and revision of the
+        master plus the root hash of the full folder signature for this client. Only masters speaking the framed
+        protocol know about revisions.
+
+            :return:    The revision as dictionary or None if the master couldn't tell.
+
+                note:: Author(s): Mitch """
+
+        if not self.connected:
+            self.connect()
+        if not self.isFramed():
+            return None
+        if not self.declareRemoteCall('getRevision'):
+            return None
+
+        revision = self.receiveJSON()
+        self.finishRemoteCall()
+        return revision
+
     def getUpdate(self):
-        """ Function to pull the newest client from the master.
+        """ Function to pull the newest client from the master. The differences are only calculated if the revision of
+        the master changed since the last complete update.
+
+            :return:    True if files were updated, false otherwise.
 
                 note:: Author(s): Mitch """
         from bfassist.standalone import KERN
 
+        revision = self.getRevision()
+        if revision and revision == self.lastRevision:
+            return False
+
         updateList = self.calculateDifferences()
         if updateList:
             installList = []
@@ -368,6 +734,7 @@ class BFABaseClient:
             try:
                 if self.getFiles(updateList):
                     KERN.AUTO_UPDATE_THREAD.toInstall += installList
+                    self.lastRevision = revision
                     return True
                 else:
                     log("Couldn't receive update files correctly!", 3)
@@ -375,7 +742,86 @@ class BFABaseClient:
             except timeout:
                 log("Timeout while receiving update files.", 3)
                 return False
+        elif updateList is not False:
+            self.lastRevision = revision
+        return False
+
+    def batchRemoteCalls(self, calls: list):
+        """ Used to declare several remote calls on the bfa master at once. All calls are sent and their results
+        received in one exchange. Only masters speaking the framed protocol understand batches.
 
+            :param calls:   List of tuples containing the name of a batchable function on the bfa master and its
+                            json-encodable argument or None.
+
+            :return:        List of the results of the calls in the same order or None if the batch failed.
+
+                note::  Author(s): Mitch """
+
+        if not self.connected:
+            self.connect()
+        if not self.isFramed():
+            return None
+        if not self.declareRemoteCall('Batch', failure="Error: Transmission of batched remote calls failed!"):
+            return None
+
+        self.sendAsJSON([[rfName, argument] for rfName, argument in calls])
+        results = self.receiveJSON()
+        self.finishRemoteCall()
+        return results
+
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
 #
 #   # Server client_requests
 #
@@ -15,7 +15,8 @@ associated client and server functions aligned on the same line of code.
             |
             |-> standalone
             |-> standalone -> monitoring
-            \-> bfa_logging
+            |-> bfa_logging
+            \-> network -> client -> playersync
              -> network -> client
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
@@ -29,6 +30,7 @@ from bfassist.standalone.monitoring import BfRound
 from bfassist.bfa_logging import log
 
 from bfassist.network.client import BFA_CLIENT, BFABaseClient
+from bfassist.network.client.playersync import PLAYER_SYNC
 
 
 # noinspection PyUnusedLocal
@@ -46,6 +48,9 @@ class LeagueClientExtension(BFABaseClient):
 
             note::  Author(s): Mitch """
 
+    #
+    #
+
     def sendLeagueRound(self, inRound: BfRound):
         """ This function sends a league round to the master.
 
@@ -56,7 +61,7 @@ class LeagueClientExtension(BFABaseClient):
         if not self.declareRemoteCall('LeagueRound'):
             return False
         self.sendAsJSON(inRound.toGlobalDict())
-        self.disconnect()
+        self.finishRemoteCall()
 
     def sendPlayer(self, inPlayer: Player, add: dict = None):
         """ Simple function to transmit a player in a serialised way plus some optional extra data.
@@ -207,7 +212,7 @@ class LeagueClientExtension(BFABaseClient):
             return False
 
         j = self.receiveJSON()
-        self.disconnect()
+        self.finishRemoteCall()
         return j
 
     def getLeagueSettings(self):
@@ -221,26 +226,119 @@ class LeagueClientExtension(BFABaseClient):
             self.disconnect()
             return False
         j = self.receiveJSON()
-        self.disconnect()
+        self.finishRemoteCall()
         return j
 
     def updateLeaguePlayers(self, inPlayers: dict):
-        """ This function send an update containing all livePlayers of an onlinePlayers dictionary of a server to the
-        bfa master.
+        """ This function synchronises the players of an onlinePlayers dictionary of a server whose aliases or ips
+        changed since the bfa master acknowledged them last. Masters that don't understand batches receive all players.
 
             :param inPlayers:   The dictionary containing playerIds and the corresponding Player object.
 
                 note::  Author(s): Mitch """
 
+        records = PLAYER_SYNC.changed(inPlayers)
+        if not records:
+            return True
+        results = self.batchRemoteCalls([('SyncLeaguePlayers', records)])
+        PLAYER_SYNC.answered(records, results[0] if results else None)
+        if results is not None or self.isFramed():
+            return bool(results) and results[0] is True
+
         if not self.declareRemoteCall('UpdateLeaguePlayers'):
             return False
-        to_send = []
-        for Id in inPlayers:
-            to_send.append(inPlayers[Id].toGlobalDict())
-        if not self.sendPlayers(to_send):
+        if not self.sendPlayers([inPlayers[Id].toGlobalDict() for Id in inPlayers]):
             return False
+        self.finishRemoteCall()
         return True
 
+    def sendLeagueRoundAndPlayers(self, inRound: BfRound, inPlayers: dict):
+        """ This function sends a league round together with the players that were online at its end and changed since
+        their last synchronisation to the master in one batch. Masters that don't understand batches receive them with
+        separate calls.
+
+            :param inRound:     The round to send.
+            :param inPlayers:   The dictionary containing playerIds and the corresponding Player object.
+
+                note::  Author(s): Mitch """
+
+        records = PLAYER_SYNC.changed(inPlayers)
+        results = self.batchRemoteCalls([('SyncLeaguePlayers', records), ('LeagueRound', inRound.toGlobalDict())])
+        PLAYER_SYNC.answered(records, results[0] if results else None)
+        if results is None and not self.isFramed():
+            self.updateLeaguePlayers(inPlayers)
+            self.sendLeagueRound(inRound)
+
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
+#
 #
 #
 #
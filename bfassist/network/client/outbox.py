@@ -0,0 +1,224 @@
+#############################################################################
+#
+#
+#   Outbox network Client Module to BFA c7
+#
+#
+#############################################################################
+""" This module provides a durable outbox for the results a client sends to the master. Results are posted to a journal
+on disk and the posting thread, e.g. the log reader at the end of a round, continues right away. A background thread
+drains the outbox in batches over its own connection to the master. Every call carries an idempotency key, so a batch
+that wasn't answered, e.g. because the connection broke, is simply sent again and the master answers calls it already
+processed with their earlier result. While the master can't be reached the outbox waits with exponential backoff and
+results posted meanwhile are sent together once it's back.
+
+A call the master answers with None, because it doesn't know the call or the call is malformed, is rejected for good, so
+it can't hold up the calls posted after it. Masters that only speak the legacy protocol don't understand batches, they
+get every call as a remote call of its own. The legacy protocol doesn't acknowledge calls, so a call counts as answered
+with True once it was sent.
+
+    Dependencies:
+
+        bfassist <- (network.client.)outbox
+            |
+            |-> bfa_logging
+            |-> network -> journal
+            \-> network -> client   @Outbox.getClient
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+from threading import Thread, Event
+from uuid import uuid4
+
+from bfassist.bfa_logging import log
+from bfassist.network.journal import Journal
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+class Outbox(Thread):
+    """ Thread sending the calls posted to a journal to the master in batches.
+
+        :param journal:         The journal the calls are posted to.
+        :param client:          The client used to send the calls, created on first use.
+        :param batchSize:       The maximum number of calls sent in one batch.
+        :param linger:          Seconds the outbox waits after a call was posted so calls posted right after it are sent
+                                in the same batch.
+        :param minBackoff:      Seconds waited after the first failed attempt to send a batch.
+        :param maxBackoff:      The maximum number of seconds waited between two attempts.
+        :param answerHandlers:  Dictionary containing names of batchable functions as keys and functions as values that
+                                get passed the argument and result of every answered call of that name.
+        :param legacyCalls:     Dictionary containing names of batchable functions as keys and tuples of the name of the
+                                remote call sent to legacy masters instead and a function converting the argument or
+                                None as values. Calls not listed are sent to legacy masters under their own name.
+        :param wakeEvent:       Event that is set when a call was posted.
+        :param stopEvent:       Event that is set to stop sending.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, journal: Journal, client=None, batchSize: int = 64, linger: float = .5,
+                 minBackoff: float = 1., maxBackoff: float = 300., answerHandlers: dict = None,
+                 legacyCalls: dict = None, wakeEvent: Event = None, stopEvent: Event = None):
+
+        super().__init__(daemon=True, name='BFA-Outbox')
+        self.journal = journal
+        self.client = client
+        self.batchSize = batchSize
+        self.linger = linger
+        self.minBackoff = minBackoff
+        self.maxBackoff = maxBackoff
+        if answerHandlers:
+            self.answerHandlers = answerHandlers
+        else:
+            self.answerHandlers = {}
+        if legacyCalls:
+            self.legacyCalls = legacyCalls
+        else:
+            self.legacyCalls = {}
+        if wakeEvent:
+            self.wakeEvent = wakeEvent
+        else:
+            self.wakeEvent = Event()
+        if stopEvent:
+            self.stopEvent = stopEvent
+        else:
+            self.stopEvent = Event()
+
+    def post(self, rfName: str, argument=None):
+        """ Posts a call of a batchable function on the master to the outbox. Returns as soon as the call is on disk.
+
+            :param rfName:      The name of the batchable function on the master.
+            :param argument:    Its json-encodable argument or None.
+
+            :return:            The idempotency key of the call.
+
+                note::  Author(s): Mitch """
+
+        key = uuid4().hex
+        self.journal.append({'Key': key, 'Call': rfName, 'Argument': argument})
+        self.wakeEvent.set()
+        return key
+
+    def startup(self):
+        """ Starts sending unless the outbox is already running. Calls posted before are sent first.
+
+                note::  Author(s): Mitch """
+
+        if self.ident is None:
+            self.start()
+
+    def getClient(self):
+        """ Simple function to get the client of the outbox. It's a client of its own, so sending doesn't interfere
+        with the remote calls of other threads.
+
+            :return:    The client.
+
+                note::  Author(s): Mitch """
+
+        if self.client is None:
+            from bfassist.network.client import BFA_CLIENT
+
+            self.client = BFA_CLIENT.__class__()
+        return self.client
+
+    def run(self):
+        """ Drains the outbox whenever calls are posted until it's stopped. Waits with exponential backoff while the
+        master doesn't answer.
+
+                note::  Author(s): Mitch """
+
+        backoff = 0.
+        while not self.stopEvent.is_set():
+            self.wakeEvent.clear()
+            if self.drain():
+                backoff = 0.
+                self.wakeEvent.wait()
+                self.stopEvent.wait(self.linger)
+            else:
+                backoff = min(backoff * 2, self.maxBackoff) if backoff else self.minBackoff
+                log("The master didn't answer the outbox, trying again in " + str(backoff) + " seconds.", 2)
+                self.stopEvent.wait(backoff)
+
+    def drain(self):
+        """ Sends batches from the outbox until it's empty.
+
+            :return:    True if the outbox is empty, False if a batch couldn't be sent.
+
+                note::  Author(s): Mitch """
+
+        while True:
+            calls, offset = self.journal.read(self.batchSize)
+            if offset == self.journal.offset:
+                return True
+            if calls and not self.send(calls):
+                return False
+            self.journal.commit(offset)
+
+    def send(self, calls: list):
+        """ Sends a batch of calls to the master. Masters that only speak the legacy protocol get the calls one by one.
+
+            :param calls:   List of the posted calls.
+
+            :return:        True if the master answered all of them, False otherwise.
+
+                note::  Author(s): Mitch """
+
+        client = self.getClient()
+        try:
+            results = client.batchRemoteCalls([('Once', [call['Key'], call['Call'], call['Argument']])
+                                               for call in calls])
+            if results is None and client.connected and not client.isFramed():
+                results = self.sendLegacy(client, calls)
+        except (OSError, ValueError) as error:
+            log("Sending the outbox failed: " + repr(error), 2)
+            client.disconnect()
+            return False
+
+        if not isinstance(results, list) or len(results) != len(calls):
+            return False
+        for call, result in zip(calls, results):
+            if result is None:
+                log("The master doesn't know the call " + call['Call'] + " with key " + call['Key'] +
+                    ", dropping it.", 3)
+            elif result is False:
+                log("The master rejected the call " + call['Call'] + " with key " + call['Key'] + ".", 3)
+            if call['Call'] in self.answerHandlers:
+                self.answerHandlers[call['Call']](call['Argument'], result)
+        return True
+
+    def sendLegacy(self, client, calls: list):
+        """ Sends calls to a master that only speaks the legacy protocol, every call as a remote call of its own.
+
+            :param client:  The client connected to the master.
+            :param calls:   List of the posted calls.
+
+            :return:        List of True for every call or None if a call couldn't be sent.
+
+                note::  Author(s): Mitch """
+
+        for call in calls:
+            rfName, convert = self.legacyCalls.get(call['Call'], (call['Call'], None))
+            if not client.declareRemoteCall(rfName, failure="Error: Transmission of " + rfName + " failed!"):
+                return None
+            client.sendAsJSON(convert(call['Argument']) if convert else call['Argument'])
+            client.finishRemoteCall()
+        return [True] * len(calls)
+
+    def stop(self):
+        """ Stops sending. Calls that weren't sent stay in the outbox.
+
+                note::  Author(s): Mitch """
+
+        self.stopEvent.set()
+        self.wakeEvent.set()
+
+
+OUTBOX = Outbox(Journal('bfassist/network/client/outbox.journal'))
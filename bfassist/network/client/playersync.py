@@ -0,0 +1,179 @@
+#############################################################################
+#
+#
+#   Player Sync network Client Module to BFA c7
+#
+#
+#############################################################################
+""" This module keeps track of which version of the league relevant data of a player the master acknowledged, so a
+client only synchronises players whose aliases, ips or alias for their keyhash changed since. The version of a player
+record is a digest of its content. The acknowledged versions are persisted in a json file so they survive restarts of
+the client.
+
+    Dependencies:
+
+        bfassist <- (network.client.)playersync
+            |
+            \-> network -> client -> outbox
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+import json
+from hashlib import sha256
+from os import replace
+from os.path import exists
+from threading import Lock
+
+from bfassist.network.client.outbox import OUTBOX
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+def playerRecord(inPlayer):
+    """ Function that creates the record of a player that's synchronised with the master.
+
+        :param inPlayer:    The player.
+
+        :return:            The record as dictionary containing the keyhash, alias and sorted lists of the aliases and
+                            ips of the player.
+
+            note::  Author(s): Mitch """
+
+    return {
+        'Keyhash':  inPlayer.getKeyhash(),
+        'Alias':    inPlayer.getAlias(),
+        'Aliases':  sorted(alias for alias in inPlayer.getAliases() or () if alias),
+        'Ips':      sorted(ip for ip in inPlayer.getIps() or () if ip)
+    }
+
+
+def legacyRecords(records: list):
+    """ Function that turns player records into the dictionaries legacy masters expect for updating league players.
+
+        :param records: List of the player records.
+
+        :return:        List of dictionaries as created by Player.toGlobalDict.
+
+            note::  Author(s): Mitch """
+
+    return [{
+        'Keyhash':  record['Keyhash'],
+        'Alias':    record['Alias'],
+        'Aliases':  str(set(record['Aliases'])),
+        'Ips':      str(set(record['Ips'])) if record['Ips'] else ''
+    } for record in records]
+
+
+def recordVersion(record: dict):
+    """ Simple function to get the version of a player record.
+
+        :param record:  The player record.
+
+        :return:        The version as hex-digest.
+
+            note::  Author(s): Mitch """
+
+    return sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()
+
+
+class PlayerSyncState:
+    """ The versions of the player records the master acknowledged.
+
+        :param statePath:   Path to the json file the acknowledged versions are persisted in.
+        :param versions:    Dictionary containing keyhashes as keys and the version of the record the master
+                            acknowledged last as values.
+        :param pending:     Dictionary containing keyhashes as keys and the version of the record that was sent but
+                            wasn't answered yet as values.
+        :param lock:        Lock guarding the versions.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, statePath: str, versions: dict = None, pending: dict = None, lock: Lock = None):
+
+        self.statePath = statePath
+        if versions:
+            self.versions = versions
+        else:
+            self.versions = {}
+            self.load()
+        if pending:
+            self.pending = pending
+        else:
+            self.pending = {}
+        if lock:
+            self.lock = lock
+        else:
+            self.lock = Lock()
+
+    def load(self):
+        """ Loads the acknowledged versions persisted in the state file if there are any.
+
+                note::  Author(s): Mitch """
+
+        if exists(self.statePath):
+            try:
+                with open(self.statePath, 'r') as stateFile:
+                    self.versions = json.load(stateFile)
+            except (OSError, ValueError):
+                self.versions = {}
+
+    def save(self):
+        """ Persists the acknowledged versions in the state file.
+
+                note::  Author(s): Mitch """
+
+        with open(self.statePath + '.tmp', 'w') as stateFile:
+            json.dump(self.versions, stateFile)
+        replace(self.statePath + '.tmp', self.statePath)
+
+    def changed(self, inPlayers: dict):
+        """ Function that gets the records of the players that changed since the master acknowledged them last and
+        that aren't waiting for an answer of the master already. The records returned are marked as pending.
+
+            :param inPlayers:   The dictionary containing playerIds and the corresponding Player object.
+
+            :return:            List of the records of the changed players.
+
+                note::  Author(s): Mitch """
+
+        records = []
+        with self.lock:
+            for inPlayer in inPlayers.values():
+                record = playerRecord(inPlayer)
+                version = recordVersion(record)
+                if version not in (self.versions.get(record['Keyhash']), self.pending.get(record['Keyhash'])):
+                    self.pending[record['Keyhash']] = version
+                    records.append(record)
+        return records
+
+    def answered(self, records: list, result):
+        """ Function that records the answer of the master to synchronised records. Records the master accepted are
+        acknowledged, all others are sent again the next time the players are synchronised.
+
+            :param records: List of the records that were sent.
+            :param result:  The result of the synchronisation, True if the master accepted the records.
+
+                note::  Author(s): Mitch """
+
+        with self.lock:
+            for record in records:
+                version = recordVersion(record)
+                if self.pending.get(record['Keyhash']) == version:
+                    self.pending.pop(record['Keyhash'])
+                if result is True:
+                    self.versions[record['Keyhash']] = version
+            if result is True:
+                self.save()
+
+
+PLAYER_SYNC = PlayerSyncState('bfassist/network/client/playersync.json')
+OUTBOX.answerHandlers['SyncLeaguePlayers'] = PLAYER_SYNC.answered
+OUTBOX.legacyCalls['SyncLeaguePlayers'] = ('UpdateLeaguePlayers', legacyRecords)
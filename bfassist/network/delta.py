@@ -0,0 +1,353 @@
+#############################################################################
+#
+#
+#   Delta network Module to BFA c7
+#
+#
+#############################################################################
+""" This module provides compressed and delta-encoded transfers of files between the bfa master and its clients.
+
+Files are split into blocks and every block gets a weak rolling checksum (adler-32) and a strong checksum. The master
+sends these block signatures for the files a client already has an older copy of. The client rolls the weak checksum
+over its old copy to find the blocks it already has at any offset and only asks for the ranges of blocks it's missing.
+Doing the rolling on the client means the master only calculates the signature once per version of a file, no matter
+how many clients update from it. Rolling byte by byte in python is slow, so a client only rolls a limited number of
+bytes per file and afterwards just checks whole blocks in the phase of the last match.
+
+The data that is sent is compressed with zlib or lzma unless it doesn't compress. Compressed data is streamed in chunk
+frames, so neither side has to hold a whole file in memory.
+
+    Dependencies:
+
+        network <- delta
+            |
+            \-> framing
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+import lzma
+import zlib
+from hashlib import blake2b
+from mmap import mmap, ACCESS_READ
+from os.path import getsize
+
+from bfassist.network.framing import CHUNK_SIZE
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+DELTA_THRESHOLD = 65536
+MIN_BLOCK_SIZE = 4096
+MAX_BLOCKS = 2048
+ROLLING_BUDGET = 4194304
+
+CODECS = ['zlib', 'lzma']
+RAW = 'raw'
+COMPRESSION_THRESHOLD = .9
+
+ADLER_MOD = 65521
+
+
+def blockSizeFor(size: int):
+    """ Simple function to get the block size for a file so it's split into at most MAX_BLOCKS blocks.
+
+        :param size:    The size of the file.
+
+        :return:        The block size as multiple of 1024.
+
+            note::  Author(s): Mitch """
+
+    blockSize = -(-size // MAX_BLOCKS)
+    return max(MIN_BLOCK_SIZE, -(-blockSize // 1024) * 1024)
+
+
+def blockLength(signature: dict, index: int):
+    """ Simple function to get the length of a block of a file, only the last block can be shorter.
+
+        :param signature:   The block signature of the file.
+        :param index:       The index of the block.
+
+        :return:            The length of the block.
+
+            note::  Author(s): Mitch """
+
+    return min(signature['BLOCKSIZE'], signature['SIZE'] - index * signature['BLOCKSIZE'])
+
+
+def strongChecksum(data):
+    """ Simple function to calculate the strong checksum of a block.
+
+        :param data:    The bytes of the block.
+
+        :return:        The hex-digest of the checksum.
+
+            note::  Author(s): Mitch """
+
+    return blake2b(data, digest_size=16).hexdigest()
+
+
+def blockSignature(filePath: str):
+    """ Calculates the block signature of a file.
+
+        :param filePath:    The path to the file.
+
+        :return:            Dictionary containing the size of the file, its block size and a list of the weak and
+                            strong checksum of every block.
+
+            note::  Author(s): Mitch """
+
+    size = getsize(filePath)
+    blockSize = blockSizeFor(size)
+    blocks = []
+    with open(filePath, 'rb') as f:
+        for block in iter(lambda: f.read(blockSize), b''):
+            blocks.append([zlib.adler32(block), strongChecksum(block)])
+    return {'SIZE': size, 'BLOCKSIZE': blockSize, 'BLOCKS': blocks}
+
+
+def matchBlocks(oldPath: str, signature: dict):
+    """ Finds the blocks of a new version of a file in an old copy of it. The weak checksum is rolled over the old copy
+    until the rolling budget is used up, afterwards only whole blocks are checked in the phase of the last match.
+
+        :param oldPath:     The path to the old copy.
+        :param signature:   The block signature of the new version.
+
+        :return:            Dictionary containing the indices of the blocks found as keys and their offset in the old
+                            copy as values.
+
+            note::  Author(s): Mitch """
+
+    blockSize, blocks = signature['BLOCKSIZE'], signature['BLOCKS']
+    found = {}
+    size = getsize(oldPath)
+    if not blocks or not size:
+        return found
+
+    weakIndex = {}
+    for index, (weak, strong) in enumerate(blocks):
+        if blockLength(signature, index) == blockSize:
+            weakIndex.setdefault(weak, []).append(index)
+
+    with open(oldPath, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as old:
+
+        def matchAt(offset: int, candidates: list):
+            strong = strongChecksum(old[offset:offset + blockSize])
+            matched = False
+            for candidate in candidates:
+                if blocks[candidate][1] == strong:
+                    found.setdefault(candidate, offset)
+                    matched = True
+            return matched
+
+        pos, rolled, weak = 0, 0, None
+        while pos + blockSize <= size:
+            if weak is None:
+                weak = zlib.adler32(old[pos:pos + blockSize])
+            if weak in weakIndex and matchAt(pos, weakIndex[weak]):
+                pos, weak = pos + blockSize, None
+            elif rolled < ROLLING_BUDGET and pos + blockSize < size:
+                out, into = old[pos], old[pos + blockSize]
+                a = ((weak & 0xffff) - out + into) % ADLER_MOD
+                b = ((weak >> 16) - blockSize * out + a - 1) % ADLER_MOD
+                weak = (b << 16) | a
+                pos, rolled = pos + 1, rolled + 1
+            else:
+                pos, weak = pos + blockSize, None
+
+        last = len(blocks) - 1
+        lastLength = blockLength(signature, last)
+        if lastLength < blockSize:
+            for offset in {last * blockSize, size - lastLength}:
+                if 0 <= offset <= size - lastLength and \
+                        strongChecksum(old[offset:offset + lastLength]) == blocks[last][1]:
+                    found[last] = offset
+                    break
+
+    return found
+
+
+def missingRanges(signature: dict, found: dict):
+    """ Simple function to get the ranges of blocks that weren't found in an old copy.
+
+        :param signature:   The block signature of the new version.
+        :param found:       Dictionary containing the indices of the blocks found as keys.
+
+        :return:            List of lists containing the start index and the end index (exclusive) of each range.
+
+            note::  Author(s): Mitch """
+
+    ranges = []
+    for index in range(len(signature['BLOCKS'])):
+        if index in found:
+            continue
+        if ranges and ranges[-1][1] == index:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index, index + 1])
+    return ranges
+
+
+def readRanges(filePath: str, blockSize: int, ranges: list = None):
+    """ Reads ranges of blocks of a file or the whole file in chunks.
+
+        :param filePath:    The path to the file.
+        :param blockSize:   The block size the ranges refer to.
+        :param ranges:      List of lists containing the start and end index of each range or None for the whole file.
+
+        :return:            Generator yielding the chunks read.
+
+            note::  Author(s): Mitch """
+
+    with open(filePath, 'rb') as f:
+        if ranges is None:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b'')
+            return
+        for start, end in ranges:
+            f.seek(start * blockSize)
+            remaining = (end - start) * blockSize
+            while remaining > 0:
+                chunk = f.read(min(remaining, CHUNK_SIZE))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+def chooseCodec(sample: bytes, codecs: list):
+    """ Simple function to choose the codec for a transfer. The first codec both sides support is used unless the
+    sample doesn't compress.
+
+        :param sample:  The first chunk of the data to send.
+        :param codecs:  List of the codecs supported by the receiving side.
+
+        :return:        The name of the codec.
+
+            note::  Author(s): Mitch """
+
+    for codec in CODECS:
+        if codec in codecs:
+            if sample and len(zlib.compress(sample, 1)) > len(sample) * COMPRESSION_THRESHOLD:
+                return RAW
+            return codec
+    return RAW
+
+
+def compressChunks(chunks, codec: str):
+    """ Compresses chunks of data.
+
+        :param chunks:  Iterable of the chunks to compress.
+        :param codec:   The name of the codec.
+
+        :return:        Generator yielding the compressed chunks.
+
+            note::  Author(s): Mitch """
+
+    if codec == RAW:
+        yield from chunks
+        return
+
+    compressor = zlib.compressobj(6) if codec == 'zlib' else lzma.LZMACompressor()
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def decompressChunks(chunks, codec: str):
+    """ Decompresses chunks of data.
+
+        :param chunks:  Iterable of the compressed chunks.
+        :param codec:   The name of the codec.
+
+        :return:        Generator yielding the decompressed chunks.
+
+            note::  Author(s): Mitch """
+
+    if codec == RAW:
+        yield from chunks
+        return
+
+    decompressor = zlib.decompressobj() if codec == 'zlib' else lzma.LZMADecompressor()
+    for chunk in chunks:
+        decompressed = decompressor.decompress(chunk)
+        if decompressed:
+            yield decompressed
+    if codec == 'zlib':
+        rest = decompressor.flush()
+        if rest:
+            yield rest
+
+
+class ChunkReader:
+    """ Reader to take exact numbers of bytes from a stream of chunks.
+
+        :param chunks:  Iterator of the chunks.
+        :param buffer:  Bytes taken from the iterator that weren't read yet.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, chunks, buffer: bytearray = None):
+
+        self.chunks = iter(chunks)
+        if buffer:
+            self.buffer = buffer
+        else:
+            self.buffer = bytearray()
+
+    def read(self, count: int):
+        """ Reads exactly count bytes.
+
+            :param count:   Number of bytes to read.
+
+            :return:        The bytes read.
+
+                note::  Author(s): Mitch """
+
+        while len(self.buffer) < count:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                raise ValueError("The stream ended before " + str(count) + " bytes could be read.")
+            self.buffer += chunk
+        data = bytes(self.buffer[:count])
+        del self.buffer[:count]
+        return data
+
+    def drain(self):
+        """ Reads the rest of the stream and throws it away.
+
+                note::  Author(s): Mitch """
+
+        for _ in self.chunks:
+            pass
+        self.buffer.clear()
+
+
+def rebuildFile(oldPath: str, newPath: str, signature: dict, found: dict, reader: ChunkReader):
+    """ Writes the new version of a file from the blocks found in the old copy and the missing blocks received.
+
+        :param oldPath:     The path to the old copy.
+        :param newPath:     The path to write the new version to.
+        :param signature:   The block signature of the new version.
+        :param found:       Dictionary containing the indices of the blocks found as keys and their offset in the old
+                            copy as values.
+        :param reader:      Reader on the stream of the missing blocks in ascending order.
+
+            note::  Author(s): Mitch """
+
+    with open(oldPath, 'rb') as old, open(newPath, 'wb') as new:
+        for index in range(len(signature['BLOCKS'])):
+            length = blockLength(signature, index)
+            if index in found:
+                old.seek(found[index])
+                new.write(old.read(length))
+            else:
+                new.write(reader.read(length))
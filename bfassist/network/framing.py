@@ -0,0 +1,273 @@
+#############################################################################
+#
+#
+#   Framing network Module to BFA c7
+#
+#
+#############################################################################
+""" This module defines the framed wire protocol used between bfa clients and the bfa master. Every message is sent as
+a frame consisting of a header with the type of the message and the length of its payload followed by the payload
+itself. The receiving side can therefore read exactly one message without having to wait for a timeout to decide that
+the transmission ended.
+
+Connections start with a version handshake. The client sends the protocol magic followed by the highest protocol
+version it supports and the master answers with the version both sides are going to use. A master receiving anything
+else treats the connection as coming from an old client and falls back to the legacy protocol. Starting with the
+session protocol version connections are kept open for more than one remote call. Starting with the delta protocol
+version files can be streamed in chunk frames ended by an empty chunk, which is used for compressed and delta-encoded
+transfers.
+
+Frames are received in memory, so a frame announcing a payload larger than MAX_FRAME_SIZE is treated as a broken stream
+and the connection is closed. Files are written to disk while they're received and may be larger.
+
+    Dependencies:
+
+        network <- framing
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+import json
+import struct
+from socket import socket
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+PROTOCOL_MAGIC = b'BFA'
+PROTOCOL_VERSION = 4
+LEGACY_PROTOCOL_VERSION = 1
+SESSION_PROTOCOL_VERSION = 3
+DELTA_PROTOCOL_VERSION = 4
+
+STRING = 1
+JSON = 2
+FILE = 3
+CHUNK = 4
+
+FRAME_HEADER = struct.Struct('!BI')
+CHUNK_SIZE = 1048576
+MAX_FRAME_SIZE = 1 << 26
+
+
+def handshakeBytes(version: int = PROTOCOL_VERSION):
+    """ Simple function to build the handshake sent at the start of a framed connection.
+
+        :param version: The protocol version to announce.
+
+        :return:        The handshake as bytes.
+
+            note::  Author(s): Mitch """
+
+    return PROTOCOL_MAGIC + bytes([version])
+
+
+def parseHandshake(handshake: bytes):
+    """ Simple function to parse a handshake.
+
+        :param handshake:   The first bytes received on a connection.
+
+        :return:            The protocol version announced or None if the bytes weren't a handshake.
+
+            note::  Author(s): Mitch """
+
+    if len(handshake) == len(PROTOCOL_MAGIC) + 1 and handshake.startswith(PROTOCOL_MAGIC):
+        return handshake[-1]
+    return None
+
+
+def receiveExactly(sock: socket, count: int):
+    """ Receives exactly count bytes from a socket. The buffer grows with the bytes actually received, so a peer
+    announcing a large message doesn't get the memory for it before sending it.
+
+        :param sock:    The socket to receive from.
+        :param count:   Number of bytes to receive.
+
+        :return:        The bytes received.
+
+            note::  Author(s): Mitch """
+
+    data = bytearray(min(count, CHUNK_SIZE))
+    received = 0
+    while received < count:
+        if received == len(data):
+            data.extend(bytes(min(count - received, len(data))))
+        with memoryview(data) as view:
+            n = sock.recv_into(view[received:], len(data) - received)
+        if not n:
+            raise ConnectionResetError("Connection was closed in the middle of a message.")
+        received += n
+    return bytes(data)
+
+
+def sendFrame(sock: socket, messageType: int, payload: bytes):
+    """ Sends a single frame.
+
+        :param sock:        The socket to send the frame on.
+        :param messageType: The type of the message.
+        :param payload:     The payload of the message.
+
+            note::  Author(s): Mitch """
+
+    sock.sendall(FRAME_HEADER.pack(messageType, len(payload)) + payload)
+
+
+def sendString(sock: socket, s: str):
+    """ Sends a string encoded with utf-8 as single frame.
+
+        :param sock:    The socket to send the frame on.
+        :param s:       The string to send.
+
+            note::  Author(s): Mitch """
+
+    sendFrame(sock, STRING, bytes(s, 'utf-8'))
+
+
+def sendJSON(sock: socket, message):
+    """ Sends a message as json in utf-8 encoding as single frame given that it's json-encodable.
+
+        :param sock:    The socket to send the frame on.
+        :param message: The message to encode and send.
+
+            note::  Author(s): Mitch """
+
+    if isinstance(message, set):
+        message = list(message)
+    sendFrame(sock, JSON, bytes(json.dumps(message), 'utf-8'))
+
+
+def sendFile(sock: socket, filePath: str):
+    """ Sends the contents of a file as single frame without reading the whole file into memory.
+
+        :param sock:        The socket to send the frame on.
+        :param filePath:    The path to the file to send.
+
+            note::  Author(s): Mitch """
+
+    with open(filePath, 'rb') as f:
+        f.seek(0, 2)
+        sock.sendall(FRAME_HEADER.pack(FILE, f.tell()))
+        f.seek(0)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sock.sendall(chunk)
+
+
+def sendChunks(sock: socket, chunks):
+    """ Sends a stream of data as chunk frames followed by an empty chunk frame marking its end.
+
+        :param sock:    The socket to send the frames on.
+        :param chunks:  Iterable of the chunks of data to send.
+
+            note::  Author(s): Mitch """
+
+    for chunk in chunks:
+        if chunk:
+            sendFrame(sock, CHUNK, chunk)
+    sendFrame(sock, CHUNK, b'')
+
+
+def receiveHeader(sock: socket):
+    """ Receives the header of the next frame.
+
+        :param sock:    The socket to receive from.
+
+        :return:        Tuple of the type of the message and the length of its payload.
+
+            note::  Author(s): Mitch """
+
+    return FRAME_HEADER.unpack(receiveExactly(sock, FRAME_HEADER.size))
+
+
+def receiveFrame(sock: socket):
+    """ Receives the next frame.
+
+        :param sock:    The socket to receive from.
+
+        :return:        Tuple of the type of the message and its payload.
+
+        :raises ConnectionError: If the frame announces a payload larger than MAX_FRAME_SIZE.
+
+            note::  Author(s): Mitch """
+
+    messageType, length = receiveHeader(sock)
+    if length > MAX_FRAME_SIZE:
+        raise ConnectionError("The peer announced a frame of " + str(length) + " bytes.")
+    return messageType, receiveExactly(sock, length)
+
+
+def receiveString(sock: socket):
+    """ Receives the next frame as string.
+
+        :param sock:    The socket to receive from.
+
+        :return:        The payload of the frame decoded with utf-8.
+
+            note::  Author(s): Mitch """
+
+    messageType, payload = receiveFrame(sock)
+    return str(payload, 'utf-8')
+
+
+def receiveJSON(sock: socket):
+    """ Receives the next frame as json.
+
+        :param sock:    The socket to receive from.
+
+        :return:        The python representation of the json.
+
+            note::  Author(s): Mitch """
+
+    messageType, payload = receiveFrame(sock)
+    return json.loads(payload)
+
+
+def receiveFile(sock: socket, filePath: str):
+    """ Receives the next frame and writes its payload to a file in chunks.
+
+        :param sock:        The socket to receive from.
+        :param filePath:    The path of the file to write.
+
+        :return:            The number of bytes written.
+
+            note::  Author(s): Mitch """
+
+    messageType, length = receiveHeader(sock)
+    if messageType != FILE:
+        raise ValueError("Expected a file but received a message of type " + str(messageType) + ".")
+
+    buffer = bytearray(min(length, CHUNK_SIZE))
+    view = memoryview(buffer)
+    remaining = length
+    with open(filePath, 'wb') as f:
+        while remaining > 0:
+            n = sock.recv_into(view, min(remaining, len(buffer)))
+            if not n:
+                raise ConnectionResetError("Connection was closed in the middle of a file.")
+            f.write(view[:n])
+            remaining -= n
+    return length
+
+
+def receiveChunks(sock: socket):
+    """ Receives a stream of data sent as chunk frames.
+
+        :param sock:    The socket to receive from.
+
+        :return:        Generator yielding the payloads of the chunk frames until the empty one.
+
+            note::  Author(s): Mitch """
+
+    while True:
+        messageType, payload = receiveFrame(sock)
+        if messageType != CHUNK:
+            raise ValueError("Expected a chunk but received a message of type " + str(messageType) + ".")
+        if not payload:
+            return
+        yield payload
@@ -0,0 +1,162 @@
+#############################################################################
+#
+#
+#   Journal network Module to BFA c7
+#
+#
+#############################################################################
+""" This module provides a durable journal for data that has to survive a restart of bfa until it was processed, e.g.
+rounds the master received but didn't store yet or results a client couldn't send to the master yet. Entries are
+appended as json lines and synced to disk before append returns. The offset up to which the journal was consumed is
+committed to a file next to it, so entries that weren't consumed are read again after a restart.
+
+    Dependencies:
+
+        network <- journal
+            |
+            \-> bfa_logging
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+import json
+from os import fsync, replace, remove
+from os.path import exists, getsize
+from threading import Lock
+
+from bfassist.bfa_logging import log
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+class Journal:
+    """ Durable journal of entries that weren't consumed yet.
+
+        :param journalPath: Path to the journal.
+        :param offset:      Offset in bytes up to which the journal was consumed.
+        :param lock:        Lock guarding the journal and its offset.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, journalPath: str, offset: int = None, lock: Lock = None):
+
+        self.journalPath = journalPath
+        if offset:
+            self.offset = offset
+        else:
+            self.offset = self.loadOffset()
+        if lock:
+            self.lock = lock
+        else:
+            self.lock = Lock()
+        self.repair()
+
+    def loadOffset(self):
+        """ Loads the committed offset of the journal.
+
+            :return:    The offset in bytes, 0 if none was committed yet.
+
+                note::  Author(s): Mitch """
+
+        try:
+            with open(self.journalPath + '.offset', 'r') as offsetFile:
+                return int(offsetFile.read())
+        except (OSError, ValueError):
+            return 0
+
+    def repair(self):
+        """ Cuts off a line the journal ended in when bfa stopped in the middle of appending it. The entry of such a
+        line was never acknowledged.
+
+                note::  Author(s): Mitch """
+
+        if not exists(self.journalPath):
+            self.offset = 0
+            return
+
+        with open(self.journalPath, 'rb+') as journalFile:
+            size = journalFile.seek(0, 2)
+            end = size
+            while end > 0:
+                journalFile.seek(max(end - 4096, 0))
+                block = journalFile.read(end - max(end - 4096, 0))
+                if b'\n' in block:
+                    end = max(end - 4096, 0) + block.rindex(b'\n') + 1
+                    break
+                end = max(end - 4096, 0)
+            if end < size:
+                log("Cutting off an incomplete entry at the end of " + self.journalPath + ".", 3)
+                journalFile.truncate(end)
+        if self.offset > end:
+            self.offset = 0
+
+    def append(self, entry):
+        """ Appends an entry to the journal and only returns once it's on disk.
+
+            :param entry:   The json-encodable entry.
+
+                note::  Author(s): Mitch """
+
+        line = (json.dumps(entry, separators=(',', ':')) + '\n').encode()
+        with self.lock:
+            with open(self.journalPath, 'ab') as journalFile:
+                journalFile.write(line)
+                journalFile.flush()
+                fsync(journalFile.fileno())
+
+    def read(self, maxEntries: int):
+        """ Reads the entries following the committed offset. A line that isn't complete yet is left for later, a line
+        that can't be decoded is skipped.
+
+            :param maxEntries:  The maximum number of entries to read.
+
+            :return:            Tuple of the list of entries read and the offset following the last of them.
+
+                note::  Author(s): Mitch """
+
+        entries = []
+        with self.lock:
+            offset = self.offset
+            if not exists(self.journalPath):
+                return entries, offset
+            with open(self.journalPath, 'rb') as journalFile:
+                journalFile.seek(offset)
+                while len(entries) < maxEntries:
+                    line = journalFile.readline()
+                    if not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        log("Skipping an unreadable entry in " + self.journalPath + " at offset " +
+                            str(offset - len(line)) + ".", 3)
+        return entries, offset
+
+    def commit(self, offset: int):
+        """ Commits the offset up to which the journal was consumed. The journal is removed once all of it was
+        consumed. The offset is reset before, so if bfa stops in between the journal is only consumed again.
+
+            :param offset:  The offset in bytes.
+
+                note::  Author(s): Mitch """
+
+        with self.lock:
+            consumed = exists(self.journalPath) and offset >= getsize(self.journalPath)
+            if consumed:
+                offset = 0
+            with open(self.journalPath + '.offset.tmp', 'w') as offsetFile:
+                offsetFile.write(str(offset))
+                offsetFile.flush()
+                fsync(offsetFile.fileno())
+            replace(self.journalPath + '.offset.tmp', self.journalPath + '.offset')
+            if consumed:
+                remove(self.journalPath)
+            self.offset = offset
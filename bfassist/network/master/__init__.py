@@ -10,9 +10,15 @@ is used by the master server to handle requests incoming from the clients. Again
 simple modularisation of the request handler. Although it was not necessary to do this for the server-side it seemed
 logical to do this analogue to the client.
 
+The master server itself is the asynchronous tcp server of the asynctcpserver module, the threaded tcp server is kept
+for compatibility.
+
     Dependencies:
-        master -\-> baserequesthandler
-                 -> leaguerequesthandler
+        master -|-> asynctcpserver
+                |-> baserequesthandler
+                |-> foldersignatures
+                |-> leaguerequesthandler
+                \-> threadedtcpserver
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
@@ -21,6 +27,7 @@ from os import listdir
 
 from bfassist.network.master.baserequesthandler import ThreadedTCPBaseRequestHandler
 from bfassist.network.master.threadedtcpserver import BFA_ThreadedMasterTCPServer
+from bfassist.network.master.asynctcpserver import BFA_AsyncMasterTCPServer
 
 
 # noinspection PyUnusedLocal
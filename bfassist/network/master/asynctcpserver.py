@@ -0,0 +1,453 @@
+#############################################################################
+#
+#
+#   Async TCP Server network Module to BFA Master
+#
+#
+#############################################################################
+""" This module provides an asynchronous tcp server for answering requests coming in from bfa clients using
+SSL-encryption. All connections are served by a single asyncio event loop, so a connection that is idle, e.g. a client
+with a persistent session between two remote calls, costs neither a thread nor a blocking sleep. Only while a remote
+call is answered its request handler runs on a bounded executor, because the handlers block and touch the database.
+The handlers are driven unchanged through a socket-like view of the asyncio stream.
+
+A handler only gets a worker once the handshake or the first frame of a remote call has been received on the event
+loop, and while it runs no receive or send may block it for longer than the step timeout. So clients that stall or
+trickle their messages can't occupy the workers.
+
+The number of connections served at once is limited and further connections are refused. When the server shuts down it
+stops accepting connections, closes the idle ones and gives the remote calls in progress a grace period to finish.
+
+    Dependencies:
+
+        bfassist <- (network.master.)asynctcpserver
+            |
+            |-> bfa_logging
+            |-> certificates
+            \-> network -> framing
+             -> network -> master
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+from asyncio import AbstractEventLoop, AbstractServer, StreamReader, StreamWriter, new_event_loop, \
+    run_coroutine_threadsafe, start_server, wait_for, wait, wrap_future, current_task, CancelledError, \
+    TimeoutError as AsyncTimeoutError
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from os.path import exists
+from random import randint
+from socket import timeout
+from socketserver import BaseRequestHandler
+from ssl import SSLContext, PROTOCOL_TLS_SERVER
+from threading import Thread
+from uuid import getnode
+
+from bfassist.bfa_logging import log
+from bfassist.certificates import generateCert
+from bfassist.network.framing import CHUNK_SIZE, FRAME_HEADER, MAX_FRAME_SIZE, handshakeBytes
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+def createTLSContext(pemchain: str = None):
+    """ Function that creates the TLS context of the master server. Creates a certificate on the fly if none is
+    present.
+
+        :param pemchain:    The server key/cert-chain. The cert is usually self-signed so not really a chain.
+
+        :return:            The TLS context.
+
+            note::  Author(s): Mitch """
+
+    if not pemchain:
+        if not exists('bfassist/certificates/master_bfa.pem'):
+            log('No certificate found. Generating a new one.', 1)
+            generateCert('admin@bfa.net', 'BF-A', 'eu', '-', '-', 'BF-A', str(getnode()), randint(0, 2 ** 16 - 1), 0,
+                         pem="master")
+        pemchain = 'bfassist/certificates/master_bfa.pem'
+
+    context = SSLContext(PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(pemchain)
+    return context
+
+
+class StreamConnection:
+    """ A blocking socket-like view of an asyncio stream so the request handlers can run unchanged on the executor.
+    Every receive and send is handed to the event loop and waited for.
+
+        :param loop:        The event loop serving the stream.
+        :param reader:      The reader of the stream.
+        :param writer:      The writer of the stream.
+        :param buffer:      Bytes received while the connection was idle that weren't read by the handler yet.
+        :param timeout:     Seconds a receive or send may block before socket.timeout is raised.
+        :param maxTimeout:  The longest timeout the handler may set or None for no limit.
+        :param busy:        Flag if a remote call is answered on the connection right now.
+        :param closed:      Flag if the connection was closed.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, loop: AbstractEventLoop, reader: StreamReader, writer: StreamWriter, buffer: bytearray = None,
+                 timeout: float = None, maxTimeout: float = None, busy: bool = False, closed: bool = False):
+
+        self.loop = loop
+        self.reader = reader
+        self.writer = writer
+        if buffer:
+            self.buffer = buffer
+        else:
+            self.buffer = bytearray()
+        self.timeout = timeout
+        self.maxTimeout = maxTimeout
+        self.busy = busy
+        self.closed = closed
+
+    def settimeout(self, value: float):
+        """ Simple function to set the timeout of blocking receives and sends. Timeouts longer than the maximum timeout
+        are cut to it.
+
+            :param value:   The timeout in seconds or None to block indefinitely.
+
+                note::  Author(s): Mitch """
+
+        if self.maxTimeout is not None and (value is None or value > self.maxTimeout):
+            value = self.maxTimeout
+        self.timeout = value
+
+    def call(self, coroutine):
+        """ Runs a coroutine on the event loop and waits for its result.
+
+            :param coroutine:   The coroutine to run.
+
+            :return:            The result of the coroutine.
+
+                note::  Author(s): Mitch """
+
+        if self.closed:
+            coroutine.close()
+            raise ConnectionResetError("The connection was closed.")
+
+        future = run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise timeout("timed out")
+            return future.result()
+
+    def recv(self, bufsize: int):
+        """ Receives at most bufsize bytes. Bytes received while the connection was idle are returned first.
+
+            :param bufsize: The maximum number of bytes to receive.
+
+            :return:        The bytes received, empty if the client closed the connection.
+
+                note::  Author(s): Mitch """
+
+        if self.buffer:
+            data = bytes(self.buffer[:bufsize])
+            del self.buffer[:bufsize]
+            return data
+        return self.call(self.reader.read(bufsize))
+
+    def recv_into(self, buffer, nbytes: int = 0):
+        """ Receives at most nbytes bytes into a buffer.
+
+            :param buffer:  The buffer to receive into.
+            :param nbytes:  The maximum number of bytes to receive, 0 for the size of the buffer.
+
+            :return:        The number of bytes received.
+
+                note::  Author(s): Mitch """
+
+        data = self.recv(nbytes or len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def sendall(self, data: bytes):
+        """ Sends all of the data.
+
+            :param data:    The bytes to send.
+
+                note::  Author(s): Mitch """
+
+        self.call(self.write(data))
+
+    def sendfile(self, file):
+        """ Sends the rest of a file in chunks.
+
+            :param file:    The file opened in binary mode.
+
+                note::  Author(s): Mitch """
+
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            self.sendall(chunk)
+
+    async def write(self, data: bytes):
+        """ Writes data to the stream and waits until it's flushed enough to continue.
+
+            :param data:    The bytes to write.
+
+                note::  Author(s): Mitch """
+
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def fill(self, idleTimeout: float):
+        """ Waits on the event loop until the client sends something unless something was received already.
+
+            :param idleTimeout: Seconds to wait.
+
+            :return:            True if there's something to read, False if the client is gone or stayed idle.
+
+                note::  Author(s): Mitch """
+
+        if self.buffer:
+            return True
+        try:
+            data = await wait_for(self.reader.read(CHUNK_SIZE), idleTimeout)
+        except (AsyncTimeoutError, OSError):
+            return False
+        self.buffer += data
+        return bool(data)
+
+    async def fillTo(self, count: int, fillTimeout: float):
+        """ Receives on the event loop until at least count bytes are buffered.
+
+            :param count:       The number of bytes to buffer.
+            :param fillTimeout: Seconds the bytes may take to arrive altogether.
+
+            :return:            True if the bytes are buffered, False if the client is gone or too slow.
+
+                note::  Author(s): Mitch """
+
+        async def receive():
+            while len(self.buffer) < count:
+                data = await self.reader.read(min(count - len(self.buffer), CHUNK_SIZE))
+                if not data:
+                    return False
+                self.buffer += data
+            return True
+
+        try:
+            return await wait_for(receive(), fillTimeout)
+        except (AsyncTimeoutError, OSError):
+            return False
+
+    def abort(self):
+        """ Closes the connection at once. Handlers waiting on it fail instead of waiting for their timeout.
+
+                note::  Author(s): Mitch """
+
+        self.closed = True
+        self.writer.transport.abort()
+
+
+class BFA_AsyncMasterTCPServer:
+    """ Master server answering the requests of the clients on a single event loop. The request handlers run on a
+    bounded executor.
+
+        :param host:                The host name (or ip) to listen on.
+        :param port:                The port to listen on.
+        :param pemchain:            The server key/cert-chain. The cert is usually self-signed so not really a chain.
+        :param RequestHandlerClass: The class to handle the incoming requests.
+        :param maxConnections:      The maximum number of connections served at once, further ones are refused.
+        :param maxWorkers:          The maximum number of remote calls answered at once.
+        :param gracePeriod:         Seconds the remote calls in progress get to finish when the server shuts down.
+        :param stepTimeout:         Seconds the handshake or the first frame of a remote call may take to arrive and
+                                    the longest a handler may block on a single receive or send.
+        :param loop:                The event loop serving the connections.
+        :param executor:            The executor the request handlers run on.
+        :param server:              The asyncio server listening for connections.
+        :param server_thread:       The thread the event loop will run on.
+        :param connections:         Dictionary containing the tasks serving the connections as keys and the connections
+                                    as values.
+        :param steps:               Set of the futures of the handler steps submitted to the executor.
+        :param closing:             Flag if the server is shutting down.
+
+            note:: Author(s): Mitch """
+
+    def __init__(self, host: str, port: int, pemchain: str = None, RequestHandlerClass: BaseRequestHandler = None,
+                 maxConnections: int = 2048, maxWorkers: int = 32, gracePeriod: float = 30., stepTimeout: float = 30.,
+                 loop: AbstractEventLoop = None, executor: ThreadPoolExecutor = None, server: AbstractServer = None,
+                 server_thread: Thread = None, connections: dict = None, steps: set = None, closing: bool = False):
+        from bfassist.network.master import ThreadedTCPRequestHandler
+
+        self.host = host
+        self.port = port
+        self.pemchain = pemchain
+
+        if RequestHandlerClass:
+            self.RequestHandlerClass = RequestHandlerClass
+        else:
+            self.RequestHandlerClass = ThreadedTCPRequestHandler
+        self.maxConnections = maxConnections
+        self.maxWorkers = maxWorkers
+        self.gracePeriod = gracePeriod
+        self.stepTimeout = stepTimeout
+
+        if loop:
+            self.loop = loop
+        else:
+            self.loop = new_event_loop()
+        if executor:
+            self.executor = executor
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix='BFA-Master')
+        if server:
+            self.server = server
+        else:
+            self.server = self.loop.run_until_complete(start_server(
+                self.serveConnection, self.host, self.port, ssl=createTLSContext(self.pemchain),
+                backlog=min(self.maxConnections, 1024), start_serving=False))
+
+        if server_thread:
+            self.server_thread = server_thread
+        else:
+            self.server_thread = Thread(target=self.loop.run_forever, name='BFA-Master-Loop')
+        if connections:
+            self.connections = connections
+        else:
+            self.connections = {}
+        if steps:
+            self.steps = steps
+        else:
+            self.steps = set()
+        self.closing = closing
+
+    async def serveConnection(self, reader: StreamReader, writer: StreamWriter):
+        """ Serves a connection from the handshake to its last remote call. The connection waits on the event loop
+        while it's idle and until the handshake or the first frame of a remote call is received, then each of them is
+        answered by a request handler on the executor.
+
+            :param reader:  The reader of the connection.
+            :param writer:  The writer of the connection.
+
+                note:: Author(s): Mitch """
+
+        client_address = writer.get_extra_info('peername')[:2]
+        if self.closing or len(self.connections) >= self.maxConnections:
+            log("Refusing connection from " + str(client_address) + ", " + str(len(self.connections)) +
+                " connections are served already.", 2)
+            writer.transport.abort()
+            return
+
+        handler = self.RequestHandlerClass.__new__(self.RequestHandlerClass)
+        connection = StreamConnection(self.loop, reader, writer, timeout=self.stepTimeout, maxTimeout=self.stepTimeout)
+        handler.request, handler.client_address, handler.server = connection, client_address, self
+        task = current_task()
+        self.connections[task] = connection
+
+        try:
+            persistent = await connection.fill(handler.sessionTimeout) and \
+                await connection.fillTo(len(handshakeBytes()), self.stepTimeout)
+            if persistent:
+                await self.answer(connection, handler.handshake)
+            while persistent and not self.closing and await connection.fill(handler.sessionTimeout) and \
+                    await self.receiveFrame(connection, handler):
+                persistent = await self.answer(connection, handler.serveRemoteCall)
+        except CancelledError:
+            log("Stopped serving " + str(client_address) + " in the middle of a remote call.", 3)
+        except Exception as error:
+            log("Error while serving " + str(client_address) + ": " + repr(error), 3)
+        finally:
+            self.connections.pop(task, None)
+            connection.closed = True
+            writer.close()
+
+    async def receiveFrame(self, connection: StreamConnection, handler: BaseRequestHandler):
+        """ Receives the first frame of a remote call on the event loop, so the handler doesn't wait for it on the
+        executor. Connections with the legacy protocol aren't framed and only wait for their first bytes.
+
+            :param connection:  The connection the remote call is received on.
+            :param handler:     The handler of the connection.
+
+            :return:            True if the frame was received, False if the client is gone, too slow or announced a
+                                frame that's too large.
+
+                note:: Author(s): Mitch """
+
+        if not handler.isFramed():
+            return True
+        if not await connection.fillTo(FRAME_HEADER.size, self.stepTimeout):
+            return False
+        length = FRAME_HEADER.unpack_from(connection.buffer)[1]
+        if length > MAX_FRAME_SIZE:
+            log(str(handler.client_address) + " announced a frame of " + str(length) + " bytes, closing the "
+                "connection.", 3)
+            return False
+        return await connection.fillTo(FRAME_HEADER.size + length, self.stepTimeout)
+
+    async def answer(self, connection: StreamConnection, step):
+        """ Runs a step of a request handler on the executor and marks the connection busy meanwhile.
+
+            :param connection:  The connection the handler answers on.
+            :param step:        The method of the handler to run.
+
+            :return:            The result of the method.
+
+                note:: Author(s): Mitch """
+
+        connection.busy = True
+        future = self.executor.submit(step)
+        self.steps.add(future)
+        try:
+            return await wrap_future(future, loop=self.loop)
+        finally:
+            self.steps.discard(future)
+            connection.busy = False
+
+    def startup(self):
+        """ Simple startup function for the master to start serving. The folder signatures are precomputed first.
+
+                note:: Author(s): Mitch """
+
+        self.RequestHandlerClass.precomputeFolderSignatures()
+        self.server_thread.start()
+        run_coroutine_threadsafe(self.server.start_serving(), self.loop).result()
+
+        log("Master server running.")
+
+    async def close(self):
+        """ Stops accepting connections, closes the idle ones and waits for the remote calls in progress until the
+        grace period is over. Connections that are still busy afterwards are aborted and their handlers left behind.
+
+                note:: Author(s): Mitch """
+
+        self.closing = True
+        self.server.close()
+
+        for connection in list(self.connections.values()):
+            if not connection.busy:
+                connection.abort()
+
+        tasks = list(self.connections)
+        if tasks:
+            pending = (await wait(tasks, timeout=self.gracePeriod))[1]
+            if pending:
+                log("Aborting " + str(len(pending)) + " remote calls that didn't finish in time.", 3)
+                for task in pending:
+                    self.connections[task].abort()
+                    task.cancel()
+                await wait(pending)
+
+    def shutdown(self):
+        """ Simple shutdown function for the master to stop serving gracefully.
+
+                note:: Author(s): Mitch """
+
+        if self.server_thread.is_alive():
+            run_coroutine_threadsafe(self.close(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.server_thread.join()
+        # steps that didn't start yet are cancelled, executor.shutdown can only do that itself since python 3.9
+        for future in list(self.steps):
+            future.cancel()
+        self.executor.shutdown(wait=False)
+        self.loop.close()
@@ -13,12 +13,17 @@ used to keep associated client and server functions aligned on the same line of
         bfassist <- (network.master.)baserequesthandler
             |
             |-> bfa_logging
-            \-> references
-             -> network
+            |-> network
+            |-> network -> framing
+            \-> network -> master -> foldersignatures
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
 import json
+from collections import OrderedDict
+from itertools import chain
+from secrets import token_hex
+from threading import Lock
 from pathlib import Path
 from time import sleep
 from socket import timeout
@@ -26,8 +31,10 @@ from os.path import getsize
 from socketserver import BaseRequestHandler
 
 from bfassist.bfa_logging import log
-from bfassist.references import shaForFile
-from bfassist.network import BFA_Settings
+from bfassist.network import CONFIG, BFA_Settings
+import bfassist.network.framing as framing
+from bfassist.network.delta import DELTA_THRESHOLD, readRanges, chooseCodec, compressChunks
+from bfassist.network.master.foldersignatures import FOLDER_SIGNATURES
 
 
 # noinspection PyUnusedLocal
@@ -54,6 +61,7 @@ DEFAULT_EXEMPTIONS = {
     'bfassist/references/binaries/league',
     'bfassist/references/eventlogs',
     'bfassist/references/maps/league',
+    'bfassist/references/store',
     'bfassist/standalone/admin/administrationleague'
 }
 
@@ -73,10 +81,41 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
         :param serversOf:   A dictionary containing client ips as keys and global server signatures of the servers on
                             the client when it last connected.
 
+        :param protocolVersion: The protocol version agreed on with the client of the current connection.
+        :param pushback:        Bytes read while checking for a handshake that belong to the first legacy request.
+
+        :param sessions:        Ordered dictionary containing session tokens as keys and the client ip, signature hash,
+                                config and servers of the session as values. The least recently used sessions are
+                                dropped first once there are more than maxSessions.
+        :param sessionLock:     Lock guarding the sessions across the handler threads.
+        :param maxSessions:     The maximum number of sessions to remember.
+        :param sessionTimeout:  Seconds a persistent connection may stay idle before the master closes it.
+
+        :param answeredCalls:       Ordered dictionary containing the idempotency keys of calls made with callOnce as
+                                    keys and their results as values. The oldest are dropped first once there are more
+                                    than maxAnsweredCalls.
+        :param answeredLock:        Lock guarding the answered calls across the handler threads.
+        :param maxAnsweredCalls:    The maximum number of answered calls to remember.
+
+        :param batch_requests:  A dictionary containing the names of functions that can be called as part of a batch as
+                                keys and the functions as values. The functions take their json-decoded argument if
+                                there is one and return a json-encodable result.
+
             note:: Author(s): Mitch """
 
     configOf = {}
     serversOf = {}
+    protocolVersion = framing.LEGACY_PROTOCOL_VERSION
+    pushback = b''
+
+    sessions = OrderedDict()
+    sessionLock = Lock()
+    maxSessions = 1024
+    sessionTimeout = 300
+
+    answeredCalls = OrderedDict()
+    answeredLock = Lock()
+    maxAnsweredCalls = 4096
 
     #
     #
@@ -117,20 +156,39 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
     #
     #
     #
+    #
 
     def handle(self):
         """ Handle all requests from here. Don't let them off the hook before the request has been fully handled.
-        Otherwise the connection is lost and has to be reestablished.
+        Otherwise the connection is lost and has to be reestablished. Clients with a persistent session may declare
+        further remote calls on the same connection until it idles for longer than the session timeout.
 
                 note:: Author(s): Mitch """
 
-        data = self.receiveJSON()
-        if data and 'CONFIG' in data:
-            self.configOf[self.client_address] = data['CONFIG']
-            if 'SERVERS' in data:
-                self.serversOf[self.client_address] = data['SERVERS']
-            self.sendString("Success: Client signature received.")
-            self.receiveRemoteCall()
+        self.handshake()
+        while self.serveRemoteCall():
+            self.request.settimeout(self.sessionTimeout)
+
+    def serveRemoteCall(self):
+        """ Serves a single remote call from the client signature preceding it to the answer. The asynchronous master
+        server calls this for every remote call of a connection on its executor.
+
+            :return:    True if the connection stays open for another remote call, false otherwise.
+
+                note:: Author(s): Mitch """
+
+        if not self.receiveClientSignature():
+            return False
+        self.receiveRemoteCall()
+        return self.isPersistent()
+
+    #
+    #
+    #
+    #
+    #
+    #
+    #
 
     def receiveRemoteCall(self):
         """ Used to receive a client request for a remote function call.
@@ -146,6 +204,73 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
             log('Received data:  ' + data + ' from a client : ' + str(self.client_address) + ' Unknown request type...',
                 3)
 
+    def receiveClientSignature(self):
+        """ Used to receive the client signature preceding every remote call. Clients with a persistent session only
+        send their session token and the hash of their signature if it didn't change.
+
+            :return:    True if the signature was received, false if the client is gone or didn't send one.
+
+                note::  Author(s): Mitch """
+
+        try:
+            data = self.receiveJSON()
+        except OSError:
+            return False
+        if not isinstance(data, dict):
+            return False
+
+        if 'CONFIG' in data:
+            self.configOf[self.client_address] = data['CONFIG']
+            if 'SERVERS' in data:
+                self.serversOf[self.client_address] = data['SERVERS']
+            self.sendString("Success: Client signature received.")
+            if self.isPersistent():
+                self.sendString(self.openSession(data))
+            return True
+
+        elif 'SESSION' in data and self.isPersistent():
+            with self.sessionLock:
+                session = self.sessions.get(data['SESSION'])
+                if session and session['ADDRESS'] == self.client_address[0] and \
+                        session['SIGNATURE'] == data.get('SIGNATURE'):
+                    self.sessions.move_to_end(data['SESSION'])
+                else:
+                    session = None
+            if session:
+                self.configOf[self.client_address] = session['CONFIG']
+                if session['SERVERS'] is not None:
+                    self.serversOf[self.client_address] = session['SERVERS']
+                self.sendString("Success: Client signature received.")
+                return True
+            self.sendString("Error: Unknown session.")
+            return self.receiveClientSignature()
+
+        return False
+
+    def openSession(self, signature: dict):
+        """ Opens a session for the client signature just received or updates the session the client already has.
+
+            :param signature:   The client signature including the session token and hash sent by the client.
+
+            :return:            The token of the session.
+
+                note::  Author(s): Mitch """
+
+        with self.sessionLock:
+            token = signature.get('SESSION')
+            if token not in self.sessions or self.sessions[token]['ADDRESS'] != self.client_address[0]:
+                token = token_hex(16)
+            self.sessions[token] = {
+                'ADDRESS': self.client_address[0],
+                'SIGNATURE': signature.get('SIGNATURE'),
+                'CONFIG': signature['CONFIG'],
+                'SERVERS': signature.get('SERVERS')
+            }
+            self.sessions.move_to_end(token)
+            while len(self.sessions) > self.maxSessions:
+                self.sessions.popitem(last=False)
+        return token
+
     #
     #
     #
@@ -164,15 +289,62 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
     #
     #
 
+    def handshake(self):
+        """ Simple function to agree on the protocol version with the client. Clients that don't start with a
+        handshake only understand the legacy protocol, the bytes read from them are kept for their first request.
+
+                note:: Author(s): Mitch """
+
+        self.protocolVersion = framing.LEGACY_PROTOCOL_VERSION
+        self.pushback = framing.receiveExactly(self.request, len(framing.handshakeBytes()))
+        version = framing.parseHandshake(self.pushback)
+
+        if version is not None:
+            self.protocolVersion = min(version, framing.PROTOCOL_VERSION)
+            self.pushback = b''
+            self.request.sendall(framing.handshakeBytes(self.protocolVersion))
+
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+
+    def isFramed(self):
+        """ Simple function to check if messages are exchanged with the framed protocol.
+
+            :return:    True if the framed protocol is used, false for the legacy protocol.
+
+                note:: Author(s): Mitch """
+
+        return self.protocolVersion > framing.LEGACY_PROTOCOL_VERSION
+
+    def isPersistent(self):
+        """ Simple function to check if the connection is kept open for more than one remote call.
+
+            :return:    True if the client has a persistent session, false otherwise.
+
+                note:: Author(s): Mitch """
+
+        return self.protocolVersion >= framing.SESSION_PROTOCOL_VERSION
+
     def getRequest(self):
         """ Simple function to get a request (or response). Assumes end of transmission when data wasn't received for
-         more than 3 seconds (not necessarily consecutive).
+         more than 3 seconds (not necessarily consecutive) unless the framed protocol is used.
 
             :return:    The request if any otherwise empty string.
 
                 note::  Author(s): Mitch """
 
-        request = str(self.request.recv(1024), 'utf-8')
+        if self.isFramed():
+            return framing.receiveString(self.request)
+
+        request = str(self.pushback + self.request.recv(1024), 'utf-8')
+        self.pushback = b''
         rTimeout = 3
         while request == '' and rTimeout > 0:
             sleep(1)
@@ -184,10 +356,13 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
     def getRestOfRequest(self):
         """ Simple function to receive the rest of a request.
 
-            :return:    Rest of the response.
+            :return:    Rest of the response. Always empty with the framed protocol.
 
                 note::  Author(s): Mitch """
 
+        if self.isFramed():
+            return ""
+
         request = ""
         rPart = ""
         self.request.settimeout(.5)
@@ -209,7 +384,10 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
 
                 note::  Author(s): Mitch """
 
-        self.request.sendall(bytes(s, 'utf-8'))
+        if self.isFramed():
+            framing.sendString(self.request, s)
+        else:
+            self.request.sendall(bytes(s, 'utf-8'))
 
     def sendAsJSON(self, message):
         """ Simple function to transmit a message via json in utf-8 encoding given that it's json-encodable.
@@ -218,6 +396,9 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
 
                 note::  Author(s): Mitch """
 
+        if self.isFramed():
+            framing.sendJSON(self.request, message)
+            return
         if isinstance(message, set):
             message = list(message)
         self.request.sendall(bytes(json.dumps(message), 'utf-8'))
@@ -267,7 +448,8 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
     def createFolderSignature(fPath: Path, exemptions: list = None):
         """ Creates a 'folder signature' which is a dictionary containing each file with its respective directory
         structure plus their respective sha-256 hash. A list of substrings to exclude when creating the signature can be
-        specified. This way certain file types or folders can be exempt from the signature.
+        specified. This way certain file types or folders can be exempt from the signature. Digests and signatures are
+        served from the folder signature cache as long as the files didn't change.
 
             :param fPath:       The path to the folder to create a signature for.
             :param exemptions:  A list of file substrings to ignore.
@@ -276,12 +458,11 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
 
                 note::  Author(s): Mitch """
 
-        filtered = {}
-        for cPath in fPath.glob('**/*'):
-            if not cPath.is_dir() and \
-                    (exemptions is None or not any([True if x in str(cPath) else False for x in exemptions])):
-                filtered[str(cPath).split(fPath.name)[1] if fPath.name else str(cPath)] = shaForFile(str(cPath))
-        return filtered
+        return FOLDER_SIGNATURES.signature(fPath, exemptions)
+
+    #
+    #
+    #
 
     def calculateDifferences(self):
         """ Assists the client to calculate a serialised list of files that differ between the version of the client and
@@ -293,12 +474,98 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
 
         clientConfig = self.configOf[self.client_address]
 
-        if 'league-extensions' in clientConfig[BFA_Settings] and clientConfig[BFA_Settings]['league-extensions']:
-            fullFolderSignature = self.createFolderSignature(Path('.'),
-                                                             list(DEFAULT_EXEMPTIONS.difference(LEAGUE_EXTENSIONS)))
+        self.sendAsJSON(self.createFullFolderSignature('league-extensions' in clientConfig[BFA_Settings] and
+                                                       clientConfig[BFA_Settings]['league-extensions']))
+
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+
+    def calculateTreeDifferences(self):
+        """ Assists the client to calculate the files that differ between the version of the client and the master by
+        comparing the merkle tree of the full folder signature. The client sends the hashes of directories and receives
+        the listings of the ones that differ until it sends nothing anymore.
+
+                note:: Author(s): Mitch """
+
+        clientConfig = self.configOf[self.client_address]
+        tree = self.createFullFolderTree('league-extensions' in clientConfig[BFA_Settings] and
+                                         clientConfig[BFA_Settings]['league-extensions'])
+
+        directories = self.receiveJSON()
+        while directories:
+            self.sendAsJSON(tree.differingListings(directories))
+            directories = self.receiveJSON()
+
+    @staticmethod
+    def createFullFolderSignature(leagueExtensions: bool):
+        """ Creates the full folder signature of the bfa files for clients with or without the league extensions.
+
+            :param leagueExtensions:    Flag if the client runs the league extensions.
+
+            :return:                    The dictionary containing the signature.
+
+                note:: Author(s): Mitch """
+
+        if leagueExtensions:
+            return ThreadedTCPBaseRequestHandler.createFolderSignature(
+                Path('.'), list(DEFAULT_EXEMPTIONS.difference(LEAGUE_EXTENSIONS)))
+        else:
+            return ThreadedTCPBaseRequestHandler.createFolderSignature(Path('.'), list(DEFAULT_EXEMPTIONS))
+
+    @staticmethod
+    def createFullFolderTree(leagueExtensions: bool):
+        """ Creates the merkle tree of the full folder signature for clients with or without the league extensions.
+
+            :param leagueExtensions:    Flag if the client runs the league extensions.
+
+            :return:                    The merkle tree of the signature.
+
+                note:: Author(s): Mitch """
+
+        if leagueExtensions:
+            return FOLDER_SIGNATURES.tree(Path('.'), list(DEFAULT_EXEMPTIONS.difference(LEAGUE_EXTENSIONS)))
         else:
-            fullFolderSignature = self.createFolderSignature(Path('.'), list(DEFAULT_EXEMPTIONS))
-        self.sendAsJSON(fullFolderSignature)
+            return FOLDER_SIGNATURES.tree(Path('.'), list(DEFAULT_EXEMPTIONS))
+
+    @staticmethod
+    def precomputeFolderSignatures():
+        """ Creates both variants of the full folder signature and their merkle trees so the cache is warm before the
+        first client asks.
+
+                note:: Author(s): Mitch """
+
+        ThreadedTCPBaseRequestHandler.createFullFolderTree(True)
+        ThreadedTCPBaseRequestHandler.createFullFolderTree(False)
+
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
 
     def sendFiles(self):
         """ Send requested files to the client.
@@ -310,6 +577,11 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
         log(str(self.client_address) + " asks for " + data, 0)
         client_need = json.loads(data)
 
+        if self.isFramed():
+            for file in client_need:
+                framing.sendFile(self.request, file)
+            return
+
         for file in client_need:
             fileSize = getsize(file)
             with open(file, "rb") as f:
@@ -349,6 +621,94 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
     #
     #
     #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+
+    def sendDeltaFiles(self):
+        """ Send requested files to the client compressed and, if the client has an older copy of a file, only the
+        blocks of the file the client is missing. Only files of the full folder signature for the client are sent.
+
+                note:: Author(s): Mitch """
+
+        clientConfig = self.configOf[self.client_address]
+        signature = self.createFullFolderSignature('league-extensions' in clientConfig[BFA_Settings] and
+                                                   clientConfig[BFA_Settings]['league-extensions'])
+
+        request = self.receiveJSON()
+        log(str(self.client_address) + " asks for " + str(request['FILES']), 0)
+        local = set(request['LOCAL'])
+
+        offers = {}
+        for file in request['FILES']:
+            if file not in signature:
+                continue
+            if file in local and getsize(file) >= DELTA_THRESHOLD:
+                sha, blocks = FOLDER_SIGNATURES.blocks(file)
+                offers[file] = dict(blocks, DIGEST=sha)
+            else:
+                offers[file] = {'DIGEST': signature[file]}
+        self.sendAsJSON(offers)
+
+        # the client needs some time to match the blocks of its old copies
+        self.request.settimeout(self.sessionTimeout)
+        wanted = self.receiveJSON()
+        self.request.settimeout(5)
+        if not isinstance(wanted, dict):
+            return
+        for file, ranges in wanted.items():
+            if file not in offers:
+                log(str(self.client_address) + " asks for " + str(file) + " which it wasn't offered.", 3)
+                continue
+            chunks = readRanges(file, offers[file].get('BLOCKSIZE', 0), ranges)
+            sample = next(chunks, b'')
+            codec = chooseCodec(sample, request['CODECS'])
+            self.sendString(codec)
+            framing.sendChunks(self.request, compressChunks(chain([sample], chunks), codec))
+
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+
+    def sendRevision(self):
+        """ Sends the current revision of the master to the client. Besides stage, branch and revision it contains the
+        root hash of the full folder signature for the client, so the client can tell if anything changed without
+        calculating the differences.
+
+                note:: Author(s): Mitch """
+
+        clientConfig = self.configOf[self.client_address]
+        tree = self.createFullFolderTree('league-extensions' in clientConfig[BFA_Settings] and
+                                         clientConfig[BFA_Settings]['league-extensions'])
+
+        self.sendAsJSON({
+            'STAGE': CONFIG[BFA_Settings].get('stage'),
+            'BRANCH': CONFIG[BFA_Settings].get('branch'),
+            'REVISION': CONFIG[BFA_Settings].get('revision'),
+            'SIGNATURE': tree.getRootHash()
+        })
+
     #
     #
     #   # Client getUpdate
@@ -374,8 +734,98 @@ class ThreadedTCPBaseRequestHandler(BaseRequestHandler):
     #
     #
     #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+    #
+
+    def receiveBatch(self):
+        """ Used to receive a batch of remote calls. Every call of the batch is processed in order and the results are
+        sent back to the client in one exchange. Malformed or unknown calls get None as result and calls that fail get
+        False, so the client always receives an answer.
+
+                note::  Author(s): Mitch """
+
+        calls = self.receiveJSON()
+        if not isinstance(calls, list):
+            log('Received a malformed batch from a client : ' + str(self.client_address), 3)
+            self.sendAsJSON(None)
+            return
+
+        results = []
+        for call in calls:
+            if not isinstance(call, list) or len(call) != 2:
+                log('Received a malformed batch call from a client : ' + str(self.client_address), 3)
+                results.append(None)
+                continue
+            rfName, argument = call
+            if not isinstance(rfName, str) or rfName not in self.batch_requests:
+                log('Received batch call: ' + str(rfName) + ' from a client : ' + str(self.client_address) +
+                    ' Unknown request type...', 3)
+                results.append(None)
+                continue
+            try:
+                if argument is None:
+                    results.append(self.batch_requests[rfName](self))
+                else:
+                    results.append(self.batch_requests[rfName](self, argument))
+            except Exception as error:
+                log('Batch call: ' + rfName + ' from a client : ' + str(self.client_address) + ' failed: ' +
+                    repr(error), 3)
+                results.append(False)
+        self.sendAsJSON(results)
+
+    def callOnce(self, keyedCall: list):
+        """ Calls a batchable function unless a call with the same idempotency key was answered already, in which case
+        the result of that call is returned again. Lets clients safely repeat calls they didn't get an answer for.
+
+            :param keyedCall:   List of the idempotency key, the name of the batchable function and its argument.
+
+            :return:            The result of the call, False if the call failed or None if it's malformed or unknown.
+
+                note::  Author(s): Mitch """
+
+        if not isinstance(keyedCall, list) or len(keyedCall) != 3 or keyedCall[1] not in self.batch_requests:
+            return None
+        key, rfName, argument = keyedCall
+
+        with self.answeredLock:
+            if key in self.answeredCalls:
+                return self.answeredCalls[key]
+
+        try:
+            if argument is None:
+                result = self.batch_requests[rfName](self)
+            else:
+                result = self.batch_requests[rfName](self, argument)
+        except Exception as error:
+            log("Rejecting the call " + str(rfName) + " with key " + str(key) + " from " + str(self.client_address) +
+                ": " + repr(error), 3)
+            result = False
+
+        if result is not None:
+            with self.answeredLock:
+                self.answeredCalls[key] = result
+                while len(self.answeredCalls) > self.maxAnsweredCalls:
+                    self.answeredCalls.popitem(last=False)
+        return result
+
+    batch_requests = {
+        "Once": callOnce
+    }
 
     client_requests = {
         "calculateDifferences": calculateDifferences,
-        "getFiles": sendFiles
+        "calculateTreeDifferences": calculateTreeDifferences,
+        "getFiles": sendFiles,
+        "getDeltaFiles": sendDeltaFiles,
+        "getRevision": sendRevision,
+        "Batch": receiveBatch
     }
@@ -0,0 +1,270 @@
+#############################################################################
+#
+#
+#   Folder Signatures network Module to BFA Master
+#
+#
+#############################################################################
+""" This module provides a cache for the folder signatures the master sends to its clients. The sha-256 digest of a file
+is only calculated again if its size, modification time or inode changed since it was last hashed. The digests are
+persisted in a json file so they survive restarts of the master. Finished folder signatures and their merkle trees are
+kept for a few seconds so the many clients asking for the same signature at once only cause one stat sweep of the
+folder.
+The files that changed during a sweep are hashed in parallel by the hashing service.
+The block signatures used for delta transfers are kept in memory for as long as the digest of their file doesn't change.
+
+    Dependencies:
+
+        bfassist <- (network.master.)foldersignatures
+            |
+            |-> references
+            \-> network    -> merkle
+                            -> delta
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+import json
+from os import replace, stat
+from os.path import exists
+from pathlib import Path
+from stat import S_ISDIR
+from threading import RLock
+from time import monotonic
+
+from bfassist.references import shaForFile, HASHING_SERVICE
+from bfassist.network.merkle import MerkleTree
+from bfassist.network.delta import blockSignature
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+class FolderSignatureCache:
+    """ Cache for the digests of files and the folder signatures made from them.
+
+        :param cachePath:       Path to the json file the digests are persisted in.
+        :param digests:         Dictionary containing file paths as keys and a list of the size, modification time in
+                                nanoseconds, inode and sha-256 digest of the file as values.
+        :param signatures:      Dictionary containing tuples of a folder and its exemptions as keys and a list of the
+                                time of creation, the folder signature and its merkle tree once it was needed as
+                                values.
+        :param blockSignatures: Dictionary containing file paths as keys and a list of the digest of the file and its
+                                block signature as values.
+        :param sweepInterval:   Seconds a folder signature is served before the folder is swept again.
+        :param lock:            Lock guarding the cache across the handler threads.
+        :param dirty:           Flag if digests changed since they were last persisted.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, cachePath: str, digests: dict = None, signatures: dict = None, blockSignatures: dict = None,
+                 sweepInterval: float = 5., lock: RLock = None, dirty: bool = False):
+
+        self.cachePath = cachePath
+        if digests:
+            self.digests = digests
+        else:
+            self.digests = {}
+            self.load()
+        if signatures:
+            self.signatures = signatures
+        else:
+            self.signatures = {}
+        if blockSignatures:
+            self.blockSignatures = blockSignatures
+        else:
+            self.blockSignatures = {}
+        self.sweepInterval = sweepInterval
+        if lock:
+            self.lock = lock
+        else:
+            self.lock = RLock()
+        self.dirty = dirty
+
+    def load(self):
+        """ Loads the digests persisted in the cache file if there are any.
+
+                note::  Author(s): Mitch """
+
+        if exists(self.cachePath):
+            try:
+                with open(self.cachePath, 'r') as cacheFile:
+                    self.digests = json.load(cacheFile)
+            except (OSError, ValueError):
+                self.digests = {}
+
+    def save(self):
+        """ Persists the digests in the cache file if they changed. Digests of files that don't exist anymore are
+        dropped beforehand.
+
+                note::  Author(s): Mitch """
+
+        with self.lock:
+            if not self.dirty:
+                return
+            for filePath in [filePath for filePath in self.digests if not exists(filePath)]:
+                self.digests.pop(filePath)
+            with open(self.cachePath + '.tmp', 'w') as cacheFile:
+                json.dump(self.digests, cacheFile)
+            replace(self.cachePath + '.tmp', self.cachePath)
+            self.dirty = False
+
+    def digest(self, filePath: str, fileStat=None):
+        """ Returns the sha-256 digest of a file and only hashes the file if it changed since the last time.
+
+            :param filePath:    The path to the file.
+            :param fileStat:    The result of stat for the file if it's already known.
+
+            :return:            SHA-256 hash hex-digest.
+
+                note::  Author(s): Mitch """
+
+        if fileStat is None:
+            fileStat = stat(filePath)
+
+        sha = self.cachedDigest(filePath, fileStat)
+        if sha is None:
+            sha = shaForFile(filePath)
+            self.storeDigest(filePath, fileStat, sha)
+        return sha
+
+    def cachedDigest(self, filePath: str, fileStat):
+        """ Simple function to get the cached digest of a file if the file didn't change since it was hashed.
+
+            :param filePath:    The path to the file.
+            :param fileStat:    The result of stat for the file.
+
+            :return:            SHA-256 hash hex-digest or None if the file needs to be hashed.
+
+                note::  Author(s): Mitch """
+
+        with self.lock:
+            entry = self.digests.get(filePath)
+            if entry and entry[:3] == [fileStat.st_size, fileStat.st_mtime_ns, fileStat.st_ino]:
+                return entry[3]
+        return None
+
+    def storeDigest(self, filePath: str, fileStat, sha: str):
+        """ Simple function to cache the digest of a file.
+
+            :param filePath:    The path to the file.
+            :param fileStat:    The result of stat for the file at the time it was hashed.
+            :param sha:         SHA-256 hash hex-digest.
+
+                note::  Author(s): Mitch """
+
+        with self.lock:
+            self.digests[filePath] = [fileStat.st_size, fileStat.st_mtime_ns, fileStat.st_ino, sha]
+            self.dirty = True
+
+    def createSignature(self, fPath: Path, exemptions: frozenset):
+        """ Sweeps a folder and creates its signature from the cached digests of its files. Files without a valid
+        cached digest are hashed in parallel.
+
+            :param fPath:       The path to the folder to create a signature for.
+            :param exemptions:  A set of file substrings to ignore.
+
+            :return:            The dictionary containing the signature.
+
+                note::  Author(s): Mitch """
+
+        filtered, stale = {}, {}
+        for cPath in fPath.glob('**/*'):
+            filePath = str(cPath)
+            if any([True if x in filePath else False for x in exemptions]):
+                continue
+            try:
+                fileStat = stat(filePath)
+            except OSError:
+                continue
+            if not S_ISDIR(fileStat.st_mode):
+                name = filePath.split(fPath.name)[1] if fPath.name else filePath
+                sha = self.cachedDigest(filePath, fileStat)
+                if sha is None:
+                    stale[filePath] = name, fileStat
+                else:
+                    filtered[name] = sha
+
+        for filePath, sha in HASHING_SERVICE.hashFiles(stale):
+            if sha is not None:
+                self.storeDigest(filePath, stale[filePath][1], sha)
+                filtered[stale[filePath][0]] = sha
+        return filtered
+
+    def refresh(self, fPath: Path, exemptions: list = None):
+        """ Sweeps a folder again if its signature is older than the sweep interval and persists the digests if any
+        changed.
+
+            :param fPath:       The path to the folder.
+            :param exemptions:  A list of file substrings to ignore.
+
+            :return:            The cached entry of the signature.
+
+                note::  Author(s): Mitch """
+
+        key = (str(fPath), frozenset(exemptions) if exemptions else frozenset())
+
+        with self.lock:
+            if key not in self.signatures or monotonic() - self.signatures[key][0] >= self.sweepInterval:
+                self.signatures[key] = [monotonic(), self.createSignature(fPath, key[1]), None]
+                self.save()
+            return self.signatures[key]
+
+    def signature(self, fPath: Path, exemptions: list = None):
+        """ Returns the signature of a folder. A signature younger than the sweep interval is served as it is, otherwise
+        the folder is swept again.
+
+            :param fPath:       The path to the folder to create a signature for.
+            :param exemptions:  A list of file substrings to ignore.
+
+            :return:            A copy of the dictionary containing the signature.
+
+                note::  Author(s): Mitch """
+
+        with self.lock:
+            return dict(self.refresh(fPath, exemptions)[1])
+
+    def tree(self, fPath: Path, exemptions: list = None):
+        """ Returns the merkle tree of the signature of a folder.
+
+            :param fPath:       The path to the folder to create a merkle tree for.
+            :param exemptions:  A list of file substrings to ignore.
+
+            :return:            The merkle tree of the signature.
+
+                note::  Author(s): Mitch """
+
+        with self.lock:
+            entry = self.refresh(fPath, exemptions)
+            if entry[2] is None:
+                entry[2] = MerkleTree(entry[1])
+            return entry[2]
+
+    def blocks(self, filePath: str):
+        """ Returns the block signature of a file and only calculates it again if the digest of the file changed.
+
+            :param filePath:    The path to the file.
+
+            :return:            Tuple of the sha-256 digest of the file and its block signature.
+
+                note::  Author(s): Mitch """
+
+        sha = self.digest(filePath)
+        with self.lock:
+            entry = self.blockSignatures.get(filePath)
+            if entry and entry[0] == sha:
+                return sha, entry[1]
+
+        signature = blockSignature(filePath)
+        with self.lock:
+            self.blockSignatures[filePath] = [sha, signature]
+        return sha, signature
+
+
+FOLDER_SIGNATURES = FolderSignatureCache('bfassist/network/master/foldersignatures.json')
@@ -12,13 +12,16 @@ keep associated client and server functions aligned on the same line of code.
     Dependencies:
 
         bfassist <- (network.)master <- leaguerequesthandler
-            \
-             -> master -> league
+            |
+            |-> references
+            \-> master -> league
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
 from pathlib import Path
+from os.path import exists
 
+from bfassist.references import shaForFile
 from bfassist.network.master import ThreadedTCPRequestHandler
 import bfassist.master.league as bfl
 
@@ -46,15 +49,17 @@ class LeagueMasterExtension(ThreadedTCPRequestHandler):
 
         note::  Author(s): Mitch """
 
+    #
+
     def receiveLeagueRound(self):
-        """ This function receives a bf round that should have been part or a league match and saves it to the database.
+        """ This function receives a bf round that should have been part or a league match and spools it to be stored.
 
                 note::  Author(s): Mitch """
 
         league_round = self.receiveJSON()
         if not league_round:
             return
-        bfl.LeagueRound.fromDict(league_round)
+        self.storeLeagueRound(league_round)
 
     #
     #
@@ -105,7 +110,7 @@ class LeagueMasterExtension(ThreadedTCPRequestHandler):
         player = self.receiveJSON()
         if player is None:
             return
-        if player['keyhash'] in bfl.LeaguePlayers:
+        if self.isLeaguePlayer(player):
             self.sendString('Success: Player is a league player.')
         else:
             self.sendString('Failure: Player is not a league player.')
@@ -125,17 +130,17 @@ class LeagueMasterExtension(ThreadedTCPRequestHandler):
         player = self.receiveJSON()
         if player is None:
             return
-        if player['keyhash'] in bfl.LeaguePlayers:
-            if bfl.LeaguePlayers[player['keyhash']].isLeader():
-                self.sendString('Success: Player is a league team leader.')
-            else:
-                self.sendString('Failure: Player is not a league team leader.')
+        if self.isLeagueLeader(player):
+            self.sendString('Success: Player is a league team leader.')
         else:
             self.sendString('Failure: Player is not a league team leader.')
 
     #
     #
     #
+    #
+    #
+    #
 
     def receiveLeagueNomination(self):
         """ Receive a league nomination from a client.
@@ -184,31 +189,31 @@ class LeagueMasterExtension(ThreadedTCPRequestHandler):
 
                 note::  Author(s): Mitch """
 
-        clientBinaryHash = self.getRequest()
-        if exists('bfassist/references/league/binaries/league.dynamic'):
-            if clientBinaryHash == self.shaForFile('bfassist/references/league/binaries/league.dynamic'):
-                self.sendString('Success: Hashes match.')
-            else:
-                self.sendString('Failure: Hashes do not match.')
-        else:
+        matches = self.matchesLeagueBinary(self.getRequest())
+        if matches is None:
             self.sendString('Failure: Could not find the corresponding dynamic binaries.')
+        elif matches:
+            self.sendString('Success: Hashes match.')
+        else:
+            self.sendString('Failure: Hashes do not match.')
 
     #
     #
+    #
 
     def sendActiveMaps(self):
         """ Sends JSON containing a dictionary of the names of the active map files and their hex-digest.
 
                 note::  Author(s): Mitch """
 
-        # todo:: Check if this is still required
-        map_path = Path('bfassist/references/league/maps/' + bfl.CURRENT_SEASON_NAME + '/')
-        signature = self.createFolderSignature(map_path)
+        self.sendAsJSON(self.getActiveMaps())
 
-        for mapName in set(signature.keys()):
-            signature[mapName[1:]] = signature[mapName]
-            signature.pop(mapName)
-        self.sendAsJSON(signature)
+    #
+    #
+    #
+    #
+    #
+    #
 
     def sendLeagueSettings(self):
         """ This function sends the standard league settings as dictionary.
@@ -233,11 +238,7 @@ class LeagueMasterExtension(ThreadedTCPRequestHandler):
         player_list = self.receiveJSON()
         if not player_list or len(player_list) == 0:
             return
-        for player_dict in player_list:
-            if player_dict['keyhash'] in bfl.LeaguePlayers:
-                self.updateLeaguePlayer(bfl.LeaguePlayers[player_dict['keyhash']], player_dict)
-            else:
-                bfl.LeaguePlayer.fromDict(player_dict)
+        self.storeLeaguePlayers(player_list)
 
     #
 
@@ -254,6 +255,103 @@ class LeagueMasterExtension(ThreadedTCPRequestHandler):
             if ip not in inPlayer.getIps():
                 inPlayer.addIp(ip)
 
+    # noinspection PyMethodMayBeStatic
+    def storeLeagueRound(self, league_round: dict):
+        """ Validates a bf round that should have been part of a league match and appends it to the durable spool. The
+        league round writer saves it to the database in the background.
+
+            :param league_round:    The round as dictionary.
+
+            :return:                True if the round was spooled, False if it's invalid.
+
+                note::  Author(s): Mitch """
+
+        return bfl.ROUND_WRITER.spoolRound(league_round)
+
+    def storeLeaguePlayers(self, player_list: list):
+        """ Saves or updates player objects as dictionaries that participated in league activity.
+
+            :param player_list: List of the players as dictionaries.
+
+            :return:            True once the players are saved.
+
+                note::  Author(s): Mitch """
+
+        for player_dict in player_list:
+            if player_dict['keyhash'] in bfl.LeaguePlayers:
+                self.updateLeaguePlayer(bfl.LeaguePlayers[player_dict['keyhash']], player_dict)
+            else:
+                bfl.LeaguePlayer.fromDict(player_dict)
+        return True
+
+    # noinspection PyMethodMayBeStatic
+    def syncLeaguePlayers(self, records: list):
+        """ Merges the player records a client synchronised because they changed since its last acknowledged sync.
+
+            :param records: List of the player records as dictionaries.
+
+            :return:        True once the records are merged.
+
+                note::  Author(s): Mitch """
+
+        bfl.LeaguePlayer.mergeMany(records)
+        return True
+
+    # noinspection PyMethodMayBeStatic
+    def isLeaguePlayer(self, player: dict):
+        """ Check if a player is part of the league livePlayers.
+
+            :param player:  The player as dictionary.
+
+            :return:        True if the player is a league player otherwise false.
+
+                note::  Author(s): Mitch """
+
+        return player['keyhash'] in bfl.LeaguePlayers
+
+    # noinspection PyMethodMayBeStatic
+    def isLeagueLeader(self, player: dict):
+        """ Check if a player is a league team leader.
+
+            :param player:  The player as dictionary.
+
+            :return:        True if the player is a league team leader otherwise false.
+
+                note::  Author(s): Mitch """
+
+        return player['keyhash'] in bfl.LeaguePlayers and bfl.LeaguePlayers[player['keyhash']].isLeader()
+
+    # noinspection PyMethodMayBeStatic
+    def matchesLeagueBinary(self, clientBinaryHash: str):
+        """ Check if the digest of a dynamic binary matches with the one of the league binary.
+
+            :param clientBinaryHash:    The sha-256 digest of the dynamic binary of the client.
+
+            :return:                    True if the digests match, false if they don't and None if the league binary
+                                        couldn't be found.
+
+                note::  Author(s): Mitch """
+
+        if exists('bfassist/references/league/binaries/league.dynamic'):
+            return clientBinaryHash == shaForFile('bfassist/references/league/binaries/league.dynamic')
+        return None
+
+    def getActiveMaps(self):
+        """ Creates a dictionary of the names of the active map files and their hex-digest.
+
+            :return:    Dictionary containing active map names as keys and their hex-digest as values.
+
+                note::  Author(s): Mitch """
+
+        # todo:: Check if this is still required
+        map_path = Path('bfassist/references/league/maps/' + bfl.CURRENT_SEASON_NAME + '/')
+        signature = self.createFolderSignature(map_path)
+
+        for mapName in set(signature.keys()):
+            signature[mapName[1:]] = signature[mapName]
+            signature.pop(mapName)
+        return signature
+
 
 ThreadedTCPRequestHandler = LeagueMasterExtension
 
@@ -268,3 +366,13 @@ ThreadedTCPRequestHandler.client_requests.update({
         "UpdateLeaguePlayers":  ThreadedTCPRequestHandler.updateLeaguePlayers,
         'LeagueRound':          ThreadedTCPRequestHandler.receiveLeagueRound
 })
+
+ThreadedTCPRequestHandler.batch_requests.update({
+        "CheckPlayer":          ThreadedTCPRequestHandler.isLeaguePlayer,
+        "CheckBinary":          ThreadedTCPRequestHandler.matchesLeagueBinary,
+        "CheckPlayerIsLeader":  ThreadedTCPRequestHandler.isLeagueLeader,
+        "ActiveMaps":           ThreadedTCPRequestHandler.getActiveMaps,
+        "UpdateLeaguePlayers":  ThreadedTCPRequestHandler.storeLeaguePlayers,
+        "SyncLeaguePlayers":    ThreadedTCPRequestHandler.syncLeaguePlayers,
+        'LeagueRound':          ThreadedTCPRequestHandler.storeLeagueRound
+})
@@ -67,9 +67,12 @@ class SecureTCPServer(TCPServer):
 
 class ThreadedMasterTCPServer(ThreadingMixIn, SecureTCPServer):
     """ We need to create this to enable request-handling in separate threads so we don't get blocking behaviour.
+    Handler threads of idle persistent client sessions must not keep the server from shutting down.
 
             note:: Author(s): Mitch """
-    pass
+
+    daemon_threads = True
+    block_on_close = False
 
 
 class BFA_ThreadedMasterTCPServer:
@@ -108,10 +111,11 @@ class BFA_ThreadedMasterTCPServer:
             self.server_thread = Thread(target=self.server.serve_forever)
 
     def startup(self):
-        """ Simple startup function for the master to start serving.
+        """ Simple startup function for the master to start serving. The folder signatures are precomputed first.
 
                 note:: Author(s): Mitch """
 
+        self.RequestHandlerClass.precomputeFolderSignatures()
         self.server_thread.start()
 
         log("Master server running.")
@@ -0,0 +1,143 @@
+#############################################################################
+#
+#
+#   Merkle network Module to BFA c7
+#
+#
+#############################################################################
+""" This module turns flat signatures, dictionaries containing file paths and their sha-256 hex-digest, into merkle
+trees. Every directory of such a tree gets a hash calculated from the names and hashes of its children. Two trees can
+therefore be compared by their root hashes first and only the subtrees with differing hashes need to be looked at.
+
+The client and the master use this to find out which files a client needs to update. The client sends the hash of a
+directory, the master answers with the listing of that directory if its hash differs and the client continues with the
+subdirectories that differ. If nothing changed the whole comparison is a single hash.
+
+    Dependencies:
+
+        network <- merkle
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+from hashlib import sha256
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+def joinPath(dirPath: str, name: str):
+    """ Simple function to get the path of a child of a directory in a merkle tree.
+
+        :param dirPath: The path of the directory, empty string for the root.
+        :param name:    The name of the child.
+
+        :return:        The path of the child.
+
+            note::  Author(s): Mitch """
+
+    return dirPath + '/' + name if dirPath else name
+
+
+class MerkleTree:
+    """ A merkle tree built from a flat signature.
+
+        :param signature:   Dictionary containing file paths separated by '/' as keys and their hex-digest as values. A
+                            value of None marks a file that's missing.
+        :param listings:    Dictionary containing directory paths as keys and a dictionary of the names of their
+                            children as keys and a list of the hash and a flag if the child is a directory as values.
+        :param hashes:      Dictionary containing directory paths as keys and their hashes as values. The root
+                            directory has the empty string as path.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, signature: dict = None, listings: dict = None, hashes: dict = None):
+
+        if signature:
+            self.signature = signature
+        else:
+            self.signature = {}
+        if listings:
+            self.listings = listings
+        else:
+            self.listings = {'': {}}
+        if hashes:
+            self.hashes = hashes
+        else:
+            self.hashes = {}
+            self.build()
+
+    def build(self):
+        """ Builds the listings and calculates the hashes of all directories bottom up.
+
+                note::  Author(s): Mitch """
+
+        for filePath, digest in self.signature.items():
+            parts = filePath.split('/')
+            for depth in range(len(parts) - 1):
+                dirPath = '/'.join(parts[:depth])
+                self.listings.setdefault(dirPath, {})[parts[depth]] = [None, True]
+                self.listings.setdefault(joinPath(dirPath, parts[depth]), {})
+            self.listings['/'.join(parts[:-1])][parts[-1]] = [digest, False]
+
+        for dirPath in sorted(self.listings, key=lambda path: path.count('/') if path else -1, reverse=True):
+            sha = sha256()
+            for name in sorted(self.listings[dirPath]):
+                childHash, isDir = self.listings[dirPath][name]
+                sha.update(bytes(name + ('\t1\t' if isDir else '\t0\t') + (childHash or '') + '\n', 'utf-8'))
+            self.hashes[dirPath] = sha.hexdigest()
+            if dirPath:
+                parent, _, name = dirPath.rpartition('/')
+                self.listings[parent][name][0] = self.hashes[dirPath]
+
+    def getRootHash(self):
+        """ Simple function to get the hash of the root directory.
+
+            :return:    The root hash.
+
+                note::  Author(s): Mitch """
+
+        return self.hashes['']
+
+    def differingListings(self, directories: dict):
+        """ Function to get the listings of the directories whose hash differs from the hash given for them.
+
+            :param directories: Dictionary containing directory paths as keys and hashes of another tree as values.
+
+            :return:            Dictionary containing the paths of the differing directories as keys and their listings
+                                as values. Directories that don't exist in this tree have an empty listing.
+
+                note::  Author(s): Mitch """
+
+        return {dirPath: self.listings.get(dirPath, {}) for dirPath in directories
+                if self.hashes.get(dirPath) != directories[dirPath]}
+
+    def changedFiles(self, other: 'MerkleTree'):
+        """ Function to find the files of this tree that are missing or different in another tree. Only directories
+        with differing hashes are descended into.
+
+            :param other:   The other tree.
+
+            :return:        A list of the paths of the changed files.
+
+                note::  Author(s): Mitch """
+
+        changed = []
+        directories = ['']
+        while directories:
+            dirPath = directories.pop()
+            if self.hashes[dirPath] == other.hashes.get(dirPath):
+                continue
+            for name, (childHash, isDir) in self.listings[dirPath].items():
+                childPath = joinPath(dirPath, name)
+                if isDir:
+                    directories.append(childPath)
+                elif other.signature.get(childPath) != childHash:
+                    changed.append(childPath)
+        return changed
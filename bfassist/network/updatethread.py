@@ -6,7 +6,8 @@
 #
 #############################################################################
 """ This module handles networking from bfa 'client' to bfa 'master' and vice-versa. In particular it creates a thread
-that should be able to automatically pull the latest version and if specified also upgrade to it.
+that should be able to automatically pull the latest version and if specified also upgrade to it. As long as there are
+no updates the thread backs off and polls less often, once an update arrives it returns to the initial interval.
 
     Dependencies:
 
@@ -16,8 +17,7 @@ that should be able to automatically pull the latest version and if specified al
 
         note::  Author(s): Mitch last-check: 09.07.2021 """
 
-from time import sleep
-from threading import Thread
+from threading import Thread, Event
 from importlib import import_module, reload
 
 from bfassist.bfa_logging import log
@@ -44,10 +44,15 @@ class UpdateThread(Thread):
         :param getUpdate:       The update function that's to be called
         :param isClient:        Determines if this update thread is run by a client.
 
+        :param max_update_interval: The longest interval in seconds the thread backs off to without updates.
+        :param current_interval:    The interval in seconds the thread currently waits between checks.
+        :param wakeUp:              Event to interrupt the waiting of the thread when it's stopped.
+
             note::  Author(s): Mitch """
 
     def __init__(self, auto_upgrading: bool = False, update_interval: int = 15, active: bool = False,
-                 toInstall: list = None, getUpdate: callable = None, isClient: bool = True):
+                 toInstall: list = None, getUpdate: callable = None, isClient: bool = True,
+                 max_update_interval: int = 240, current_interval: float = None, wakeUp: Event = None):
         super().__init__()
         self.auto_upgrading = auto_upgrading
         self.update_interval = update_interval
@@ -58,9 +63,19 @@ class UpdateThread(Thread):
         else:
             self.toInstall = []
         self.getUpdate = getUpdate
+        self.max_update_interval = max_update_interval
+        if current_interval:
+            self.current_interval = current_interval
+        else:
+            self.current_interval = update_interval
+        if wakeUp:
+            self.wakeUp = wakeUp
+        else:
+            self.wakeUp = Event()
 
     def run(self):
-        """ The functions that's run when the Thread is started. Contains the actual update-loop.
+        """ The functions that's run when the Thread is started. Contains the actual update-loop. The interval doubles
+        after every check without update up to the maximum interval.
 
                 note::  Author(s): Mitch """
 
@@ -68,7 +83,10 @@ class UpdateThread(Thread):
             if self.auto_upgrading:
                 if self.getUpdate():
                     self.upgrade()
-            sleep(self.update_interval)
+                    self.current_interval = self.update_interval
+                else:
+                    self.current_interval = min(2 * self.current_interval, self.max_update_interval)
+            self.wakeUp.wait(self.current_interval)
 
     def upgrade(self):
         """ Function that upgrades everything specified in the install list.
@@ -99,6 +117,7 @@ class UpdateThread(Thread):
                 note::  Author(s): Mitch """
 
         self.active = True
+        self.wakeUp.clear()
         super().start()
 
     def stop(self):
@@ -107,4 +126,5 @@ class UpdateThread(Thread):
                 note::  Author(s): Mitch """
 
         self.active = False
+        self.wakeUp.set()
         self.join()
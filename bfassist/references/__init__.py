@@ -6,20 +6,24 @@
 #
 #############################################################################
 """ This module will contain references mainly to files that are relevant to bfa. Contains a few miscellaneous functions
-like calculating a sha for a file and similar stuff. Also used to archive files utilising the sql package.
+like calculating a sha for a file and similar stuff. Also used to archive files utilising the sql package. Many files
+can be hashed at once in parallel with the hashing service of the hashing module. References and installed files are
+kept deduplicated in the content-addressed store of the store module.
 
     Dependencies:
 
         references \-> binaries
                     -> maps
+                    -> hashing
+                    -> store
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
 from os import mkdir, listdir
-from os.path import isdir
-from shutil import copyfile
-from hashlib import sha256
+from os.path import isdir, exists
 
+from bfassist.references.hashing import hashFile, HASHING_SERVICE
+from bfassist.references.store import STORE
 from bfassist.references.binaries import Binary, Binaries
 from bfassist.references.maps import Map, Maps
 
@@ -43,12 +47,7 @@ def shaForFile(inPath: str):
 
             note::  Author(s): Mitch """
 
-    with open(inPath, "rb") as f:
-        sha = sha256()
-        for block in iter(lambda: f.read(4096), b""):
-            sha.update(block)
-
-    return sha.hexdigest()
+    return hashFile(inPath)
 
 
 def createDirectoryStructure(structure: str):
@@ -64,16 +63,18 @@ def createDirectoryStructure(structure: str):
     for subDirectory in subDirectories:
         if not isdir(currentDirectory + subDirectory):
             mkdir(currentDirectory + subDirectory)
-        currentDirectory = "bfassist/references/" + subDirectory + "/"
+        currentDirectory += subDirectory + "/"
 
 
-def createSafeReference(originFile: str, fullReferencePath: str = ""):
+def createSafeReference(originFile: str, fullReferencePath: str = "", digest: str = None):
     """ Function that creates a reference/backup of a file "safely" meaning, that if a reference like this already
-    exists. It will create a new one by appending a suffix. Returns the path to the thereby created reference.
+    exists. It will create a new one by appending a suffix. Returns the path to the thereby created reference. The
+    reference is a link to the object of the file in the store, so backing up the same content twice takes no space.
 
         :param originFile:          The file to create a reference for.
         :param fullReferencePath:   Supplementary specification of the path if it should not be referenced directly from
                                     the references directory.
+        :param digest:              The sha-256 hex-digest of the file if it's already known.
 
         :return:                    The path to the reference.
 
@@ -88,7 +89,7 @@ def createSafeReference(originFile: str, fullReferencePath: str = ""):
         variationSuffix = "variation" + str(variationCount)
         variationCount += 1
 
-    copyfile(originFile, 'bfassist/references/' + fullReferencePath + variationSuffix)
+    STORE.install(originFile, 'bfassist/references/' + fullReferencePath + variationSuffix, digest)
 
     return 'bfassist/references/' + fullReferencePath + variationSuffix
 
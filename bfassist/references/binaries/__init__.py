@@ -72,17 +72,18 @@ class Binary(DBStorable, table="serverbinaries", live=True):
         }
 
     @classmethod
-    def fromReference(cls, path: str):
+    def fromReference(cls, path: str, digest: str = None):
         """ Simplified constructor just using a file reference.
 
             :param path:    Location of the file.
+            :param digest:  The sha-256 hex-digest of the file if it's already known.
 
                 note::  Author(s): Mitch """
 
         from bfassist.references import shaForFile
 
         if exists(path):
-            cls(path.split('/')[-1], shaForFile(path), path[:path.rfind('/')+1])
+            cls(path.split('/')[-1], digest or shaForFile(path), path[:path.rfind('/')+1])
 
 
 Binaries = Binary.storageDict
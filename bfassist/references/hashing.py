@@ -0,0 +1,165 @@
+#############################################################################
+#
+#
+#   Hashing Module to BFA c7 Standalone
+#
+#
+#############################################################################
+""" This module provides the hashing of files for bfa. Small files are read with a large buffer, bigger ones are memory
+mapped and handed to hashlib in one piece. Since hashlib releases the GIL while hashing, the hashing service can hash
+many files in parallel on a pool of threads and scales across cores. Its batch function yields the digests as soon as
+they're done so the caller can already process them while the rest is still being hashed.
+
+    Dependencies:
+
+        references <- hashing
+            |
+            \-> bfa_logging
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from hashlib import sha256
+from mmap import mmap, ACCESS_READ
+from os import cpu_count, fstat
+from threading import Lock
+
+from bfassist.bfa_logging import log
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+BUFFER_SIZE = 1048576
+MMAP_THRESHOLD = 1048576
+
+
+def hashFile(inPath: str):
+    """ Function that calculates and returns the sha-256 hex-digest for a file given its path. Files of at least
+    MMAP_THRESHOLD bytes are memory mapped, smaller ones read into a buffer.
+
+        :param inPath:  Path to the file.
+
+        :return:        SHA-256 hash hex-digest.
+
+            note::  Author(s): Mitch """
+
+    sha = sha256()
+    with open(inPath, 'rb') as f:
+        if fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap(f.fileno(), 0, access=ACCESS_READ) as mapped:
+                sha.update(mapped)
+        else:
+            buffer = bytearray(BUFFER_SIZE)
+            view = memoryview(buffer)
+            for n in iter(lambda: f.readinto(buffer), 0):
+                sha.update(view[:n])
+
+    return sha.hexdigest()
+
+
+class HashingService:
+    """ Service hashing files in parallel on a pool of threads. The pool is only started when it's needed first.
+
+        :param maxWorkers:  The maximum number of threads hashing at once.
+        :param executor:    The thread pool the files are hashed on.
+        :param lock:        Lock guarding the start of the thread pool.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, maxWorkers: int = None, executor: ThreadPoolExecutor = None, lock: Lock = None):
+
+        if maxWorkers:
+            self.maxWorkers = maxWorkers
+        else:
+            self.maxWorkers = min(32, (cpu_count() or 1) + 4)
+        self.executor = executor
+        if lock:
+            self.lock = lock
+        else:
+            self.lock = Lock()
+
+    def getExecutor(self):
+        """ Simple function to get the thread pool and start it if necessary.
+
+            :return:    The thread pool.
+
+                note::  Author(s): Mitch """
+
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix='BFA-Hashing')
+            return self.executor
+
+    def submit(self, inPath: str):
+        """ Submits a single file to be hashed.
+
+            :param inPath:  Path to the file.
+
+            :return:        Future of the sha-256 hex-digest.
+
+                note::  Author(s): Mitch """
+
+        return self.getExecutor().submit(hashFile, inPath)
+
+    def hashFiles(self, inPaths):
+        """ Hashes many files in parallel and yields their digests in the order they complete. Files that can't be read
+        are yielded with None as digest.
+
+            :param inPaths: Iterable of the paths to the files.
+
+            :return:        Generator yielding tuples of the path of a file and its sha-256 hex-digest.
+
+                note::  Author(s): Mitch """
+
+        futures = {self.submit(inPath): inPath for inPath in inPaths}
+        for future in as_completed(futures):
+            yield futures[future], self.resultOf(future, futures[future])
+
+    def hashAll(self, inPaths):
+        """ Hashes many files in parallel and waits for all of them.
+
+            :param inPaths: Iterable of the paths to the files.
+
+            :return:        Dictionary containing the paths as keys and their sha-256 hex-digest or None as values.
+
+                note::  Author(s): Mitch """
+
+        return dict(self.hashFiles(inPaths))
+
+    @staticmethod
+    def resultOf(future: Future, inPath: str):
+        """ Simple function to get the digest of a finished future.
+
+            :param future:  The future of the digest.
+            :param inPath:  Path to the file that was hashed.
+
+            :return:        The sha-256 hex-digest or None if the file couldn't be read.
+
+                note::  Author(s): Mitch """
+
+        try:
+            return future.result()
+        except OSError as error:
+            log("Could not hash " + inPath + ": " + str(error), 3)
+            return None
+
+    def shutdown(self):
+        """ Stops the thread pool once the files that were submitted are hashed.
+
+                note::  Author(s): Mitch """
+
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+HASHING_SERVICE = HashingService()
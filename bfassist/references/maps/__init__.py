@@ -6,7 +6,8 @@
 #
 #############################################################################
 """ This module offers all sorts of functions required for the interaction and distribution of and with bf maps using
-the sql package for archiving.
+the sql package for archiving. Besides the paths of a map its stats remember the size and modification time of the map
+file in every path as of the last time it was hashed, so scans only need to hash the files that changed since.
 
     Dependencies:
 
@@ -17,6 +18,7 @@ the sql package for archiving.
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
+import json
 from os import mkdir
 from os.path import exists
 
@@ -40,6 +42,14 @@ if not exists('bfassist/references/maps'):
         print("Using module outside of valid bfa environment. Commencing without setting up bf maps.")
 
 
+def pyStatsToSQL(inStats: dict):
+    return json.dumps(inStats)
+
+
+def sqlStatsToPy(sql: str):
+    return json.loads(sql) if sql else {}
+
+
 class Map(DBStorable, table="servermaps", live=True):
     """ A class to represent a reference to a bf map available on the server with at least one specific location.
 
@@ -47,30 +57,39 @@ class Map(DBStorable, table="servermaps", live=True):
         :param Digest:      The 256-SHA hex-digest of this map file.
         :param Name:        The name of this map.
         :param Paths:       A set of locations of this map.
+        :param Stats:       A dictionary containing locations of this map as keys and a list of the size and
+                            modification time in nanoseconds of the map file there when it was last hashed as values.
 
             note::  Author(s): Mitch """
 
-    def __init__(self, FName: str, Digest: str, Name: str, Paths: set):
+    def __init__(self, FName: str, Digest: str, Name: str, Paths: set, Stats: dict = None):
+        if not self.initialised:
+            self.addConversion(pyStatsToSQL, sqlStatsToPy)
+        elif Stats is None:
+            Stats = {}
+
         self.SFName = FName, TINYTEXT, PRIMARY_KEY
         self.SDigest = Digest, TEXT, UNIQUE
         self.SName = Name, VARCHAR(255)
         self.SPaths = Paths, TINYTEXT
+        self.SStats = Stats, TEXT
 
         self.insertToDB()
 
     @classmethod
-    def fromReference(cls, path: str):
+    def fromReference(cls, path: str, digest: str = None):
         """ Simplified constructor just using a file reference.
 
             :param path:        Location of the file.
+            :param digest:      The sha-256 hex-digest of the file if it's already known.
 
                 note::  Author(s): Mitch """
 
         from bfassist.references import shaForFile
 
         if exists(path):
-            cls(path[path[:path.rfind('/') - len("/archives/bf1942/levels")].rfind('/') + 1:], shaForFile(path),
-                path.split('/')[-1], {path[:path.rfind('/') + 1]})
+            cls(path[path[:path.rfind('/') - len("/archives/bf1942/levels")].rfind('/') + 1:],
+                digest or shaForFile(path), path.split('/')[-1], {path[:path.rfind('/') + 1]})
 
     def addPath(self, inPath: str):
         """ Simple function to add an additional location.
@@ -91,5 +110,67 @@ class Map(DBStorable, table="servermaps", live=True):
 
         return next(iter(self.getPaths()))
 
+    def getStat(self, inPath: str):
+        """ Simple function to get the size and modification time of the map file in a location when it was last hashed.
+
+            :param inPath:  The location.
+
+            :return:        List of the size and the modification time in nanoseconds or None if it's unknown.
+
+                note::  Author(s): Mitch """
+
+        return self.getStats().get(inPath)
+
+    def setStat(self, inPath: str, fileStat):
+        """ Simple function to remember the size and modification time of the map file in a location after hashing it.
+
+            :param inPath:      The location.
+            :param fileStat:    The result of stat for the map file.
+
+                note::  Author(s): Mitch """
+
+        stats = dict(self.getStats())
+        stats[inPath] = [fileStat.st_size, fileStat.st_mtime_ns]
+        self.setStats(stats)
+
+    def removePath(self, inPath: str):
+        """ Simple function to remove a location and its stat.
+
+            :param inPath:  The location to remove.
+
+                note::  Author(s): Mitch """
+
+        paths = set(self.getPaths())
+        paths.discard(inPath)
+        self.setPaths(paths)
+        stats = dict(self.getStats())
+        if stats.pop(inPath, None) is not None:
+            self.setStats(stats)
+
 
 Maps = Map.storageDict
+
+
+def migrateMaps():
+    """ Takes over the maps of a table from before maps had stats. Their stats start out empty so every map is hashed
+    once on the next scan.
+
+            note::  Author(s): Mitch """
+
+    if Maps.liveSet:
+        return
+
+    suffix = 1
+    while Maps.tableExists(str(suffix)):
+        suffix += 1
+
+    for backup in reversed(range(1, suffix)):
+        columns = [row[1] for row in Maps.connections.read("PRAGMA table_info(" + Maps.table + str(backup) + ")")]
+        if columns == ['FName', 'Digest', 'Name', 'Paths']:
+            Maps.connections.write("INSERT OR IGNORE INTO " + Maps.table + " SELECT FName, Digest, Name, Paths, '{}' "
+                                   "FROM " + Maps.table + str(backup))
+            Maps.refresh_liveSet()
+            return
+
+
+migrateMaps()
@@ -0,0 +1,258 @@
+#############################################################################
+#
+#
+#   Store Module to BFA c7 Standalone
+#
+#
+#############################################################################
+""" This module provides a content-addressed store for the map and binary files bfa installs. Every file is kept once
+under its sha-256 digest, the same digest maps and binaries are referenced by, no matter how many servers of the host
+install it. Installing a file hardlinks its stored object into place, so switching a map on many servers doesn't copy
+anything. Where hardlinks aren't possible, e.g. across filesystems, the object is cloned with a reflink on
+copy-on-write filesystems and only copied as last resort. Files are always installed under a temporary name first and
+then renamed over the target, so a server never sees a half-written file.
+
+Objects are read-only. An installed file shares its object with every other installation of it, so bfa only ever
+replaces installed files by renaming and never writes into them. Read-only permissions don't stop a server running as
+root from writing into an installed file though, which would change the object and every installation of it. So an
+object is verified before it's used again: its size and modification time are compared with the ones it had when it was
+last hashed and if they differ, or it wasn't hashed by this process yet, it's hashed again. An object that doesn't match
+its digest anymore is removed from the store and stored again from the file being added.
+
+    Dependencies:
+
+        references <- store
+            |
+            |-> hashing
+            \-> bfa_logging
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+from os import link, makedirs, replace, chmod, stat, remove, listdir, getpid
+from os.path import exists, isdir, samefile
+from shutil import copyfile
+from stat import S_IMODE
+from threading import Lock, get_ident
+
+from bfassist.references.hashing import hashFile
+from bfassist.bfa_logging import log
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+FICLONE = 0x40049409
+READ_ONLY = 0o444
+EXECUTABLE = 0o555
+
+
+def cloneFile(source: str, destination: str):
+    """ Function that clones a file with a reflink if the filesystem supports it and copies it otherwise.
+
+        :param source:      Path to the file to clone.
+        :param destination: Path to the clone.
+
+            note::  Author(s): Mitch """
+
+    try:
+        from fcntl import ioctl
+
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            ioctl(dst.fileno(), FICLONE, src.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+    copyfile(source, destination)
+
+
+def temporaryName(path: str):
+    """ Simple function to get a temporary name next to a path that's unique across processes and threads.
+
+        :param path:    The path the temporary file is going to be renamed to.
+
+        :return:        The temporary path.
+
+            note::  Author(s): Mitch """
+
+    return path + '.bfa-' + str(getpid()) + '-' + str(get_ident()) + '.tmp'
+
+
+class ContentStore:
+    """ Store keeping files under their sha-256 digest.
+
+        :param storePath:   Path to the directory of the store.
+        :param lock:        Lock guarding the creation of objects.
+        :param verified:    Dictionary containing digests as keys and the size and modification time in nanoseconds of
+                            their object when it was last found to match the digest as values.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, storePath: str, lock: Lock = None, verified: dict = None):
+
+        self.storePath = storePath
+        if lock:
+            self.lock = lock
+        else:
+            self.lock = Lock()
+        if verified:
+            self.verified = verified
+        else:
+            self.verified = {}
+
+    def objectPath(self, digest: str):
+        """ Simple function to get the path of the object of a digest.
+
+            :param digest:  The sha-256 hex-digest.
+
+            :return:        The path to the object.
+
+                note::  Author(s): Mitch """
+
+        return self.storePath + digest[:2] + '/' + digest
+
+    def contains(self, digest: str):
+        """ Simple function to check if the store holds an object for a digest.
+
+            :param digest:  The sha-256 hex-digest.
+
+            :return:        True if it does, False otherwise.
+
+                note::  Author(s): Mitch """
+
+        return bool(digest) and exists(self.objectPath(digest))
+
+    def verify(self, digest: str):
+        """ Function that verifies the object of a digest still matches it. The object is only hashed again if its size
+        or modification time changed since it was last verified. An object that doesn't match anymore is removed.
+
+            :param digest:  The sha-256 hex-digest.
+
+            :return:        True if the object is intact, False if it's missing or was removed.
+
+                note::  Author(s): Mitch """
+
+        objectPath = self.objectPath(digest)
+        try:
+            objectStat = stat(objectPath)
+        except OSError:
+            return False
+
+        fingerprint = (objectStat.st_size, objectStat.st_mtime_ns)
+        if self.verified.get(digest) == fingerprint:
+            return True
+        if hashFile(objectPath) == digest:
+            self.verified[digest] = fingerprint
+            return True
+
+        log("The object " + digest + " was written to in place and doesn't match its digest anymore. Removing it from "
+            "the store, the installations sharing it are corrupted too.", 4)
+        self.verified.pop(digest, None)
+        try:
+            remove(objectPath)
+        except OSError:
+            pass
+        return False
+
+    def add(self, source: str, digest: str = None):
+        """ Function that adds a file to the store unless its object exists already. The file is cloned into the store
+        and hashed there, so the object can't change while it's hashed and its digest is always correct. An existing
+        object is verified before it's used.
+
+            :param source:  Path to the file.
+            :param digest:  The sha-256 hex-digest of the file if it's already known.
+
+            :return:        The sha-256 hex-digest of the object.
+
+                note::  Author(s): Mitch """
+
+        if self.contains(digest) and self.verify(digest):
+            return digest
+
+        makedirs(self.storePath, exist_ok=True)
+        temporary = temporaryName(self.storePath + 'incoming')
+        try:
+            cloneFile(source, temporary)
+            sha = hashFile(temporary)
+            if digest and sha != digest:
+                log("The digest of " + source + " isn't " + digest + " anymore. Storing it as " + sha + ".", 3)
+            intact = self.contains(sha) and self.verify(sha)
+            with self.lock:
+                if intact:
+                    remove(temporary)
+                else:
+                    makedirs(self.storePath + sha[:2], exist_ok=True)
+                    chmod(temporary, READ_ONLY | S_IMODE(stat(source).st_mode) & 0o111)
+                    objectStat = stat(temporary)
+                    replace(temporary, self.objectPath(sha))
+                    self.verified[sha] = (objectStat.st_size, objectStat.st_mtime_ns)
+        finally:
+            if exists(temporary):
+                remove(temporary)
+        return sha
+
+    def install(self, source: str, destination: str, digest: str = None, executable: bool = False):
+        """ Function that installs a file. The file is added to the store first, then its object is hardlinked or
+        cloned next to the destination and renamed over it.
+
+            :param source:      Path to the file to install.
+            :param destination: Path to install the file to.
+            :param digest:      The sha-256 hex-digest of the file if it's already known.
+            :param executable:  Flag if the installed file has to be executable.
+
+            :return:            The sha-256 hex-digest of the installed file.
+
+                note::  Author(s): Mitch """
+
+        sha = self.add(source, digest)
+        objectPath = self.objectPath(sha)
+        if executable and S_IMODE(stat(objectPath).st_mode) != EXECUTABLE:
+            chmod(objectPath, EXECUTABLE)
+
+        if exists(destination) and samefile(objectPath, destination):
+            return sha
+
+        temporary = temporaryName(destination)
+        try:
+            try:
+                link(objectPath, temporary)
+            except OSError:
+                cloneFile(objectPath, temporary)
+                chmod(temporary, S_IMODE(stat(objectPath).st_mode))
+            replace(temporary, destination)
+        finally:
+            if exists(temporary):
+                remove(temporary)
+        return sha
+
+    def prune(self):
+        """ Function that removes the objects that aren't installed or referenced anywhere anymore, i.e. objects whose
+        only link is the store itself.
+
+            :return:    The number of objects removed.
+
+                note::  Author(s): Mitch """
+
+        removed = 0
+        if not isdir(self.storePath):
+            return removed
+
+        with self.lock:
+            for prefix in listdir(self.storePath):
+                if not isdir(self.storePath + prefix):
+                    continue
+                for digest in listdir(self.storePath + prefix):
+                    objectPath = self.storePath + prefix + '/' + digest
+                    if stat(objectPath).st_nlink == 1:
+                        remove(objectPath)
+                        removed += 1
+        return removed
+
+
+STORE = ContentStore('bfassist/references/store/')
@@ -33,6 +33,18 @@ Every subclass of DBStorable automatically comes with a corresponding DBDictiona
 
 Player.storageDict
 
+Tables that receive a lot of small writes can pass 'writeBehind=True' at inheritance. The setters of such a DBStorable
+then keep their values pending in the DBDict which writes them to the database in batches.
+
+class BfPlayerRound(DBStorable, table="roundstats", live=False, writeBehind=True)
+
+Tables without a live set can also keep a bounded cache of their most recently used elements by passing 'cacheSize'.
+Lookups via primary key then return the identical cached object instead of selecting and rebuilding it every time.
+
+All db dictionaries of the same database file share a DBConnectionManager. It runs the database in WAL mode, gives
+every thread its own read connection and queues all writes for a single writer connection, so readers in different
+threads don't block each other.
+
 Lastly the DBManagement class is used to manage the database in its entirety. For now this is mainly focused on limiting
 the total size occupied by the database. The class is instantiated once in its respective module and utilises so called
 DBPriorities to attribute an integer priority to a selection of data in the database specified by a SELECT statement.
@@ -49,11 +61,15 @@ using the same name, although that should hopefully be obvious.
     Dependencies:
 
         sql ----\-> dbstorable
+                |-> dbconnection
+                |-> dbliveset
+                |-> dbcache
                  -> dbdictionary
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
 from bfassist.sql.dbstorable import *
+from bfassist.sql.dbconnection import DBConnectionManager, getConnectionManager, releaseConnectionManager
 from bfassist.sql.dbdictionary import DBDict
 
 
@@ -0,0 +1,148 @@
+#############################################################################
+#
+#
+#   BFA SQL Module
+#
+#
+#############################################################################
+""" This module introduces a bounded object cache for db dictionaries that don't keep a live set. Elements fetched via
+their primary key are kept in the cache so that repeated lookups return the identical object without another select.
+When the cache is full the element that was used least recently is evicted.
+
+    Dependencies:
+
+        sql <- dbcache
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+from collections import OrderedDict
+from threading import Lock
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+class DBObjectCache:
+    """ Least recently used cache of db storables with their primary key values as keys.
+
+        :param size:        The maximum number of elements kept in the cache. A size of 0 disables the cache.
+        :param elements:    Ordered dictionary of the cached elements, the least recently used coming first.
+        :param hits:        Number of lookups that were answered by the cache.
+        :param misses:      Number of lookups that had to go to the database.
+        :param lock:        The threading lock for the cache.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, size: int = 0, elements: OrderedDict = None, hits: int = 0, misses: int = 0, lock: Lock = None):
+
+        self.size = size
+
+        if elements:
+            self.elements = elements
+        else:
+            self.elements = OrderedDict()
+
+        self.hits = hits
+        self.misses = misses
+
+        if lock:
+            self.lock = lock
+        else:
+            self.lock = Lock()
+
+    def __len__(self):
+        return len(self.elements)
+
+    def get(self, key):
+        """ Gets an element from the cache and marks it as most recently used.
+
+            :param key: The primary key value of the element.
+
+            :return:    The cached element or None if it isn't cached.
+
+                note::  Author(s): Mitch """
+
+        if not self.size:
+            return None
+
+        try:
+            self.lock.acquire(True)
+            element = self.elements.get(key)
+            if element is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.elements.move_to_end(key)
+            return element
+        finally:
+            self.lock.release()
+
+    def put(self, key, element):
+        """ Puts an element into the cache and evicts the least recently used elements if the cache is full.
+
+            :param key:     The primary key value of the element.
+            :param element: The element to cache.
+
+                note::  Author(s): Mitch """
+
+        if not self.size or key is None:
+            return
+
+        try:
+            self.lock.acquire(True)
+            self.elements[key] = element
+            self.elements.move_to_end(key)
+            while len(self.elements) > self.size:
+                self.elements.popitem(last=False)
+        finally:
+            self.lock.release()
+
+    def discard(self, key, unless=None):
+        """ Removes an element from the cache.
+
+            :param key:     The primary key value of the element.
+            :param unless:  If the cached element is identical to this object it's kept in the cache.
+
+                note::  Author(s): Mitch """
+
+        if not self.size:
+            return
+
+        try:
+            self.lock.acquire(True)
+            if key in self.elements and self.elements[key] is not unless:
+                del self.elements[key]
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        """ Removes all elements from the cache.
+
+                note::  Author(s): Mitch """
+
+        try:
+            self.lock.acquire(True)
+            self.elements.clear()
+        finally:
+            self.lock.release()
+
+    def getStatistics(self):
+        """ Gets the statistics of this cache.
+
+            :return:    Dictionary containing the size, the number of cached elements, hits and misses.
+
+                note::  Author(s): Mitch """
+
+        return {
+            'size':     self.size,
+            'cached':   len(self.elements),
+            'hits':     self.hits,
+            'misses':   self.misses
+        }
@@ -0,0 +1,270 @@
+#############################################################################
+#
+#
+#   BFA SQL Module
+#
+#
+#############################################################################
+""" This module introduces a connection manager for the database. SQLite allows many concurrent readers but only a
+single writer, so the manager hands out a separate read connection per thread and funnels all writes through a single
+writer connection that's driven by a writer thread working through a queue of write tasks. The database is run in WAL
+mode by default so readers don't block the writer and vice versa.
+
+    Dependencies:
+
+        sql <- dbconnection
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+from concurrent.futures import Future
+from queue import Queue
+from sqlite3 import Connection, Cursor, connect
+from threading import Lock, Thread, local, current_thread
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+class DBConnectionManager:
+    """ Manages the connections to a database file. Reads are done with a connection per thread while writes are queued
+    for the single writer connection.
+
+        :param DB_PATH:             The path to the database.
+        :param wal:                 Flag that indicates if the database should be run in WAL mode.
+        :param synchronous:         The sqlite synchronous setting to use e.g. 'NORMAL' or 'FULL'.
+        :param timeout:             Seconds a connection waits for a lock on the database before raising an error.
+        :param cachedStatements:    Number of prepared statements each connection keeps cached.
+
+        :param readers:             Thread local storage holding the read connection of each thread.
+        :param writer:              The connection used for all writes.
+        :param writeCursor:         The cursor of the writer connection.
+        :param writeLock:           The threading lock for the writer connection.
+        :param writeQueue:          The queue of write tasks waiting for the writer thread.
+        :param writerThread:        The thread working through the write queue.
+        :param users:               The number of database dictionaries using the manager.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, DB_PATH: str, wal: bool = True, synchronous: str = "NORMAL", timeout: float = 5.,
+                 cachedStatements: int = 256, readers: local = None, writer: Connection = None,
+                 writeCursor: Cursor = None, writeLock: Lock = None, writeQueue: Queue = None,
+                 writerThread: Thread = None, users: int = 0):
+
+        self.DB_PATH = DB_PATH
+        self.wal = wal
+        self.synchronous = synchronous
+        self.timeout = timeout
+        self.cachedStatements = cachedStatements
+
+        if readers:
+            self.readers = readers
+        else:
+            self.readers = local()
+
+        if writer:
+            self.writer = writer
+        else:
+            self.writer = self.connect()
+            if self.wal:
+                self.writer.execute("PRAGMA journal_mode=WAL")
+
+        if writeCursor:
+            self.writeCursor = writeCursor
+        else:
+            self.writeCursor = self.writer.cursor()
+
+        if writeLock:
+            self.writeLock = writeLock
+        else:
+            self.writeLock = Lock()
+
+        if writeQueue:
+            self.writeQueue = writeQueue
+        else:
+            self.writeQueue = Queue()
+
+        if writerThread:
+            self.writerThread = writerThread
+        else:
+            self.writerThread = Thread(target=self.runWriter, name="bfa-db-writer", daemon=True)
+            self.writerThread.start()
+        self.users = users
+
+    def connect(self):
+        """ Opens a new connection to the database with the settings of this manager applied.
+
+            :return:    The new connection.
+
+                note::  Author(s): Mitch """
+
+        connection = connect(self.DB_PATH, check_same_thread=False, timeout=self.timeout,
+                             cached_statements=self.cachedStatements)
+        if self.synchronous:
+            connection.execute("PRAGMA synchronous=" + self.synchronous)
+        return connection
+
+    def getReader(self):
+        """ Gets the read connection of the calling thread and opens it if the thread didn't have one yet.
+
+            :return:    The read connection of the calling thread.
+
+                note::  Author(s): Mitch """
+
+        reader = getattr(self.readers, 'connection', None)
+        if reader is None:
+            reader = self.connect()
+            self.readers.connection = reader
+        return reader
+
+    def read(self, sql: str, parameters: tuple = ()):
+        """ Executes a read on the read connection of the calling thread.
+
+            :param sql:         The sql statement to execute.
+            :param parameters:  The parameters of the statement.
+
+            :return:            All rows the statement returned.
+
+                note::  Author(s): Mitch """
+
+        return self.getReader().execute(sql, parameters).fetchall()
+
+    def runWriter(self):
+        """ Works through the write queue. Every task is run in its own transaction which is committed if the task
+        succeeds and rolled back otherwise.
+
+                note::  Author(s): Mitch """
+
+        while True:
+            task, future = self.writeQueue.get()
+            if task is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                self.writeLock.acquire(True)
+                try:
+                    result = task(self.writeCursor)
+                    self.writer.commit()
+                except BaseException as error:
+                    self.writer.rollback()
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            finally:
+                self.writeLock.release()
+
+    def submit(self, task: callable):
+        """ Queues a write task for the writer thread.
+
+            :param task:    Callable that gets passed the writer cursor and does the actual writing.
+
+            :return:        Future of the result of the task.
+
+                note::  Author(s): Mitch """
+
+        future = Future()
+        if current_thread() is self.writerThread:
+            # a task that queues another write can't wait for itself
+            try:
+                future.set_result(task(self.writeCursor))
+            except BaseException as error:
+                future.set_exception(error)
+        else:
+            self.writeQueue.put((task, future))
+        return future
+
+    def execute(self, task: callable):
+        """ Queues a write task for the writer thread and waits for it to finish.
+
+            :param task:    Callable that gets passed the writer cursor and does the actual writing.
+
+            :return:        The result of the task.
+
+                note::  Author(s): Mitch """
+
+        return self.submit(task).result()
+
+    def write(self, sql: str, parameters=(), many: bool = False):
+        """ Executes a single write statement in its own transaction.
+
+            :param sql:         The sql statement to execute.
+            :param parameters:  The parameters of the statement or a sequence of parameters if many is set.
+            :param many:        Flag that indicates if the statement should be executed for a sequence of parameters.
+
+            :return:            The row id of the last row that was inserted.
+
+                note::  Author(s): Mitch """
+
+        def task(cursor: Cursor):
+            if many:
+                cursor.executemany(sql, parameters)
+            else:
+                cursor.execute(sql, parameters)
+            return cursor.lastrowid
+
+        return self.execute(task)
+
+    def close(self):
+        """ Stops the writer thread after it finished the queued writes and closes the connections.
+
+                note::  Author(s): Mitch """
+
+        self.writeQueue.put((None, None))
+        self.writerThread.join()
+        self.writer.close()
+        reader = getattr(self.readers, 'connection', None)
+        if reader is not None:
+            reader.close()
+            self.readers.connection = None
+
+
+connectionManagers = {}
+connectionManagersLock = Lock()
+
+
+def getConnectionManager(DB_PATH: str):
+    """ Gets the connection manager of a database file so all database dictionaries of the same file share the single
+    writer. Every call counts as a user of the manager until it's released again.
+
+        :param DB_PATH: The path to the database.
+
+        :return:        The connection manager of the database.
+
+            note::  Author(s): Mitch """
+
+    try:
+        connectionManagersLock.acquire(True)
+        if DB_PATH not in connectionManagers:
+            connectionManagers[DB_PATH] = DBConnectionManager(DB_PATH)
+        connectionManagers[DB_PATH].users += 1
+        return connectionManagers[DB_PATH]
+    finally:
+        connectionManagersLock.release()
+
+
+def releaseConnectionManager(connectionManager: DBConnectionManager):
+    """ Releases a connection manager gotten from getConnectionManager. The manager is closed once it isn't used
+    anymore.
+
+        :param connectionManager:   The connection manager to release.
+
+            note::  Author(s): Mitch """
+
+    try:
+        connectionManagersLock.acquire(True)
+        connectionManager.users -= 1
+        if connectionManager.users > 0:
+            return
+        if connectionManagers.get(connectionManager.DB_PATH) is connectionManager:
+            connectionManagers.pop(connectionManager.DB_PATH)
+    finally:
+        connectionManagersLock.release()
+
+    connectionManager.close()
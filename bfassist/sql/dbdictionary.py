@@ -11,20 +11,44 @@ data it also offers a few more complex functions for interaction with the databa
 For instance it gives the ability to add data priority rules from the db management class, find data sets via an entry
 in a column with the UNIQUE constraint or by all its values except for the primary key.
 
+Dictionaries can furthermore run in write-behind mode. In that case the setters of the stored elements don't write to
+the database immediately but keep their values pending in memory. The pending values are then flushed in batched
+transactions when a time or size threshold is reached or when the flush is triggered explicitly.
+
+All dictionaries of the same database file share a connection manager. Reads are done on a connection per thread while
+writes are funneled through a single writer connection, see dbconnection. The sql strings needed for the common
+operations are built once per dictionary and then reused.
+
+The live set of a dictionary is indexed on the primary key, the columns with the UNIQUE constraint and the full
+definition of its elements, see dbliveset, so lookups of live elements don't have to scan the whole set. Dictionaries
+without a live set can instead keep a bounded cache of the elements used most recently, see dbcache.
+
+Many elements can be inserted at once in a single transaction. The primary key values of such elements are reserved
+up front so no cleanup and no lookup of the last inserted row id is required per element. Elements created while a
+dictionary defers its inserts are collected and inserted this way once the deferral ends.
+
     Dependencies:
 
         sql <- dbdictionary
-         \
+         |
+         |-> dbconnection
+         |-> dbliveset
+         \-> dbcache
           -> dbmanagement   @DBDict.startSQL, @DBDict.addDataPriorityRule
+          -> bfa_logging    @DBDict.stopSQL
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
-from threading import Lock
+from threading import Lock, Timer, local
 from os import path
-from sqlite3 import Cursor, Connection, connect
+from atexit import register
+from sqlite3 import Cursor, Connection
 from typing import get_type_hints
 
 from bfassist.sql import DBStorable
+from bfassist.sql.dbconnection import DBConnectionManager, getConnectionManager, releaseConnectionManager
+from bfassist.sql.dbliveset import DBLiveSet
+from bfassist.sql.dbcache import DBObjectCache
 
 
 # noinspection PyUnusedLocal
@@ -47,25 +71,43 @@ class DBDict:
 
         :param column_definitions:  A dictionary containing the column definitions depending on the store type
                                     {columnName: [columnDataType, "modifiers"...]}. Taken from the store type.
-        :param liveSet:             A live set containing all elements stored.
+        :param liveSet:             An indexed live set containing all elements stored.
         :param primary:             Column name of the primary key.
         :param indexOfPrimary:      The index of the primary column in the list of columns.
 
-        :param db:                  The cursor of the database.
-        :param dbLock:              The threading lock for the cursor of this database.
-        :param bfaSQLdatabase:      The connection to the database.
+        :param connections:         The connection manager of the database.
+        :param db:                  The cursor of the writer connection of the database.
+        :param dbLock:              The threading lock for the writer connection of the database.
+        :param bfaSQLdatabase:      The writer connection to the database.
+        :param statements:          Cache of the sql strings used by this dictionary.
+        :param cache:               Least recently used cache of the elements of a dictionary without live set.
+
+        :param writeBehind:         Flag showing if setter writes should be kept pending and flushed in batches.
+        :param flushInterval:       Maximum number of seconds a write stays pending in write-behind mode.
+        :param flushSize:           Number of pending writes that triggers a flush in write-behind mode.
+        :param pending:             The pending writes as dictionary {primaryKeyValue: {columnName: sqlValue}}.
+        :param pendingSize:         The number of pending writes.
+        :param pendingLock:         The threading lock for the pending writes.
+        :param flushing:            List of the pending writes taken by flushes that are still being written.
+        :param flushTimer:          Timer that flushes the pending writes when the flush interval expired.
+
+        :param deferred:            Thread local storage holding the elements whose inserts are currently deferred.
 
             note::  Author(s): Mitch """
     def __init__(self, table: str, storeType: DBStorable, requireLiveSet: bool = True, column_definitions: dict = None,
-                 liveSet: set = None, primary: str = "", indexOfPrimary: int = None, db: Cursor = None,
-                 dbLock: Lock = None, bfaSQLdatabase: Connection = None):
-
-        if isinstance(db, Cursor) and isinstance(bfaSQLdatabase, Connection) and dbLock is not None:
-            self.db = db
-            self.bfaSQLdatabase = bfaSQLdatabase
+                 liveSet: DBLiveSet = None, primary: str = "", indexOfPrimary: int = None,
+                 connections: DBConnectionManager = None, statements: dict = None, cache: DBObjectCache = None,
+                 cacheSize: int = 0, writeBehind: bool = False,
+                 flushInterval: float = 1., flushSize: int = 256, pending: dict = None, pendingSize: int = 0,
+                 pendingLock: Lock = None, flushing: list = None, flushTimer: Timer = None, deferred: local = None):
+
+        if connections:
+            self.connections = connections
+            self.bfaSQLdatabase = self.connections.writer
+            self.db = self.connections.writeCursor
+            self.dbLock = self.connections.writeLock
         else:
             self.startSQL()
-            self.dbLock = Lock()
 
         self.table = table
         self.storeType = storeType
@@ -76,11 +118,6 @@ class DBDict:
         else:
             self.column_definitions = self.storeType.column_definitions
 
-        if liveSet:
-            self.liveSet = liveSet
-        else:
-            self.liveSet = set()
-
         if primary:
             self.primary = primary
         else:
@@ -95,6 +132,31 @@ class DBDict:
         else:
             self.indexOfPrimaryKey = list(self.column_definitions.keys()).index(self.primary)
 
+        if liveSet:
+            self.liveSet = liveSet
+        else:
+            self.liveSet = self.createLiveSet()
+
+        if cache:
+            self.cache = cache
+        elif self.requireLiveSet:
+            self.cache = DBObjectCache()
+        else:
+            self.cache = DBObjectCache(cacheSize)
+
+        if statements:
+            self.statements = statements
+        else:
+            self.statements = {
+                'select': 'SELECT * FROM ' + self.table + ' WHERE ' + self.primary + '=?',
+                'contains': 'SELECT 1 FROM ' + self.table + ' WHERE ' + self.primary + '=? LIMIT 1',
+                'insert': 'INSERT INTO ' + self.table + ' VALUES (' + ('?,' * len(self.column_definitions))[:-1] + ')',
+                'delete': 'DELETE FROM ' + self.table + ' WHERE ' + self.primary + '=?',
+                'selectAll': 'SELECT * FROM ' + self.table,
+                'selectLast': 'SELECT * FROM ' + self.table + ' ORDER BY ROWID DESC LIMIT 1',
+                'maxRowId': 'SELECT IFNULL(MAX(ROWID), 0) FROM ' + self.table
+            }
+
         if self.tableExists():
             if not self.tableStructureMatch():
                 self.backupTable()
@@ -102,9 +164,222 @@ class DBDict:
         else:
             self.setup()
 
+        self.writeBehind = writeBehind
+        self.flushInterval = flushInterval
+        self.flushSize = flushSize
+
+        if pending:
+            self.pending = pending
+        else:
+            self.pending = {}
+        self.pendingSize = pendingSize
+
+        if pendingLock:
+            self.pendingLock = pendingLock
+        else:
+            self.pendingLock = Lock()
+        if flushing:
+            self.flushing = flushing
+        else:
+            self.flushing = []
+
+        self.flushTimer = flushTimer
+
+        if deferred:
+            self.deferred = deferred
+        else:
+            self.deferred = local()
+
+        if self.writeBehind:
+            register(self.flush)
+
         if self.requireLiveSet:
             self.refresh_liveSet()
 
+    def queueUpdate(self, column: str, key, sqlValue):
+        """ Keeps a write of a setter pending in write-behind mode. Triggers a flush if the size threshold is reached
+        and makes sure a flush is scheduled otherwise.
+
+            :param column:      The name of the column to write.
+            :param key:         The primary key value of the row to write.
+            :param sqlValue:    The value to write already converted to its sql insertable format.
+
+                note::  Author(s): Mitch """
+
+        try:
+            self.pendingLock.acquire(True)
+            row = self.pending.setdefault(key, {})
+            if column not in row:
+                self.pendingSize += 1
+            row[column] = sqlValue
+            flushNow = self.pendingSize >= self.flushSize
+            if not flushNow and self.flushTimer is None:
+                self.flushTimer = Timer(self.flushInterval, self.flush)
+                self.flushTimer.daemon = True
+                self.flushTimer.start()
+        finally:
+            self.pendingLock.release()
+
+        if flushNow:
+            self.flush()
+
+    def flush(self):
+        """ Writes all pending writes to the database in a single transaction, batching the updates per column. The
+        pending writes are taken by the writer thread when it gets to the flush, so flushes are written in the order
+        their writes were made. The pending lock is never held while waiting for the writer thread. If writing fails
+        the writes are pending again, unless they were overwritten meanwhile.
+
+            :return:    The number of writes that were flushed.
+
+                note::  Author(s): Mitch """
+
+        try:
+            self.pendingLock.acquire(True)
+            if self.flushTimer is not None:
+                self.flushTimer.cancel()
+                self.flushTimer = None
+            if not self.pending:
+                return 0
+        finally:
+            self.pendingLock.release()
+
+        taken = []
+
+        def flushUpdates(cursor: Cursor):
+            try:
+                self.pendingLock.acquire(True)
+                taken.append((self.pending, self.pendingSize))
+                self.flushing.append(self.pending)
+                self.pending = {}
+                self.pendingSize = 0
+            finally:
+                self.pendingLock.release()
+
+            updates = {}
+            for key, row in taken[0][0].items():
+                for column, sqlValue in row.items():
+                    updates.setdefault(column, []).append((sqlValue, key))
+            for columnName in updates:
+                cursor.executemany(self.getUpdateString(columnName), updates[columnName])
+            return taken[0][1]
+
+        try:
+            return self.connections.execute(flushUpdates)
+        except Exception:
+            if taken:
+                self.restorePending(taken[0][0])
+            raise
+        finally:
+            if taken:
+                try:
+                    self.pendingLock.acquire(True)
+                    self.flushing.remove(taken[0][0])
+                finally:
+                    self.pendingLock.release()
+
+    def restorePending(self, writes: dict):
+        """ Makes writes that couldn't be flushed pending again. Writes that were made to the same columns meanwhile are
+        kept.
+
+            :param writes:  The writes as dictionary {primaryKeyValue: {columnName: sqlValue}}.
+
+                note::  Author(s): Mitch """
+
+        try:
+            self.pendingLock.acquire(True)
+            for key, row in writes.items():
+                pendingRow = self.pending.setdefault(key, {})
+                for column, sqlValue in row.items():
+                    if column not in pendingRow:
+                        pendingRow[column] = sqlValue
+                        self.pendingSize += 1
+        finally:
+            self.pendingLock.release()
+
+    def applyPending(self, row: tuple):
+        """ Applies the pending writes and the writes that are being flushed to a row fetched from the database so reads
+        see the pending values. Has to be called while holding the pending lock.
+
+            :param row: The row as fetched from the database.
+
+            :return:    The row with the pending values applied.
+
+                note::  Author(s): Mitch """
+
+        key = row[self.indexOfPrimaryKey]
+        pendingRow = {}
+        for writes in self.flushing + [self.pending]:
+            if key in writes:
+                pendingRow.update(writes[key])
+        if not pendingRow:
+            return row
+
+        return tuple(pendingRow[column] if column in pendingRow else row[index]
+                     for index, column in enumerate(self.column_definitions))
+
+    def elementFromRow(self, row: tuple):
+        """ Gets the element of a row fetched from the database. If the element is live or cached already that
+        identical element is returned, otherwise the element is created from the row and kept live or cached.
+
+            :param row: The row as fetched from the database.
+
+            :return:    The element.
+
+                note::  Author(s): Mitch """
+
+        key = row[self.indexOfPrimaryKey]
+        if self.requireLiveSet:
+            element = self.liveSet.get(key)
+        else:
+            element = self.cache.get(key)
+
+        if element is None:
+            element = self.storeType.fromSQLResult(row)
+            if self.requireLiveSet:
+                self.liveSet.add(element)
+            else:
+                self.cache.put(key, element)
+        return element
+
+    def createLiveSet(self):
+        """ Creates an empty live set indexed according to the column definitions of this table.
+
+            :return:    The empty live set.
+
+                note::  Author(s): Mitch """
+
+        return DBLiveSet(self.primary,
+                         [columnName for columnName in self.column_definitions
+                          if 'UNIQUE' in self.column_definitions[columnName][1]],
+                         [columnName for columnName in self.column_definitions if columnName != self.primary])
+
+    def getUpdateString(self, columnName: str):
+        """ Gets the sql string to update a single column of a row via its primary key.
+
+            :param columnName:  The name of the column to update.
+
+            :return:            The sql string for the update.
+
+                note::  Author(s): Mitch """
+
+        if 'update' + columnName not in self.statements:
+            self.statements['update' + columnName] = "UPDATE " + self.table + " SET " + columnName + "=? WHERE " + \
+                                                     self.primary + "=?"
+        return self.statements['update' + columnName]
+
+    def getSelectWhereString(self, columnName: str):
+        """ Gets the sql string to select the rows that have a particular value in a column.
+
+            :param columnName:  The name of the column.
+
+            :return:            The sql string for the select.
+
+                note::  Author(s): Mitch """
+
+        if 'selectWhere' + columnName not in self.statements:
+            self.statements['selectWhere' + columnName] = 'SELECT * FROM ' + self.table + ' WHERE ' + columnName + '=?'
+        return self.statements['selectWhere' + columnName]
+
     def backupTable(self):
         """ Function to backup a table. Intended for use when a table structure mismatch was detected.
 
@@ -115,13 +390,7 @@ class DBDict:
         while self.tableExists(str(varC)):
             varC += 1
 
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute("ALTER TABLE " + self.table + " rename to " + self.table + str(varC))
-            self.bfaSQLdatabase.commit()
-            self.db.fetchall()
-        finally:
-            self.dbLock.release()
+        self.connections.write("ALTER TABLE " + self.table + " rename to " + self.table + str(varC))
 
     def tableStructureMatch(self):
         """ Function to check if the existing table matches the currently defined structures.
@@ -130,12 +399,8 @@ class DBDict:
 
                 note::  Author(s): Mitch """
 
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute("SELECT sql FROM sqlite_master WHERE type=\'table\' AND name =\'" + self.table + "\'")
-            ret = self.db.fetchone()[0]
-        finally:
-            self.dbLock.release()
+        ret = self.connections.read("SELECT sql FROM sqlite_master WHERE type=\'table\' AND name =\'" + self.table +
+                                    "\'")[0][0]
 
         if ret == self.createTableString():
             return True
@@ -151,13 +416,8 @@ class DBDict:
 
                 note::  Author(s): Mitch """
 
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute("SELECT count(name) FROM sqlite_master WHERE type=\'table\' AND name =\'" + self.table +
-                            suffix + "\'")
-            ret = self.db.fetchone()[0]
-        finally:
-            self.dbLock.release()
+        ret = self.connections.read("SELECT count(name) FROM sqlite_master WHERE type=\'table\' AND name =\'" +
+                                    self.table + suffix + "\'")[0][0]
 
         if ret == 1:
             return True
@@ -174,13 +434,12 @@ class DBDict:
         from bfassist.sql.dbmanagement import Management, DB_PATH
 
         print("Attempting to establish a connection to the database.")
-        if path.exists(DB_PATH):
-            self.bfaSQLdatabase = connect(DB_PATH, check_same_thread=False, timeout=5)
-            self.db = self.bfaSQLdatabase.cursor()
-        else:
+        if not path.exists(DB_PATH):
             print("Database didn't exist, creating a new one!")
-            self.bfaSQLdatabase = connect(DB_PATH, check_same_thread=False, timeout=5)
-            self.db = self.bfaSQLdatabase.cursor()
+        self.connections = getConnectionManager(DB_PATH)
+        self.bfaSQLdatabase = self.connections.writer
+        self.db = self.connections.writeCursor
+        self.dbLock = self.connections.writeLock
 
         if Management.db_size is None:
             Management.updateDBSize()
@@ -188,15 +447,21 @@ class DBDict:
         return True
 
     def stopSQL(self):
-        """ Function to disconnect from the SQL database.
+        """ Function to disconnect from the SQL database. Pending writes are flushed first. The connection manager is
+        shared with the other dictionaries of the database, so it's only closed once none of them uses it anymore.
 
             :return:    True at the end.
 
                 note::  Author(s): Mitch """
 
+        from bfassist.bfa_logging import log
+
         if isinstance(self.bfaSQLdatabase, Connection):
             log("Closing connection to the database.")
-            self.bfaSQLdatabase.close()
+            if self.writeBehind:
+                self.flush()
+            self.bfaSQLdatabase = None
+            releaseConnectionManager(self.connections)
 
         return True
 
@@ -215,26 +480,22 @@ class DBDict:
 
                 note:: Author(s): Mitch """
 
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute(self.createTableString())
-            self.bfaSQLdatabase.commit()
-        finally:
-            self.dbLock.release()
+        self.connections.write(self.createTableString())
 
     def refresh_liveSet(self):
         """ Simple function to refresh the live set of this table.
 
             note::  Author(s): Mitch """
 
-        ret = []
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute("SELECT * FROM " + self.table)
-            ret = self.db.fetchall()
-        finally:
-            self.dbLock.release()
-            self.liveSet = set([self[row[self.indexOfPrimaryKey]] for row in ret])
+        self.flush()
+        ret = self.connections.read(self.statements['selectAll'])
+        liveSet = self.createLiveSet()
+        for row in ret:
+            element = self.liveSet.get(row[self.indexOfPrimaryKey])
+            if element is None:
+                element = self.storeType.fromSQLResult(row)
+            liveSet.add(element)
+        self.liveSet = liveSet
 
     def __iter__(self):
         """ Gets the elements as iterator.
@@ -257,24 +518,22 @@ class DBDict:
 
                 note::  Author(s): Mitch """
 
-        for element in self.liveSet:
-            # noinspection PyTypeChecker
-            if isinstance(element, self.storeType) and element.getPrimaryKeyValue() == item:
-                return element
+        element = self.liveSet.get(item)
+        if element is not None:
+            return element
+
+        element = self.cache.get(item)
+        if element is not None:
+            return element
 
         try:
-            self.dbLock.acquire(True)
-            self.db.execute('SELECT * FROM ' + self.table + ' WHERE ' + self.primary + '=?', (item,))
-            ret = self.db.fetchall()[0]
+            self.pendingLock.acquire(True)
+            ret = self.applyPending(self.connections.read(self.statements['select'], (item,))[0])
         finally:
-            self.dbLock.release()
+            self.pendingLock.release()
 
         if ret:
-            to_up = self.storeType.fromSQLResult(ret)
-
-            if self.requireLiveSet:
-                self.liveSet.add(to_up)
-            return to_up
+            return self.elementFromRow(ret)
         else:
             return None
 
@@ -286,27 +545,111 @@ class DBDict:
 
                 note::  Author(s): Mitch """
 
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute(
-                "INSERT INTO " + self.table + " VALUES (" + ("?," * len(self.column_definitions))[:-1] + ")",
-                value.intoSQLTuple())
-            self.bfaSQLdatabase.commit()
-
+        def insert(cursor: Cursor):
+            cursor.execute(self.statements['insert'], value.intoSQLTuple())
+            rowId = cursor.lastrowid
             if key is None:
-                self.db.execute("select last_insert_rowid()")
-                ret = self.db.fetchall()[0]
-                key = value.sqlToPyForPy[get_type_hints(value.__init__)[value.getPrimaryKey()]](ret[0])
-                value.setPrimaryKeyValue(key)
+                cursor.execute("DELETE FROM " + self.table + " WHERE " + self.primary + " IS NULL OR trim(" +
+                               self.primary + ") = '';")
+            return rowId
+
+        lastRowId = self.connections.execute(insert)
 
-                self.db.execute("DELETE FROM " + self.table + " WHERE " + value.getPrimaryKey() +
-                                " IS NULL OR trim(" + value.getPrimaryKey() + ") = '';")
-                self.bfaSQLdatabase.commit()
+        if key is None:
+            key = value.sqlToPyForPy[get_type_hints(value.__init__)[value.getPrimaryKey()]](lastRowId)
+            value.setPrimaryKeyValue(key)
 
+        if self.requireLiveSet:
+            self.liveSet.add(value)
+        else:
+            self.cache.put(key, value)
+
+    def insertMany(self, elements: list, then: callable = None):
+        """ Inserts several elements into the table in a single transaction. Elements without a primary key value get
+        consecutive row ids reserved inside the transaction.
+
+            :param elements:    The elements to be stored in the table.
+            :param then:        Callable that gets passed the writer cursor and is run in the same transaction right
+                                after the inserts, e.g. to write rows that refer to the new primary key values.
+
+            :return:            The result of then or None if then wasn't specified.
+
+                note::  Author(s): Mitch """
+
+        from bfassist.sql.dbmanagement import Management
+
+        reserve = [element for element in elements if element.getPrimaryKeyValue() is None]
+        if reserve and not self.column_definitions[self.primary][1].startswith('INTEGER'):
+            raise ValueError("Primary key values can only be reserved for an INTEGER primary key but " + self.table +
+                             "." + self.primary + " is " + self.column_definitions[self.primary][1] + ".")
+
+        def insert(cursor: Cursor):
+            if reserve:
+                firstRowId = cursor.execute(self.statements['maxRowId']).fetchone()[0] + 1
+                for offset, element in enumerate(reserve):
+                    element.setPrimaryKeyValue(firstRowId + offset)
+            cursor.executemany(self.statements['insert'], [element.intoSQLTuple() for element in elements])
+            if then:
+                return then(cursor)
+            return None
+
+        try:
+            result = self.connections.execute(insert)
+        except BaseException:
+            for element in reserve:
+                element.setPrimaryKeyValue(None)
+            raise
+
+        for element in elements:
             if self.requireLiveSet:
-                self.liveSet.add(value)
-        finally:
-            self.dbLock.release()
+                self.liveSet.add(element)
+            else:
+                self.cache.put(element.getPrimaryKeyValue(), element)
+
+        if elements:
+            Management.updateDBSize()
+
+        return result
+
+    def deferInserts(self):
+        """ Starts deferring the inserts of new elements created by the calling thread until insertDeferred is called.
+
+                note::  Author(s): Mitch """
+
+        self.deferred.elements = []
+
+    def deferInsert(self, element: DBStorable):
+        """ Defers the insert of an element if the calling thread is currently deferring inserts.
+
+            :param element: The element to be stored in the table.
+
+            :return:        True if the insert was deferred, otherwise false.
+
+                note::  Author(s): Mitch """
+
+        elements = getattr(self.deferred, 'elements', None)
+        if elements is None:
+            return False
+
+        elements.append(element)
+        return True
+
+    def insertDeferred(self, then: callable = None):
+        """ Stops deferring inserts and inserts all elements deferred by the calling thread in a single transaction.
+
+            :param then:    Callable that gets passed the writer cursor and is run in the same transaction right after
+                            the inserts.
+
+            :return:        The result of then or None if then wasn't specified.
+
+                note::  Author(s): Mitch """
+
+        elements = getattr(self.deferred, 'elements', None)
+        self.deferred.elements = None
+
+        if elements or then:
+            return self.insertMany(elements or [], then)
+        return None
 
     def __contains__(self, item: str):
         """ Takes a string and checks if it's a known primary key.
@@ -317,15 +660,10 @@ class DBDict:
 
                 note::  Author(s): Mitch """
 
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute("SELECT * from " + self.table + " WHERE " + self.primary + "=?", (item,))
-            if self.db.fetchall():
-                return True
-            else:
-                return False
-        finally:
-            self.dbLock.release()
+        if self.connections.read(self.statements['contains'], (item,)):
+            return True
+        else:
+            return False
 
     def remove(self, item: str):
         """ Removes an element from the table via its primary key.
@@ -337,14 +675,17 @@ class DBDict:
                 note::  Author(s): Mitch """
 
         try:
-            self.dbLock.acquire(True)
-            self.db.execute("DELETE FROM " + self.table + " WHERE " + self.primary + "=?", (item,))
-            self.db.fetchall()
-            self.bfaSQLdatabase.commit()
+            self.pendingLock.acquire(True)
+            if item in self.pending:
+                self.pendingSize -= len(self.pending.pop(item))
         finally:
-            self.dbLock.release()
-            if self.requireLiveSet:
-                self.refresh_liveSet()
+            self.pendingLock.release()
+
+        try:
+            self.connections.write(self.statements['delete'], (item,))
+        finally:
+            self.liveSet.discard(item)
+            self.cache.discard(item)
 
         if item in self:
             return False
@@ -362,29 +703,14 @@ class DBDict:
                 note::  Author(s): Mitch """
 
         if 'UNIQUE' in self.column_definitions[field][1]:
-            for element in self.liveSet:
-                # noinspection PyTypeChecker
-                if isinstance(element, self.storeType) and element.__getattribute__('get' + field)() == item:
-                    return element
-            try:
-                self.dbLock.acquire(True)
-                self.db.execute('SELECT * FROM ' + self.table + ' WHERE ' + field + '=?', (item,))
-
-                ret = self.db.fetchall()
-
-                if ret:
-                    ret = ret[0]
-                else:
-                    return None
-            finally:
-                self.dbLock.release()
+            element = self.liveSet.getUnique(field, item)
+            if element is not None:
+                return element
+            self.flush()
+            ret = self.connections.read(self.getSelectWhereString(field), (item,))
 
             if ret:
-                to_up = self.storeType.fromSQLResult(ret[0])
-
-                if self.requireLiveSet:
-                    self.liveSet.add(to_up)
-                return to_up
+                return self.elementFromRow(ret[0])
             else:
                 return None
         else:
@@ -398,21 +724,15 @@ class DBDict:
 
                 note::  Author(s): Mitch """
 
-        for element in self.liveSet:
-            if all([True if element.__getattribute__('get' + attr)() == fd[attr] else False for attr in fd]):
-                return True
+        if self.liveSet.getByDefinition(fd) is not None:
+            return True
 
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute('SELECT * FROM ' + self.table + ' WHERE ' + ' AND '.join(field + '=?' for field in fd),
-                            (*fd.values(),))
-            ret = self.db.fetchall()
-        finally:
-            self.dbLock.release()
+        self.flush()
+        ret = self.connections.read('SELECT * FROM ' + self.table + ' WHERE ' +
+                                    ' AND '.join(field + '=?' for field in fd), (*fd.values(),))
 
         if ret:
-            if self.requireLiveSet:
-                self.liveSet.add(self.storeType.fromSQLResult(ret[0]))
+            self.elementFromRow(ret[0])
             return True
         else:
             return False
@@ -428,23 +748,16 @@ class DBDict:
 
                 note::  Author(s): Mitch """
 
-        for element in self.liveSet:
-            if all([True if element.__getattribute__('get' + attr)() == fd[attr] else False for attr in fd]):
-                return element
+        element = self.liveSet.getByDefinition(fd)
+        if element is not None:
+            return element
 
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute('SELECT * FROM ' + self.table + ' WHERE ' + ' AND '.join(field + '=?' for field in fd),
-                            (*fd.values(),))
-            ret = self.db.fetchall()
-        finally:
-            self.dbLock.release()
+        self.flush()
+        ret = self.connections.read('SELECT * FROM ' + self.table + ' WHERE ' +
+                                    ' AND '.join(field + '=?' for field in fd), (*fd.values(),))
 
         if ret:
-            element = self.storeType.fromSQLResult(ret[0])
-            if self.requireLiveSet:
-                self.liveSet.add(element)
-            return element
+            return self.elementFromRow(ret[0])
         else:
             return None
 
@@ -477,17 +790,10 @@ class DBDict:
 
                 note::  Author(s): Mitch """
 
-        try:
-            self.dbLock.acquire(True)
-            self.db.execute("SELECT * FROM " + self.table + " ORDER BY ROWID DESC LIMIT 1")
-            ret = self.db.fetchall()
-        finally:
-            self.dbLock.release()
+        self.flush()
+        ret = self.connections.read(self.statements['selectLast'])
 
         if ret:
-            element = self.storeType.fromSQLResult(ret[0])
-            if self.requireLiveSet:
-                self.liveSet.add(element)
-            return element
+            return self.elementFromRow(ret[0])
         else:
             return None
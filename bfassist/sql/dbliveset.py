@@ -0,0 +1,246 @@
+#############################################################################
+#
+#
+#   BFA SQL Module
+#
+#
+#############################################################################
+""" This module introduces the indexed live set of a db dictionary. Instead of scanning all elements of a live set for
+every lookup the live set keeps a dictionary on the primary key values of its elements. Additionally it keeps secondary
+indexes on the columns with the UNIQUE constraint and on the full definition of its elements, i.e. the values of all
+columns except for the primary key.
+
+    Dependencies:
+
+        sql <- dbliveset
+
+        note::  Author(s): Mitch last-check: 07.07.2021 """
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+def indexKey(value):
+    """ Simple function to turn a value into something hashable that can be used as key of an index.
+
+        :param value:   The value to turn into a key.
+
+        :return:        The key.
+
+            note::  Author(s): Mitch """
+
+    if isinstance(value, set):
+        return frozenset(value)
+    elif isinstance(value, list):
+        return tuple(value)
+    else:
+        return value
+
+
+class DBLiveSet:
+    """ Indexed set of all elements of a db dictionary that are kept live.
+
+        :param primary:             Column name of the primary key.
+        :param uniqueColumns:       Names of the columns that have the UNIQUE constraint.
+        :param definitionColumns:   Names of all columns except for the primary key in the order of the table.
+
+        :param byPrimary:           Dictionary of the elements with their primary key values as keys.
+        :param byUnique:            Dictionary containing an index for every unique column {column: {value: element}}.
+        :param byDefinition:        Dictionary of the elements with their full definitions as keys.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, primary: str, uniqueColumns: list = None, definitionColumns: list = None,
+                 byPrimary: dict = None, byUnique: dict = None, byDefinition: dict = None):
+
+        self.primary = primary
+
+        if uniqueColumns:
+            self.uniqueColumns = uniqueColumns
+        else:
+            self.uniqueColumns = []
+
+        if definitionColumns:
+            self.definitionColumns = definitionColumns
+        else:
+            self.definitionColumns = []
+
+        if byPrimary:
+            self.byPrimary = byPrimary
+        else:
+            self.byPrimary = {}
+
+        if byUnique:
+            self.byUnique = byUnique
+        else:
+            self.byUnique = {column: {} for column in self.uniqueColumns}
+
+        if byDefinition:
+            self.byDefinition = byDefinition
+        else:
+            self.byDefinition = {}
+
+    def __iter__(self):
+        return iter(list(self.byPrimary.values()))
+
+    def __len__(self):
+        return len(self.byPrimary)
+
+    def __bool__(self):
+        return bool(self.byPrimary)
+
+    def __contains__(self, element):
+        return element.getPrimaryKeyValue() in self.byPrimary and \
+               self.byPrimary[element.getPrimaryKeyValue()] is element
+
+    def getDefinitionKey(self, element):
+        """ Builds the key of an element for the full definition index.
+
+            :param element: The element.
+
+            :return:        Tuple of the values of all columns except for the primary key.
+
+                note::  Author(s): Mitch """
+
+        return tuple(indexKey(element.__getattribute__('get' + column)()) for column in self.definitionColumns)
+
+    def indexSecondaries(self, element):
+        """ Adds an element to the secondary indexes.
+
+            :param element: The element to index.
+
+                note::  Author(s): Mitch """
+
+        for column in self.uniqueColumns:
+            try:
+                self.byUnique[column][indexKey(element.__getattribute__('get' + column)())] = element
+            except TypeError:
+                pass
+        try:
+            self.byDefinition.setdefault(self.getDefinitionKey(element), element)
+        except TypeError:
+            pass
+
+    def unindexSecondaries(self, element, column: str = None, oldValue=None):
+        """ Removes an element from the secondary indexes. If a column and its old value are specified the element is
+        removed from the indexes as if the column still had its old value.
+
+            :param element:     The element to remove from the indexes.
+            :param column:      The name of a column whose value just changed.
+            :param oldValue:    The value of that column before the change.
+
+                note::  Author(s): Mitch """
+
+        def valueOf(columnName: str):
+            if columnName == column:
+                return oldValue
+            else:
+                return element.__getattribute__('get' + columnName)()
+
+        for uniqueColumn in self.uniqueColumns:
+            try:
+                key = indexKey(valueOf(uniqueColumn))
+                if self.byUnique[uniqueColumn].get(key) is element:
+                    del self.byUnique[uniqueColumn][key]
+            except TypeError:
+                pass
+        try:
+            key = tuple(indexKey(valueOf(definitionColumn)) for definitionColumn in self.definitionColumns)
+            if self.byDefinition.get(key) is element:
+                del self.byDefinition[key]
+        except TypeError:
+            pass
+
+    def add(self, element):
+        """ Adds an element to the live set and all its indexes.
+
+            :param element: The element to add.
+
+                note::  Author(s): Mitch """
+
+        key = element.getPrimaryKeyValue()
+        if key in self.byPrimary:
+            if self.byPrimary[key] is element:
+                return
+            self.unindexSecondaries(self.byPrimary[key])
+        self.byPrimary[key] = element
+        self.indexSecondaries(element)
+
+    def discard(self, key):
+        """ Removes the element with the given primary key value from the live set and all its indexes.
+
+            :param key: The primary key value of the element to remove.
+
+                note::  Author(s): Mitch """
+
+        element = self.byPrimary.pop(key, None)
+        if element is not None:
+            self.unindexSecondaries(element)
+
+    def reindex(self, element, column: str, oldValue):
+        """ Updates the indexes after the value of a column of an element changed.
+
+            :param element:     The element that changed.
+            :param column:      The name of the column that changed.
+            :param oldValue:    The value of the column before the change.
+
+                note::  Author(s): Mitch """
+
+        if element not in self:
+            return
+        self.unindexSecondaries(element, column, oldValue)
+        self.indexSecondaries(element)
+
+    def get(self, key):
+        """ Gets an element via its primary key value.
+
+            :param key: The primary key value.
+
+            :return:    The element or None if it isn't in the live set.
+
+                note::  Author(s): Mitch """
+
+        return self.byPrimary.get(key)
+
+    def getUnique(self, column: str, value):
+        """ Gets an element via the value of a column with the UNIQUE constraint.
+
+            :param column:  The name of the unique column.
+            :param value:   The value to look for.
+
+            :return:        The element or None if it isn't in the live set.
+
+                note::  Author(s): Mitch """
+
+        try:
+            return self.byUnique[column].get(indexKey(value))
+        except TypeError:
+            return None
+
+    def getByDefinition(self, fd: dict):
+        """ Gets an element via its full definition.
+
+            :param fd:  Fully qualified definition of the element including all columns except for the primary key
+                        as keys and their values respectively.
+
+            :return:    The element or None if it isn't in the live set.
+
+                note::  Author(s): Mitch """
+
+        if len(fd) == len(self.definitionColumns) and all(column in fd for column in self.definitionColumns):
+            try:
+                return self.byDefinition.get(tuple(indexKey(fd[column]) for column in self.definitionColumns))
+            except TypeError:
+                pass
+
+        for element in self:
+            if all(element.__getattribute__('get' + attr)() == fd[attr] for attr in fd):
+                return element
+        return None
@@ -138,13 +138,7 @@ class DBPriority(DBStorable, table="priorityrules", live=False):
 
                 note::  Author(s): Mitch """
 
-        try:
-            self.storageDict.dbLock.acquire(True)
-            self.storageDict.db.execute("SELECT COUNT(*) " + self.getLocationRule())
-            ret = self.storageDict.db.fetchall()[0]
-            self.storageDict.bfaSQLdatabase.commit()
-        finally:
-            self.storageDict.dbLock.release()
+        ret = self.storageDict.connections.read("SELECT COUNT(*) " + self.getLocationRule())[0]
 
         self.setApproxNumberOfElements(ret)
 
@@ -162,13 +156,7 @@ class DBPriority(DBStorable, table="priorityrules", live=False):
             approx_size = eCount
         else:
             approx_size = self.getApproxNumberOfElements() * self.getApproximateElementSize()
-        try:
-            self.storageDict.dbLock.acquire(True)
-            self.storageDict.db.execute("DELETE " + self.getLocationRule())
-            self.storageDict.db.fetchall()
-            self.storageDict.bfaSQLdatabase.commit()
-        finally:
-            self.storageDict.dbLock.release()
+        self.storageDict.connections.write("DELETE " + self.getLocationRule())
 
         self.setNumberOfElements(0)
 
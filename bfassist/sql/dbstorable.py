@@ -134,6 +134,10 @@ class DBStorable:
                                     defined. Theoretically it's possible to set this back to False to introduce more
                                     'S'-attributes at runtime but obviously that would start a new table.
         :param column_count:        The number of columns in this table. Also the number of 'S'-attributes obviously.
+        :param primaryKey:          The column name of the primary key, determined once the column_definitions have
+                                    been initialised.
+        :param sqlConversions:      List of the index in a sql result and the conversion function for every argument of
+                                    the constructor. Built on the first conversion from a sql result.
         :param storageDict:         The corresponding dbdictionary that's supposed to simplify the access of the stored
                                     data.
 
@@ -188,7 +192,7 @@ class DBStorable:
             cls.addConversion(*funcPair)
 
     # noinspection PyMethodOverriding
-    def __init_subclass__(cls, table: str, live: bool):
+    def __init_subclass__(cls, table: str, live: bool, writeBehind: bool = False, cacheSize: int = 0):
         """ This function is called whenever a subclass definition is finished. It sets up SQL connection and schemata
         required depending on the subclass definition.
 
@@ -197,6 +201,10 @@ class DBStorable:
 
             :param table:   The name of the table for this subclass in the database.
             :param live:    Boolean flag that indicates if a live copy of the dbdict should be kept.
+            :param writeBehind: Boolean flag that indicates if the setters should write to the database in batches
+                                rather than immediately, see DBDict.
+            :param cacheSize:   Number of recently used elements the dbdict should keep cached if it doesn't keep a
+                                live copy. 0 disables the cache.
 
                 note::  Author(s): Mitch """
 
@@ -208,6 +216,8 @@ class DBStorable:
         cls.table = table
         cls.storageDict = {}
         cls.initialised = False
+        cls.primaryKey = None
+        cls.sqlConversions = None
 
         # The next line will initialise a "fake" empty object so the column_definitions get filled which is required for
         # the creation of the dbdictionary object
@@ -217,11 +227,15 @@ class DBStorable:
         cls.initialised = True
 
         cls.column_count = len(cls.column_definitions.keys())
+        for S_att in cls.column_definitions:
+            if 'PRIMARY KEY' in cls.column_definitions[S_att][1]:
+                cls.primaryKey = S_att
 
-        cls.storageDict = DBDict(table, cls, live)
+        cls.storageDict = DBDict(table, cls, live, cacheSize=cacheSize, writeBehind=writeBehind)
 
     def insertToDB(self):
-        """ Simple function for inserting an instance to the storage dict.
+        """ Simple function for inserting an instance to the storage dict. If the storage dict currently defers inserts
+        the insert of an instance without primary key value is deferred, see DBDict.deferInserts.
 
                 note::  Author(s): Mitch """
 
@@ -231,6 +245,9 @@ class DBStorable:
         # and the second condition checks that not all values evaluate to False (it's the "fake" empty object)
         if self.getPrimaryKeyValue() not in self.__class__.storageDict and\
                 any(self.__getattribute__('get' + S_att)() for S_att in self.column_definitions):
+            if self.initialised and self.getPrimaryKeyValue() is None and \
+                    self.__class__.storageDict.deferInsert(self):
+                return
             self.__class__.storageDict[self.getPrimaryKeyValue()] = self
             Management.updateDBSize()
 
@@ -242,21 +259,12 @@ class DBStorable:
 
                 note::  Author(s): Mitch """
 
-        args = {}
-        index = 0
-        for S_att in cls.__getattribute__(cls, 'column_definitions'):
-            arg = sql[index]
-            args[S_att] = cls.sqlToPyForPy[cls.__getattribute__(cls, 'column_definitions')[S_att][0]](arg)
-            index += 1
+        if cls.sqlConversions is None:
+            columns = list(cls.column_definitions)
+            cls.sqlConversions = [(columns.index(S_att), cls.sqlToPyForPy[cls.column_definitions[S_att][0]])
+                                  for S_att in list(get_type_hints(cls.__init__))[:cls.column_count]]
 
-        rArgs = []
-
-        index = 0
-        for S_att in get_type_hints(cls.__init__):
-            if index == cls.column_count:
-                break
-            rArgs.append(args[S_att])
-            index += 1
+        rArgs = [conversion(sql[index]) for index, conversion in cls.sqlConversions]
 
         currentClass = cls
         subclasses = currentClass.__subclasses__()
@@ -286,6 +294,9 @@ class DBStorable:
 
                 note::  Author(s): Mitch """
 
+        if self.__class__.primaryKey is not None:
+            return self.__class__.primaryKey
+
         for S_att in self.__class__.column_definitions:
             if 'PRIMARY KEY' in self.__class__.column_definitions[S_att][1]:
                 return S_att
@@ -295,6 +306,9 @@ class DBStorable:
 
                 note::  Author(s): Mitch """
 
+        if self.__class__.primaryKey is not None:
+            return self.__getattribute__('__' + self.__class__.primaryKey)
+
         for S_att in self.__class__.column_definitions:
             if 'PRIMARY KEY' in self.__class__.column_definitions[S_att][1]:
                 return self.__getattribute__('get' + S_att)()
@@ -341,15 +355,20 @@ class DBStorable:
                     """ Setter for 'S'-attribute-values stored in the database.
 
                             note::  Author(s): Mitch """
-                    try:
-                        self.storageDict.dbLock.acquire(True)
-                        self.storageDict.db.execute("UPDATE " + self.table + " SET " + key[1:] + "=? WHERE " +
-                                                    self.getPrimaryKey() + "=?",
-                                                    (self.pyToSQL[type(inValue)](inValue), self.getPrimaryKeyValue(),))
-                        self.storageDict.bfaSQLdatabase.commit()
-                    finally:
-                        self.storageDict.dbLock.release()
+                    oldValue = self.__getattribute__('__' + key[1:])
+                    self.storageDict.cache.discard(self.getPrimaryKeyValue(), self)
+                    if self.storageDict.writeBehind:
+                        if self.getPrimaryKeyValue() is not None:
+                            self.storageDict.queueUpdate(key[1:], self.getPrimaryKeyValue(),
+                                                         self.pyToSQL[type(inValue)](inValue))
+                        self.__setattr__('__' + key[1:], inValue)
+                        self.storageDict.liveSet.reindex(self, key[1:], oldValue)
+                        return True
+                    self.storageDict.connections.write(self.storageDict.getUpdateString(key[1:]),
+                                                       (self.pyToSQL[type(inValue)](inValue),
+                                                        self.getPrimaryKeyValue(),))
                     self.__setattr__('__' + key[1:], inValue)
+                    self.storageDict.liveSet.reindex(self, key[1:], oldValue)
                     return True
 
                 super().__setattr__('set' + key[1:], setValue)
@@ -22,8 +22,9 @@ the module instead you can find the structurally most important functions here.
             |-> webgen
             |-> standalone -\-> server
             |                -> monitoring
-            |-> network ----\-> updatethread
-            \                -> client
+            |-> network ----|-> updatethread
+            |               \-> client
+            \                -> client -> outbox
              -> standalone ---> api         @BFAKern.__init__
                             \-> webservice  @BFAKern.__init__
                              -> webclient   @BFAKern.run
@@ -46,6 +47,7 @@ from bfassist.standalone.monitoring import Player, Players, StatusMessenger, Log
 from bfassist.network import CONFIG, BFA_Settings, toggleAutoUpdate, toggleAutoUpgrade
 from bfassist.network.updatethread import UpdateThread
 from bfassist.network.client import BFA_CLIENT
+from bfassist.network.client.outbox import Outbox, OUTBOX as DEFAULT_OUTBOX
 
 
 # noinspection PyUnusedLocal
@@ -68,6 +70,7 @@ class BFAKern:
         :param REGISTERED_SERVERS:          A dbdictionary containing the servers managed by this kern.
         :param AUTO_UPDATE_THREAD:          A thread that can automatically pull updates and if specified also upgrade
                                             bfa at runtime.
+        :param OUTBOX:                      The outbox sending the results of rounds to the master in the background.
 
         :param API:                         The API which is connected with the KERN.
 
@@ -75,7 +78,7 @@ class BFAKern:
 
     def __init__(self, WEB_SERVICE: WebService = None, BFA_NETWORK: BFA_CLIENT = BFA_CLIENT, config: dict = CONFIG,
                  GLOBAL_MONITORING: bool = False, REGISTERED_SERVERS: DBDict = None,
-                 AUTO_UPDATE_THREAD: UpdateThread = None, API: bfaAPI = None):
+                 AUTO_UPDATE_THREAD: UpdateThread = None, OUTBOX: Outbox = None, API: bfaAPI = None):
 
         from bfassist.standalone.api import BFA_FunctionApiMixIn, bfaAPI
         from bfassist.standalone.webservice import BFA_WEBSERVICE
@@ -105,6 +108,11 @@ class BFAKern:
         else:
             self.AUTO_UPDATE_THREAD = UpdateThread(getUpdate=self.BFA_NETWORK.getUpdate)
 
+        if OUTBOX:
+            self.OUTBOX = OUTBOX
+        else:
+            self.OUTBOX = DEFAULT_OUTBOX
+
         if API:
             self.API = API
         else:
@@ -139,6 +147,7 @@ class BFAKern:
 
         log("Turning on global monitoring.")
         self.GLOBAL_MONITORING = True
+        self.OUTBOX.startup()
 
         log("Hooking all registered servers to the framework.")
         for SERVER in self.REGISTERED_SERVERS:
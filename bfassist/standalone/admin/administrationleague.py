@@ -201,10 +201,11 @@ class LeagueAdministration(ServerAdministration):
         if BFA_CLIENT.checkPlayer(player):
             to_check = BFA_CLIENT.requestActiveMaps()
             if to_check:
+                self.server.MapInterface.scanMaps()
                 for mapName in to_check:
                     if mapName in Maps and Maps[mapName].getDigest() == to_check[mapName] and \
                             self.server.MapInterface.pathToMods + "bf1942/archives/bf1942/levels/" in \
-                            Maps[MapName].getPaths():
+                            Maps[mapName].getPaths():
                         to_check[mapName] = False
                     else:
                         to_check[mapName] = True
@@ -230,6 +231,7 @@ class LeagueAdministration(ServerAdministration):
 
         if BFA_CLIENT.checkPlayerIsLeader(player):
             to_check = BFA_CLIENT.requestActiveMaps()
+            self.server.MapInterface.scanMaps()
             for mapName in to_check:
                 if mapName in Maps and Maps[mapName].getDigest() == to_check[mapName] and \
                         self.server.MapInterface.pathToMods + \
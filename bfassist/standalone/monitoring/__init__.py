@@ -17,7 +17,9 @@
                     |-> storedsettings
                     |-> storedround
                     |-> realtimeround
-                    \-> realtimeevent
+                    |-> realtimeevent
+                    |-> bfxmltokenizer
+                    \-> eventlogtailer
                      -> logreader
 
         note::  Author(s): last-check: 08.07.2021 """
@@ -31,6 +33,8 @@ from bfassist.standalone.monitoring.storedsettings import BfServerSetting, BfSer
 from bfassist.standalone.monitoring.storedround import BfRound, BfRounds
 from bfassist.standalone.monitoring.realtimeround import RealTimeRound
 from bfassist.standalone.monitoring.realtimeevent import RealTimeEvent
+from bfassist.standalone.monitoring.bfxmltokenizer import BfXmlTokenizer, BfXmlToken
+from bfassist.standalone.monitoring.eventlogtailer import EventLogTailer
 from bfassist.standalone.monitoring.logreader import LogReader
 
 
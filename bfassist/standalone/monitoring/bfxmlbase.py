@@ -9,25 +9,25 @@
 
     Dependencies:
 
-        2nd-party dependency numpy
-
             bfassist <- standalone <- monitoring <- bfxmlbase
                 |           |           \
                 |           \            -> logreader
                 |            -> monitoring
-                \-> bfa_logging
-                 -> network -> client   @LogReaderParsing.parseRoundStats
+                |-> bfa_logging
+                 -> standalone <- monitoring <- bfxmltokenizer
 
         note::  Author(s): Mitch, henk last-check: 08.07.2021 """
 
 from datetime import timedelta
 from html import unescape
-
-from numpy import fromstring
+from sqlite3 import Cursor
 
 from bfassist.standalone.monitoring.logreader import *
+from bfassist.standalone.monitoring.bfxmltokenizer import tokenizeEvent, event_param, importParamFromString, \
+                                                         event_starts, round_starts, roundstats_start, roundstats_end, \
+                                                         server_starts
 from bfassist.standalone.monitoring import RealTimeEvent, RealTimeRound, BfServerSettings, BfServerSetting,\
-                                           BfPlayerRound
+                                           BfPlayerRound, BfPlayerRounds, BfRounds
 from bfassist.bfa_logging import log
 
 
@@ -51,16 +51,20 @@ class LogReaderParsing(LogReader):
 
         self.realTimeRound = self.server.StatsInterface.realTimeRound
 
-    def parseEvent(self, inXML: str):
-        """ Function to parse BfEvent-xml.
+    def parseEvent(self, inXML: str or RealTimeEvent):
+        """ Function to parse BfEvent-xml. Usually the event has already been tokenized by the log reader.
 
-            :param inXML:   The xml to be processed.
+            :param inXML:   The xml to be processed or the already tokenized event.
 
                 note::  Author(s): Mitch """
 
-        eventName, timeStamp, inXML = self.getNameAndTimeStamp(inXML)
-        event = RealTimeEvent(eventName)
-        event.parameters = self.getAllXMLParameters(inXML)
+        if isinstance(inXML, RealTimeEvent):
+            event = inXML
+        else:
+            event = tokenizeEvent(inXML)
+            if event is None:
+                return
+        eventName, timeStamp = event.eventType, event.timeStamp
         if timeStamp in self.realTimeRound.eventDict:
             self.realTimeRound .eventDict[timeStamp].append(event)
         else:
@@ -99,24 +103,55 @@ class LogReaderParsing(LogReader):
         log("Parsing RoundStats for a server.", 1)
         inLines = inXML.splitlines()
 
+        # the player rounds are collected while parsing and then written together with the round in one transaction
+        BfPlayerRounds.deferInserts()
+        try:
+            self.parseRoundStatLines(inLines)
+        finally:
+            BfPlayerRounds.insertDeferred()
+    super().tagList[roundstats_start] = parseRoundStats
+
+    def finalizeRound(self):
+        """ Function to write a finished round with all of its player rounds to the database. The player rounds get
+        their ids reserved and are inserted in the same transaction that writes the result ids of the round. Everything
+        else still pending for the round and its player rounds is flushed afterwards.
+
+                note::  Author(s): Mitch """
+
+        roundStats = self.realTimeRound.roundStats
+
+        # runs on the writer thread, so it writes on the cursor instead of using setters or flushing
+        def writeRound(cursor: Cursor):
+            resultIds = set(str(playerRound.getPlayerRoundId()) for playerRound in roundStats.results.values())
+            cursor.execute(BfRounds.getUpdateString('ResultIds'),
+                           (roundStats.pyToSQL[set](resultIds), roundStats.getPrimaryKeyValue()))
+            return resultIds
+
+        roundStats.__setattr__('__ResultIds', BfPlayerRounds.insertDeferred(writeRound))
+        BfPlayerRounds.flush()
+        BfRounds.flush()
+
+    def parseRoundStatLines(self, inLines: list):
+        """ Function to parse the lines of BfRoundStats-xml.
+
+            :param inLines: The lines to be processed.
+
+                note::  Author(s): Mitch """
+
         while inLines:
             line = inLines.pop(0).strip()
             if line.startswith(roundstats_end):
-                self.realTimeRound.roundStats.setResultIds(
-                    set(str(playerRound.getPlayerRoundId())
-                        for playerRound in self.realTimeRound.roundStats.results.values())
-                )
-
-                if self.realTimeRound.liveRound:
-                    from bfassist.network.client import BFA_CLIENT
-                    BFA_CLIENT.updateLeaguePlayers(self.server.PlayerInterface.onlinePlayerWithId)
-                    self.realTimeRound.roundStats.sendToMaster()
-                    self.realTimeRound.liveRound = False
-
-                self.server.StatsInterface.realTimeRound = None
-                self.realTimeRound = self.server.StatsInterface.realTimeRound
+                try:
+                    self.finalizeRound()
+
+                    if self.realTimeRound.liveRound:
+                        self.realTimeRound.roundStats.sendToMaster(self.server.PlayerInterface.onlinePlayerWithId)
+                        self.realTimeRound.liveRound = False
+                finally:
+                    self.server.StatsInterface.realTimeRound = None
+                    self.realTimeRound = self.server.StatsInterface.realTimeRound
             elif line.startswith('<bf:playerstat'):
-                currentPlayer_id = int(line[line.find('"'):line.rfind('"')])
+                currentPlayer_id = int(line.split('"')[1])
                 inLines = self.parsePlayerStat(currentPlayer_id, inLines)
             elif line.startswith('<bf:teamtickets team="2"'):
                 self.realTimeRound.roundStats.setTicketsAllies(self.getInnerXML(line))
@@ -126,7 +161,6 @@ class LogReaderParsing(LogReader):
                 self.realTimeRound.roundStats.setVType(self.getInnerXML(line))
             elif line.startswith('<bf:winningteam'):
                 self.realTimeRound.roundStats.setWinner(self.getInnerXML(line))
-    super().tagList[roundstats_start] = parseRoundStats
 
     def parseServerSettings(self, inXML: str):
         """ Function to parse BfSettings-xml.
@@ -231,22 +265,8 @@ class LogReaderParsing(LogReader):
 
                 note::  Author(s): Mitch """
 
-        params = {}
-
-        paramStart = inXML.find("<bf:param ")
-        while paramStart != -1:
-            inXML = inXML[paramStart + len("<bf:param "):]
-            typeStart = inXML.find("type=\"")
-            inXML = inXML[typeStart + len("type=\""):]
-            typeEnd = inXML.find("\"")
-            Type = inXML[:typeEnd]
-            paramStart = inXML.find("name=\"")
-            inXML = inXML[paramStart + len("name=\""):]
-            paramEnd = inXML.find("\"")
-            params[inXML[:paramEnd]] = self.importParamFromString(unescape(inXML[paramEnd + 2:inXML.find("<")]), Type)
-            paramStart = inXML.find("<bf:param ")
-
-        return params
+        return {name: self.importParamFromString(unescape(value), Type)
+                for Type, name, value in event_param.findall(inXML)}
 
     @staticmethod
     def getInnerXML(inXML: str):
@@ -275,15 +295,7 @@ class LogReaderParsing(LogReader):
 
                 note::  Author(s): Mitch, henk """
 
-        if inType == 'int':
-            return int(inParam)
-        elif inType == 'vec3':
-            if inType == '(unknown)':
-                return None
-            else:
-                return fromstring(inParam, dtype=float, sep='/')
-        elif inType == 'string':
-            return inParam
+        return importParamFromString(inParam, inType)
 
 
 LogReader = LogReaderParsing
@@ -136,7 +136,7 @@ class LogReaderEventProcessing(LogReader):
         new_player = self.realTimeRound.createPlayer(player_id, player_location, name, is_ai, team)
         self.server.PlayerInterface.addPlayer(new_player)
         # Do this to get the IP of the new player
-        self.server.MonitoringInterface.bootPlayers()
+        self.server.MonitoringInterface.bootPlayers(wait=False)
     super().hooks['createPlayer'] = onCreatePlayer
 
     def onDestroyPlayer(self, inEvent: RealTimeEvent):
@@ -0,0 +1,190 @@
+#############################################################################
+#
+#
+# Module of BFA that tokenizes bf-xml 1.1 incrementally
+#
+#
+#############################################################################
+""" This module implements a streaming tokenizer for the bf-xml of the event log. It's fed line by line, assembles the
+paragraphs the log reader is interested in in a single pass and directly turns bf events into real time events using
+compiled regular expressions.
+
+    Dependencies:
+
+        2nd-party dependency numpy
+
+            bfassist <- standalone <- monitoring <- bfxmltokenizer
+                                        |
+                                         -> realtimeevent
+
+        note::  Author(s): Mitch last-check: 08.07.2021 """
+
+from re import compile as compileRegex
+from html import unescape
+
+from numpy import fromstring
+
+from bfassist.standalone.monitoring import RealTimeEvent
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+round_starts = '<bf:round'
+log_ends = '</bf:log>'
+
+server_starts = '<bf:server'
+server_ends = '</bf:server'
+
+event_starts = '<bf:event'
+event_ends = '</bf:event'
+
+roundstats_start = '<bf:roundstats'
+roundstats_end = '</bf:roundstats'
+
+# opening tags of paragraphs mapped to the tag closing them, None if the paragraph is a single line
+paragraph_tags = {
+    event_starts: event_ends,
+    server_starts: server_ends,
+    roundstats_start: roundstats_end,
+    round_starts: None
+}
+
+opening_tag = compileRegex(r'<bf:(?:event|server|roundstats|round)\b')
+event_header = compileRegex(r'<bf:event\s+name="([^"]*)"\s+timestamp="([^"]*)"')
+event_param = compileRegex(r'<bf:param\s+type="([^"]*)"\s+name="([^"]*)"\s*>([^<]*)</bf:param>')
+
+
+def importParamFromString(inParam: str, inType: str):
+    """ Function that imports a parameter from string and casts it to its corresponding type.
+
+        :param inParam: The value of the parameter as string.
+        :param inType:  The type of the parameter.
+
+        :return:        The parameter having its corresponding type.
+
+            note::  Author(s): Mitch, henk """
+
+    if inType == 'int':
+        return int(inParam)
+    elif inType == 'vec3':
+        if inParam == '(unknown)':
+            return None
+        else:
+            return fromstring(inParam, dtype=float, sep='/')
+    elif inType == 'string':
+        return inParam
+
+
+def tokenizeEvent(inXML: str):
+    """ Function that turns the bf-xml of a complete bf event into a real time event in a single pass.
+
+        :param inXML:   The xml of the event.
+
+        :return:        The real time event or None if the xml doesn't contain an event header.
+
+            note::  Author(s): Mitch """
+
+    header = event_header.search(inXML)
+    if header is None:
+        return None
+    parameters = {name: importParamFromString(unescape(value), Type)
+                  for Type, name, value in event_param.findall(inXML, header.end())}
+    return RealTimeEvent(header.group(1), parameters, header.group(2))
+
+
+class BfXmlToken:
+    """ A complete paragraph of bf-xml as emitted by the tokenizer.
+
+        :param tag:         The opening tag of the paragraph, i.e. the key to dispatch it with in the tag list.
+        :param paragraph:   The xml of the paragraph.
+        :param event:       The real time event if the paragraph is a bf event.
+
+            note::  Author(s): Mitch """
+
+    __slots__ = ('tag', 'paragraph', 'event')
+
+    def __init__(self, tag: str, paragraph: str, event: RealTimeEvent = None):
+        self.tag = tag
+        self.paragraph = paragraph
+        self.event = event
+
+
+class BfXmlTokenizer:
+    """ Incremental tokenizer for bf-xml. Lines are fed one at a time and complete paragraphs are returned as tokens as
+    soon as their closing tag has been fed.
+
+        :param currentTag:      The opening tag of the paragraph that's currently being assembled.
+        :param currentEnd:      The closing tag of the paragraph that's currently being assembled.
+        :param lines:           The lines of the paragraph that's currently being assembled.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, currentTag: str = None, currentEnd: str = None, lines: list = None):
+        self.currentTag = currentTag
+        self.currentEnd = currentEnd
+        if lines:
+            self.lines = lines
+        else:
+            self.lines = []
+
+    def reset(self):
+        """ Drops the paragraph that's currently being assembled.
+
+                note::  Author(s): Mitch """
+
+        self.currentTag = None
+        self.currentEnd = None
+        self.lines = []
+
+    def finishParagraph(self):
+        """ Joins the lines of the current paragraph and turns it into a token.
+
+            :return:    The token of the finished paragraph.
+
+                note::  Author(s): Mitch """
+
+        paragraph = "".join(self.lines)
+        if self.currentTag == event_starts:
+            token = BfXmlToken(self.currentTag, paragraph, tokenizeEvent(paragraph))
+        else:
+            token = BfXmlToken(self.currentTag, paragraph)
+        self.reset()
+        return token
+
+    def feed(self, line: str):
+        """ Feeds a line of the event log to the tokenizer.
+
+            :param line:    The line to feed.
+
+            :return:        The token of the paragraph the line finished or None if no paragraph was finished.
+
+                note::  Author(s): Mitch """
+
+        if not line:
+            return None
+        if self.currentTag is None:
+            start = opening_tag.search(line)
+            if start is None:
+                return None
+            self.currentTag = start.group()
+            self.currentEnd = paragraph_tags[self.currentTag]
+            self.lines.append(line)
+            if self.currentEnd is None or self.currentEnd in line:
+                return self.finishParagraph()
+            return None
+        if log_ends in line:
+            # the log ended in the middle of a paragraph so what we have so far can't be completed anymore
+            self.reset()
+            return None
+        self.lines.append(line)
+        if self.currentEnd in line:
+            return self.finishParagraph()
+        return None
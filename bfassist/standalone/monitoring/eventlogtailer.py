@@ -0,0 +1,281 @@
+#############################################################################
+#
+#
+# Module of BFA that follows the event logs of a server natively
+#
+#
+#############################################################################
+""" This module implements an in-process tailer for the bf1942 xml event logs. It follows the newest event log in a
+directory by file offset and switches to the next log when the server rotates logs, e.g. on map change. If the platform
+offers inotify it's used to wait for changes, otherwise the tailer falls back to polling.
+
+    Dependencies:
+
+        bfassist <- standalone <- monitoring <- eventlogtailer
+            |
+             -> bfa_logging
+
+        note::  Author(s): Mitch last-check: 08.07.2021 """
+
+from glob import glob
+from os import read, close, stat
+from os.path import getmtime, getctime
+from select import select
+from time import sleep, time
+from datetime import datetime
+
+from bfassist.bfa_logging import log
+
+try:
+    from ctypes import CDLL
+    from ctypes.util import find_library
+
+    _libc = CDLL(find_library('c'), use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+except (OSError, AttributeError, TypeError):
+    _libc = None
+
+
+# noinspection PyUnusedLocal
+def __preload__(forClient: bool = True):
+    pass
+
+
+# noinspection PyUnusedLocal
+def __postload__(forClient: bool = True):
+    pass
+
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+watch_mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+
+def inotifyAvailable():
+    """ Simple function to check if inotify can be used on this platform.
+
+        :return:    True if inotify is available, False otherwise.
+
+            note::  Author(s): Mitch """
+
+    return _libc is not None
+
+
+class EventLogTailer:
+    """ Follows the newest event log of a log directory by file offset. Works as drop-in replacement for the stdout of
+    a 'tail -f' subprocess, i.e. offers a readline function that returns the log line by line.
+
+        :param logDir:          The directory containing the event logs.
+        :param pattern:         Glob pattern the event logs match.
+        :param pollInterval:    Seconds to wait between checks for new content if inotify isn't available.
+        :param rotationHook:    Callable that is called with the path of the new log whenever the tailer switches logs.
+        :param currentLog:      Path to the log that's currently being followed.
+        :param offset:          Offset in the current log up to which it has been read.
+        :param buffer:          Bytes read from the current log that don't form a complete line yet.
+        :param closed:          Flag that indicates if the tailer has been closed.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, logDir: str, pattern: str = "*.xml", pollInterval: float = .25, rotationHook: callable = None,
+                 currentLog: str = None, offset: int = 0, buffer: bytes = b"", closed: bool = False):
+
+        self.logDir = logDir
+        self.pattern = pattern
+        self.pollInterval = pollInterval
+        self.rotationHook = rotationHook
+        self.currentLog = currentLog
+        self.offset = offset
+        self.buffer = buffer
+        self.closed = closed
+
+        self.inotifyFd = None
+        if inotifyAvailable():
+            fd = _inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0 and _inotify_add_watch(fd, self.logDir.encode(), watch_mask) >= 0:
+                self.inotifyFd = fd
+            elif fd >= 0:
+                close(fd)
+
+    def getLogs(self):
+        """ Simple function to get all event logs in the log directory.
+
+            :return:    List of paths to the event logs.
+
+                note::  Author(s): Mitch """
+
+        return glob(self.logDir + self.pattern)
+
+    def getNewestLog(self):
+        """ Function to get the newest event log in the log directory.
+
+            :return:    Path to the newest event log or None if there is none.
+
+                note::  Author(s): Mitch """
+
+        logs = self.getLogs()
+        if logs:
+            try:
+                return max(logs, key=getmtime)
+            except FileNotFoundError:
+                return None
+        return None
+
+    def getCreationTime(self):
+        """ Function to get the creation time of the current log.
+
+            :return:    Datetime of the creation of the current log.
+
+                note::  Author(s): Mitch """
+
+        return datetime.fromtimestamp(getctime(self.currentLog))
+
+    def open(self):
+        """ Starts following the newest event log beginning from its last line, just like 'tail -n 1' would.
+
+            :return:    The path of the log that is being followed.
+
+                note::  Author(s): Mitch """
+
+        self.currentLog = self.getNewestLog()
+        self.buffer = b""
+        self.closed = False
+        with open(self.currentLog, 'rb') as logFile:
+            content = logFile.read()
+        lastLineStart = content.rfind(b"\n", 0, len(content) - 1) + 1
+        self.offset = lastLineStart
+        log("Following event log " + self.currentLog + ".", 0)
+        return self.currentLog
+
+    def switchTo(self, newLog: str):
+        """ Switches to a new log after the current one has been fully read.
+
+            :param newLog:  Path to the new log.
+
+                note::  Author(s): Mitch """
+
+        log("Event log rotated, following " + newLog + ".", 0)
+        self.currentLog = newLog
+        self.offset = 0
+        self.buffer = b""
+        if self.rotationHook:
+            self.rotationHook(newLog)
+
+    def readAvailable(self):
+        """ Reads everything that has been appended to the current log since the last read into the buffer.
+
+            :return:    True if anything was read, False otherwise.
+
+                note::  Author(s): Mitch """
+
+        try:
+            if stat(self.currentLog).st_size < self.offset:
+                log("Event log was truncated, starting from its beginning.", 2)
+                self.offset = 0
+                self.buffer = b""
+            with open(self.currentLog, 'rb') as logFile:
+                logFile.seek(self.offset)
+                chunk = logFile.read()
+        except FileNotFoundError:
+            return False
+        self.offset += len(chunk)
+        self.buffer += chunk
+        return len(chunk) > 0
+
+    def popLine(self):
+        """ Pops the next complete line from the buffer.
+
+            :return:    The next line or None if the buffer doesn't contain a complete line.
+
+                note::  Author(s): Mitch """
+
+        lineEnd = self.buffer.find(b"\n")
+        if lineEnd == -1:
+            return None
+        line = self.buffer[:lineEnd + 1]
+        self.buffer = self.buffer[lineEnd + 1:]
+        return line.decode("latin_1")
+
+    def checkRotation(self):
+        """ Checks if a newer log than the current one exists and switches to it. Whatever is left of the current log
+        is returned so no lines are lost in the rotation.
+
+            :return:    The remainder of the current log if it rotated, None if it didn't rotate or there was still
+                        something left to read from the current log.
+
+                note::  Author(s): Mitch """
+
+        newest = self.getNewestLog()
+        if newest is None or newest == self.currentLog:
+            return None
+        # drain the current log once more before leaving it behind
+        if self.readAvailable():
+            return None
+        remainder = self.buffer.decode("latin_1")
+        self.switchTo(newest)
+        return remainder
+
+    def waitForChange(self, timeout: float):
+        """ Blocks until the log directory changed or the timeout expired.
+
+            :param timeout: Maximum seconds to wait.
+
+                note::  Author(s): Mitch """
+
+        if self.inotifyFd is not None:
+            try:
+                readable, _, _ = select([self.inotifyFd], [], [], timeout)
+            except (OSError, ValueError, TypeError):
+                # the tailer was closed while waiting
+                return
+            if readable:
+                try:
+                    while read(self.inotifyFd, 4096):
+                        pass
+                except (BlockingIOError, OSError, TypeError):
+                    pass
+        else:
+            sleep(min(self.pollInterval, timeout))
+
+    def readline(self, timeout: float = 1.):
+        """ Reads the next line from the followed event logs.
+
+            :param timeout: Maximum seconds to block while waiting for a new line.
+
+            :return:        The next line or an empty string if there was no new line within the timeout or the tailer
+                            has been closed.
+
+                note::  Author(s): Mitch """
+
+        deadline = time() + timeout
+        while not self.closed:
+            line = self.popLine()
+            if line is not None:
+                return line
+            if self.readAvailable():
+                continue
+            remainder = self.checkRotation()
+            if remainder:
+                return remainder
+            elif remainder is not None:
+                continue
+            remaining = deadline - time()
+            if remaining <= 0:
+                return ""
+            self.waitForChange(remaining)
+        return ""
+
+    def close(self):
+        """ Stops following the logs and releases the inotify watch if any.
+
+                note::  Author(s): Mitch """
+
+        self.closed = True
+        if self.inotifyFd is not None:
+            close(self.inotifyFd)
+            self.inotifyFd = None
@@ -11,15 +11,16 @@
 
         bfassist <- standalone <- monitoring <- logreader
             |
-            \-> standalone  @LogReader.run
+            |-> standalone  @LogReader.run
+            |-> standalone <- monitoring <- bfxmltokenizer
              -> bfa_logging
 
         note::  Author(s): Mitch last-check: 08.07.2021 """
 
 from threading import Thread
-from subprocess import Popen
 
-from bfassist.standalone.monitoring import RealTimeRound, RealTimeEvent
+from bfassist.standalone.monitoring import RealTimeRound, RealTimeEvent, EventLogTailer, BfXmlTokenizer, BfXmlToken
+from bfassist.standalone.monitoring.bfxmltokenizer import opening_tag
 from bfassist.standalone import Server
 from bfassist.bfa_logging import log
 
@@ -34,34 +35,24 @@ def __postload__(forClient: bool = True):
     pass
 
 
-round_starts = '<bf:round'
-log_ends = '</bf:log>'
-
-server_starts = '<bf:server'
-server_ends = '</bf:server'
-
-event_starts = '<bf:event'
-event_ends = '</bf:event'
-
-roundstats_start = '<bf:roundstats'
-roundstats_end = '</bf:roundstats'
-
-
 class LogReader(Thread):
     """ Thread for reading the event log fed to us. We do some preliminary parsing here so bfxml only has to parse the
-    important bits. Builds paragraph chunks and sends them for parsing to bfxml.
+    important bits. The lines are fed to a streaming tokenizer that builds paragraph chunks and events which are then
+    dispatched for parsing to bfxml.
 
         :param server:          Server Object the Log-Reader attaches to.
         :param eventLogFeed:    The event log feed to read from for better readability.
-        :param paragraph:       The entire content of the paragraph/xml-tag currently being prepared for parsing.
+        :param paragraph:       The entire content of the paragraph/xml-tag that was last dispatched for parsing.
         :param currentLine:     The line that's currently being examined.
+        :param tokenizer:       The tokenizer assembling the paragraphs from the lines of the feed.
 
             note::  Author(s): Mitch """
 
     tagList = {}
     hooks = {}
 
-    def __init__(self, server: Server, eventLogFeed: Popen = None, paragraph: str = "", currentLine: str = ""):
+    def __init__(self, server: Server, eventLogFeed: EventLogTailer = None, paragraph: str = "", currentLine: str = "",
+                 tokenizer: BfXmlTokenizer = None):
         Thread.__init__(self)
         self.server = server
         self.eventLogFeed = eventLogFeed
@@ -69,38 +60,45 @@ class LogReader(Thread):
         self.paragraph = paragraph
         self.currentLine = currentLine
 
+        if tokenizer:
+            self.tokenizer = tokenizer
+        else:
+            self.tokenizer = BfXmlTokenizer()
+
     def parse(self, inXML: str):
-        """ Main parsing function of this class that delegates parsing using the tag list.
+        """ Main parsing function of this class that delegates parsing of a complete paragraph using the tag list.
 
             :param inXML:       The xml to be processed.
 
                 note::  Author(s): Mitch """
 
-        try:
-            log("Parsing inXML for server.", 0)
-            for tag in self.tagList:
-                if tag in inXML:
-                    self.tagList[tag](inXML)
-        except AttributeError:
-            self.server.StatsInterface.realTimeRound = RealTimeRound(self.server)
-            self.parse(inXML)
+        tag = opening_tag.search(inXML)
+        if tag:
+            self.dispatch(BfXmlToken(tag.group(), inXML))
 
-    def continueUntil(self, paragraphEnds: str):
-        """ Simple function to continue the parsing-pre-process until the currently prepared paragraph ends.
+    def dispatch(self, token: BfXmlToken):
+        """ Delegates parsing of a token to the function registered for its tag in the tag list. Events are handed over
+        already tokenized.
 
-            :param paragraphEnds:   The ending tag at which we'll stop.
+            :param token:       The token to be processed.
 
                 note::  Author(s): Mitch """
 
-        self.paragraph = self.currentLine
-        while (paragraphEnds not in self.currentLine) and self.server.monitoringIsActive():
-            if log_ends in self.currentLine:
-                self.server.MonitoringInterface.renewEventFeed()
+        if token.tag not in self.tagList:
+            return
+        self.paragraph = token.paragraph
+        try:
+            log("Parsing inXML for server.", 0)
+            if token.event is not None:
+                self.tagList[token.tag](self, token.event)
             else:
-                self.paragraph += self.currentLine
-                self.currentLine = self.getNextLine()
-        self.paragraph += self.currentLine
-        self.parse(self.paragraph)
+                self.tagList[token.tag](self, token.paragraph)
+        except AttributeError:
+            if self.server.StatsInterface.realTimeRound is None:
+                self.server.StatsInterface.realTimeRound = RealTimeRound(self.server)
+                self.dispatch(token)
+            else:
+                log("Parsing a paragraph of the event log failed. " + token.paragraph, 3)
 
     def getNextLine(self):
         """ Simple function to get the next line from the feed.
@@ -110,27 +108,17 @@ class LogReader(Thread):
                 note::  Author(s): Mitch """
 
         try:
-            return self.eventLogFeed.stdout.readline()
-        except ValueError as error:
-            log("Trying to read from event log caused a value error. " + str(error), 3)
+            return self.eventLogFeed.readline()
+        except (ValueError, OSError) as error:
+            log("Trying to read from event log caused an error. " + str(error), 3)
             self.server.MonitoringInterface.renewEventFeed()
+            return ""
 
     def run(self):
-        from bfassist.standalone import KERN
-
         log("Starting the log reader for a server.")
-        self.currentLine = self.eventLogFeed.stdout.readline()
         while self.server.monitoringIsActive():
-            if log_ends in self.currentLine:
-                self.server.MonitoringInterface.renewEventFeed()
-            elif round_starts in self.currentLine:
-                self.paragraph = self.currentLine
-                self.parse(self.paragraph)
-            elif server_starts in self.currentLine:
-                self.continueUntil(server_ends)
-            elif event_starts in self.currentLine:
-                self.continueUntil(event_ends)
-            elif roundstats_start in self.currentLine:
-                self.continueUntil(roundstats_end)
             self.currentLine = self.getNextLine()
+            token = self.tokenizer.feed(self.currentLine)
+            if token is not None:
+                self.dispatch(token)
         log("Stopping the log reader for a server.")
@@ -34,7 +34,7 @@ def __postload__(forClient: bool = True):
     pass
 
 
-class Player(DBStorable, table='players', live=False):
+class Player(DBStorable, table='players', live=False, cacheSize=1024):
     """ A Player is supposed to correspond to a player participating in a BfRound on a bf server hooked with BF-A and
     contains all relevant included intermediary information.
     A player is typically first instantiated from the bfxml module when parsing the event log or by the servers module
@@ -101,14 +101,9 @@ class Player(DBStorable, table='players', live=False):
         if inAlias in self.getAliases():
             return
         self.getAliases().add(inAlias)
-        try:
-            self.__class__.storageDict.dbLock.acquire(True)
-            self.__class__.storageDict.db.execute("UPDATE livePlayers SET aliases=? WHERE keyhash=?",
-                                                  (";".join([x.replace(';', '\\&r01') for x in self.getAliases()]),
-                                                   self.getKeyhash(),))
-            self.__class__.storageDict.bfaSQLdatabase.commit()
-        finally:
-            self.__class__.storageDict.dbLock.release()
+        self.__class__.storageDict.connections.write("UPDATE livePlayers SET aliases=? WHERE keyhash=?",
+                                                     (";".join([x.replace(';', '\\&r01') for x in self.getAliases()]),
+                                                      self.getKeyhash(),))
 
     def addIp(self, inIp: str):
         """ Function to add an ip to the set of ips(including database update).
@@ -120,13 +115,8 @@ class Player(DBStorable, table='players', live=False):
         if inIp in self.getIps():
             return
         self.getIps().add(inIp)
-        try:
-            self.__class__.storageDict.dbLock.acquire(True)
-            self.__class__.storageDict.db.execute("UPDATE livePlayers SET ips=? WHERE keyhash=?",
-                                                  (";".join(self.getIps()), self.getKeyhash(), ))
-            self.__class__.storageDict.bfaSQLdatabase.commit()
-        finally:
-            self.__class__.storageDict.dbLock.release()
+        self.__class__.storageDict.connections.write("UPDATE livePlayers SET ips=? WHERE keyhash=?",
+                                                     (";".join(self.getIps()), self.getKeyhash(), ))
 
 
 Players = Player.storageDict
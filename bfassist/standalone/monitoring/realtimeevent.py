@@ -30,12 +30,14 @@ class RealTimeEvent:
 
         :param eventType:   Type of the event.
         :param parameters:  All parameters of this event and their values.
+        :param timeStamp:   The timestamp of this event as found in the event log.
 
             note::  Author(s): Mitch """
 
-    def __init__(self, eventType: str, parameters: dict = None):
+    def __init__(self, eventType: str, parameters: dict = None, timeStamp: str = None):
         self.eventType = eventType
         if parameters:
             self.parameters = parameters
         else:
             self.parameters = {}
+        self.timeStamp = timeStamp
@@ -28,7 +28,7 @@ def __postload__(forClient: bool = True):
     pass
 
 
-class BfPlayerRound(DBStorable, table="roundstats", live=False):
+class BfPlayerRound(DBStorable, table="roundstats", live=False, writeBehind=True, cacheSize=1024):
     """ A BfPlayerRound is supposed to correspond to the stats of a particular player in a particular bf round in
     dice::xmlns::bf and contains all information.
 
@@ -11,8 +11,10 @@
 
         bfassist <- standalone <- monitoring <- storedround
             |
+            |-> bfa_logging
             \-> sql
-             -> standalone  @BfRound.sendToMaster
+             -> network -> client -\-> outbox      @BfRound.sendToMaster
+                                    -> playersync  @BfRound.sendToMaster
 
         note::  Author(s): Mitch last-check: 08.07.2021 """
 
@@ -23,6 +25,7 @@ from datetime import datetime
 from bfassist.standalone.monitoring import BfServerSetting, Player
 from bfassist.standalone import Server
 from bfassist.sql import *
+from bfassist.bfa_logging import log
 
 
 # noinspection PyUnusedLocal
@@ -35,7 +38,7 @@ def __postload__(forClient: bool = True):
     pass
 
 
-class BfRound(DBStorable, table="serverstats", live=False):
+class BfRound(DBStorable, table="serverstats", live=False, writeBehind=True, cacheSize=256):
     """ A BfRound is supposed to correspond to a bf round in dice::xmlns::bf and contains all relevant information.
     BfRounds in online mode are actually instantiated from the bfxml module that is parsing the bf round
     information.
@@ -43,7 +46,7 @@ class BfRound(DBStorable, table="serverstats", live=False):
         :param server:          The server the bf round took place.
         :param settings:        The settings the round was played with.
         :param results:         Information of the round end results as dictionary with player IDs as keys and
-                                a list of BfPlayerRounds as values.
+                                the BfPlayerRound of the player as values.
 
 
         :param RoundId:         The identifier of this particular round.
@@ -107,15 +110,26 @@ class BfRound(DBStorable, table="serverstats", live=False):
 
         self.insertToDB()
 
-    def sendToMaster(self):
-        """ This function sends all the saved information of this round to the master server.
+    def sendToMaster(self, inPlayers: dict = None):
+        """ This function posts all the saved information of this round to the outbox, which sends it to the master
+        server in the background.
+
+            :param inPlayers:   Optional dictionary containing playerIds and the corresponding Player object of the
+                                players whose changes since their last synchronisation should be sent along.
 
                 note::  Author(s): Mitch """
 
-        from bfassist.standalone import KERN
+        from bfassist.network.client.outbox import OUTBOX
+        from bfassist.network.client.playersync import PLAYER_SYNC
 
-        log("Sending a round to master.")
-        KERN.BFA_NETWORK.sendLeagueRound(self)
+        log("Posting a round to the outbox for the master.")
+        # the round is converted first, so players aren't marked as pending for a round that can't be posted
+        roundDict = self.toGlobalDict()
+        if inPlayers is not None:
+            records = PLAYER_SYNC.changed(inPlayers)
+            if records:
+                OUTBOX.post('SyncLeaguePlayers', records)
+        OUTBOX.post('LeagueRound', roundDict)
 
     def toGlobalDict(self):
         """ Function to convert a round to a dictionary for the global bfa perspective and to make it json serializable.
@@ -127,7 +141,7 @@ class BfRound(DBStorable, table="serverstats", live=False):
         return {
             'server':           self.server.toGlobalDict(),
             'settings':         self.settings.toGlobalDict(),
-            'results':          {Id: [result.toGlobalDict for result in self.results[Id]] for Id in self.results},
+            'results':          {Id: self.results[Id].toGlobalDict() for Id in self.results},
             'Start':            str(self.getStart()),
             'End':              str(self.getEnd()),
             'Winner':           self.getWinner(),
@@ -146,9 +160,8 @@ class BfRound(DBStorable, table="serverstats", live=False):
                 note::  Author(s): Mitch """
 
         for player_id in self.results:
-            for result in self.results[player_id]:
-                if result.getKeyhash() == player.getKeyhash():
-                    return True
+            if self.results[player_id].getKeyhash() == player.getKeyhash():
+                return True
 
         return False
 
@@ -28,7 +28,7 @@ def __postload__(forClient: bool = True):
     pass
 
 
-class BfServerSetting(DBStorable, table="settings", live=False):
+class BfServerSetting(DBStorable, table="settings", live=False, cacheSize=256):
     """ A BfServerSetting is supposed to correspond to the server settings on a server at the start of a particular
     round.
 
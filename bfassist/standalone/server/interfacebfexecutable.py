@@ -6,19 +6,23 @@
 #
 #############################################################################
 """ This module manages the interface and interactions of the server objects with the references bfexecutable module.
+Binaries are installed from the content-addressed store by linking and renaming them into place.
 
     Dependencies:
 
         bfassist <- (standalone.)server <- interfacebffexecutable
             \
              -> references
+             -> bfa_logging
 
         note::  Author(s): Mitch last-check: 08.07.2021 """
 
 from os.path import exists
+from time import sleep
 
 from bfassist.standalone.server import Server
-from bfassist.references import createSafeReference, shaForFile, Binary, Binaries
+from bfassist.references import createSafeReference, shaForFile, Binary, Binaries, HASHING_SERVICE, STORE
+from bfassist.bfa_logging import log
 
 
 # noinspection PyUnusedLocal
@@ -54,21 +58,23 @@ class ServerExecutableInterface:
         self.dynamicExecutable = dynamicExecutable
         self.staticExecutable = staticExecutable
 
-    def refreshBinary(self, binaryType: str):
+    def refreshBinary(self, binaryType: str, digest: str = None):
         """ Function to refresh our knowledge of the installed binary of a particular type (static or dynamic).
 
             :param binaryType:  The type of the binary to refresh.
+            :param digest:      The sha-256 hex-digest of the installed binary if it's already known.
 
                 note::  Author(s): Mitch """
 
         if exists(self.pathToExecutables + 'bf1942_lnxded.' + binaryType):
-            digestOfExecutable = shaForFile(self.pathToExecutables + 'bf1942_lnxded.' + binaryType)
+            digestOfExecutable = digest or shaForFile(self.pathToExecutables + 'bf1942_lnxded.' + binaryType)
             knownExecutable = Binaries.fetchSingleWhere('Digest', digestOfExecutable)
 
             if knownExecutable:
                 return knownExecutable
             else:
-                createSafeReference(self.pathToExecutables + 'bf1942_lnxded.' + binaryType, 'binaries/original.dynamic')
+                createSafeReference(self.pathToExecutables + 'bf1942_lnxded.' + binaryType, 'binaries/original.dynamic',
+                                    digestOfExecutable)
                 return Binary('original.' + binaryType, digestOfExecutable, 'bfassist/references/binaries/')
 
         else:
@@ -76,12 +82,18 @@ class ServerExecutableInterface:
             return None
 
     def refreshBinaries(self):
-        """ Function to refresh our knowledge of the installed binaries.
+        """ Function to refresh our knowledge of the installed binaries. Both binaries are hashed in parallel.
 
                 note::  Author(s): Mitch """
 
-        self.dynamicExecutable = self.refreshBinary('dynamic')
-        self.staticExecutable = self.refreshBinary('static')
+        digests = HASHING_SERVICE.hashAll([self.pathToExecutables + 'bf1942_lnxded.' + binaryType
+                                           for binaryType in ['dynamic', 'static']
+                                           if exists(self.pathToExecutables + 'bf1942_lnxded.' + binaryType)])
+
+        self.dynamicExecutable = self.refreshBinary('dynamic', digests.get(self.pathToExecutables +
+                                                                           'bf1942_lnxded.dynamic'))
+        self.staticExecutable = self.refreshBinary('static', digests.get(self.pathToExecutables +
+                                                                         'bf1942_lnxded.static'))
 
     def replaceBinaryPair(self, binaryKind: str):
         """ Function to replace the current binary pair with the one specified. Then sends exit to the console. This
@@ -103,10 +115,10 @@ class ServerExecutableInterface:
             sleep(1)
             binaries = Binaries[binaryKind + ".dynamic"], Binaries[binaryKind + ".static"]
             try:
-                copyfile(binaries[0].getPath() + binaries[0].getName(),
-                         self.pathToExecutables + 'bf1942_lnxded.dynamic')
-                copyfile(binaries[1].getPath() + binaries[1].getName(),
-                         self.pathToExecutables + 'bf1942_lnxded.static')
+                STORE.install(binaries[0].getPath() + binaries[0].getName(),
+                              self.pathToExecutables + 'bf1942_lnxded.dynamic', binaries[0].getDigest(), True)
+                STORE.install(binaries[1].getPath() + binaries[1].getName(),
+                              self.pathToExecutables + 'bf1942_lnxded.static', binaries[1].getDigest(), True)
             except OSError:
                 log("Replacing the binaries failed. Manual inspection required!", 4)
                 return False
@@ -5,7 +5,11 @@
 #
 #
 #############################################################################
-""" This module manages the interface and interactions of the server objects with the references map module.
+""" This module manages the interface and interactions of the server objects with the references map module. The maps
+installed on a server are scanned incrementally. Only map files whose size or modification time changed since they were
+last hashed are hashed again and every scan reports the maps it found added, removed or modified. While a server is
+monitored a map watcher scans its maps in an interval so the map catalog stays current. Maps are installed from the
+content-addressed store by linking and renaming, so installing a map on many servers doesn't copy it.
 
     Dependencies:
 
@@ -16,12 +20,15 @@
 
         note::  Author(s): Mitch last-check: 08.07.2021 """
 
-from os import listdir
+from __future__ import annotations
+
+from os import listdir, stat
 from os.path import isdir
-from shutil import copyfile
+from re import sub
+from threading import Thread, Event, Lock
 
 from bfassist.standalone.server import Server
-from bfassist.references import Map, Maps, shaForFile, getDir, createSafeReference
+from bfassist.references import Map, Maps, shaForFile, getDir, createSafeReference, HASHING_SERVICE, STORE
 from bfassist.bfa_logging import log
 
 
@@ -38,15 +45,49 @@ def __postload__(forClient: bool = True):
 from_mod_to_levels = "/archives/bf1942/levels"
 
 
+class MapDiff:
+    """ The changes to the installed maps found by a scan.
+
+        :param added:       List of the fully qualified map names of maps that were added.
+        :param removed:     List of the fully qualified map names of maps that were removed.
+        :param modified:    List of the fully qualified map names of maps whose file changed.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, added: list = None, removed: list = None, modified: list = None):
+
+        if added:
+            self.added = added
+        else:
+            self.added = []
+        if removed:
+            self.removed = removed
+        else:
+            self.removed = []
+        if modified:
+            self.modified = modified
+        else:
+            self.modified = []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified)
+
+    def __str__(self):
+        return str(len(self.added)) + " added, " + str(len(self.removed)) + " removed, " + str(len(self.modified)) + \
+               " modified"
+
+
 class ServerMapInterface:
     """ The server map interface lets a server object interact with its map files.
 
         :param server:      The server this interface belongs to.
         :param pathToMods:  The path to the mods directory for better readability.
+        :param scanLock:    Lock making sure only one scan of the installed maps runs at a time.
+        :param watcher:     The map watcher scanning the installed maps while the server is monitored.
 
             note::  Author(s): Mitch """
 
-    def __init__(self, server: Server, pathToMods: str = None):
+    def __init__(self, server: Server, pathToMods: str = None, scanLock: Lock = None, watcher: MapWatcher = None):
 
         self.server = server
 
@@ -55,6 +96,12 @@ class ServerMapInterface:
         else:
             self.pathToMods = self.server.getBFPath() + "mods/"
 
+        if scanLock:
+            self.scanLock = scanLock
+        else:
+            self.scanLock = Lock()
+        self.watcher = watcher
+
     def isAMod(self, inMod: str):
         """ Simple function to check if a mod exists and has the required levels folder in which maps would be.
 
@@ -80,8 +127,11 @@ class ServerMapInterface:
 
         if mapReference is None:
             mapReference = Maps[fullMapName]
-        copyfile(mapReference.getPath() + mapReference.getName(), self.pathToMods + fullMapName)
-        mapReference.addPath(self.pathToMods + getDir(fullMapName))
+        location = self.pathToMods + getDir(fullMapName)
+        source = next(iter(mapReference.getPaths().difference({location})), mapReference.getPath())
+        STORE.install(source + mapReference.getName(), self.pathToMods + fullMapName, mapReference.getDigest())
+        mapReference.addPath(location)
+        mapReference.setStat(location, stat(self.pathToMods + fullMapName))
 
     def backupAnInstalledMapAndFreeItsReference(self, mapReference: Map):
         """ Function to back up a map that's currently installed (and has a reference!!!) freeing its spot for
@@ -100,43 +150,139 @@ class ServerMapInterface:
                                                 mapReference.getFName())
             Map.fromReference(safeReference)
 
-    def refreshAnAlreadyReferencedMap(self, fullMapName: str):
+    def refreshAnAlreadyReferencedMap(self, fullMapName: str, digest: str = None):
         """ Function that refreshes a map that has already been referenced previously.
 
             :param fullMapName: The fully qualified map name i.e. the path starting from the mods folder.
+            :param digest:      The sha-256 hex-digest of the installed map if it's already known.
 
                 note::  Author(s): Mitch """
 
         mapReference = Maps[fullMapName]
-        if mapReference.getDigest() == shaForFile(self.pathToMods + fullMapName):
-            if self.pathToMods + fullMapName not in mapReference.getPaths():
+        digest = digest or shaForFile(self.pathToMods + fullMapName)
+        if mapReference.getDigest() == digest:
+            if self.pathToMods + getDir(fullMapName) not in mapReference.getPaths():
                 mapReference.addPath(self.pathToMods + getDir(fullMapName))
 
         else:
-            safeReference = createSafeReference(self.pathToMods + fullMapName, 'maps/' + fullMapName)  # backup version
-            Map.fromReference(safeReference)  # make a db entry for the backup
+            safeReference = createSafeReference(self.pathToMods + fullMapName, 'maps/' + fullMapName,
+                                                digest)  # backup version
+            Map.fromReference(safeReference, digest)  # make a db entry for the backup
             self.overwriteMapWithStandardVersion(fullMapName, mapReference)  # overwrite with standard version
 
     def refreshMaps(self):
         """ Function to refresh our knowledge about the installed maps.
 
+            :return:    The changes found as map diff.
+
                 note::  Author(s): Mitch """
 
         log("Refreshing maps this may take a while.", 2)
+        diff = self.scanMaps()
+        log("Finished refreshing maps: " + str(diff), 2)
+        return diff
+
+    def listInstalledMaps(self):
+        """ Function to list the map files of all mods and their stats.
+
+            :return:    Dictionary containing the fully qualified map names as keys and the result of stat for their
+                        map file as values.
+
+                note::  Author(s): Mitch """
+
+        installed = {}
+        for mod in listdir(self.pathToMods):
+            if self.isAMod(mod):
+                for modMap in listdir(self.pathToMods + mod + from_mod_to_levels):
+                    try:
+                        installed[mod + from_mod_to_levels + "/" + modMap] = stat(self.pathToMods + mod +
+                                                                                  from_mod_to_levels + "/" + modMap)
+                    except OSError:
+                        continue
+        return installed
+
+    def scanMaps(self):
+        """ Function to scan the installed maps incrementally. Only the maps whose size or modification time differs
+        from the stat remembered for their location are hashed, in parallel by the hashing service. Changed maps are
+        replaced with their standard version if there is one, maps that aren't installed anymore lose their location.
+
+            :return:    The changes found as map diff.
+
+                note::  Author(s): Mitch """
+
+        diff = MapDiff()
         if not isdir(self.pathToMods):
-            log("Path to mods is invalid. Could not refresh maps!", 3)
-        else:
-            for mod in listdir(self.pathToMods):
-                if self.isAMod(mod):
-                    for modMap in listdir(self.pathToMods + mod + from_mod_to_levels):
+            log("Path to mods is invalid. Could not scan maps!", 3)
+            return diff
+
+        with self.scanLock:
+            installed = self.listInstalledMaps()
+
+            stale = {}
+            for fullMapName, fileStat in installed.items():
+                if fullMapName not in Maps or Maps[fullMapName].getStat(self.pathToMods + getDir(fullMapName)) != \
+                        [fileStat.st_size, fileStat.st_mtime_ns]:
+                    stale[self.pathToMods + fullMapName] = fullMapName
+
+            for mapPath, digest in HASHING_SERVICE.hashFiles(stale):
+                if digest is None:
+                    continue
+
+                fullMapName = stale[mapPath]
+                location = self.pathToMods + getDir(fullMapName)
+                overwritten = False
+
+                if fullMapName not in Maps:
+                    Map.fromReference(mapPath, digest)
+                    diff.added.append(fullMapName)
+                else:
+                    mapReference = Maps[fullMapName]
+                    if location not in mapReference.getPaths():
+                        diff.added.append(fullMapName)
+                    elif mapReference.getDigest() != digest:
+                        diff.modified.append(fullMapName)
+
+                    # without a standard version in another location the changed map file becomes the new version
+                    if mapReference.getDigest() != digest and not mapReference.getPaths().difference({location}):
+                        mapReference.setDigest(digest)
+                    else:
+                        overwritten = mapReference.getDigest() != digest
+                        self.refreshAnAlreadyReferencedMap(fullMapName, digest)
+
+                # the stat from before hashing, so a map that changed while it was hashed is hashed again next time,
+                # a map overwritten with its standard version got the stat of the new file already
+                if fullMapName in Maps and not overwritten:
+                    Maps[fullMapName].setStat(location, installed[fullMapName])
+
+            for mapReference in list(Maps):
+                location = self.pathToMods + getDir(mapReference.getFName())
+                if location in mapReference.getPaths() and mapReference.getFName() not in installed:
+                    mapReference.removePath(location)
+                    diff.removed.append(mapReference.getFName())
+                    if not mapReference.getPaths():
+                        mapReference.delete()
+
+        return diff
+
+    def watchMaps(self, interval: float = 30.):
+        """ Starts the map watcher for this server if it isn't running yet.
+
+            :param interval:    Seconds between two scans.
+
+                note::  Author(s): Mitch """
+
+        if self.watcher is None or not self.watcher.is_alive():
+            self.watcher = MapWatcher(self, interval)
+            self.watcher.start()
 
-                        fullMapName = mod + from_mod_to_levels + modMap
+    def stopWatchingMaps(self):
+        """ Stops the map watcher for this server if it's running.
 
-                        if fullMapName not in Maps:
-                            Map.fromReference(self.pathToMods + fullMapName)
-                        else:
-                            self.refreshAnAlreadyReferencedMap(fullMapName)
-            log("Finished refreshing maps.", 2)
+                note::  Author(s): Mitch """
+
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
 
     def addMapFromReference(self, mapReference: Map):
         """ Function to install a map from a reference map object. If it's been installed before it will merely
@@ -147,8 +293,11 @@ class ServerMapInterface:
                 note::  Author(s): Mitch """
 
         # todo:: self.writeToServer("Installing the map file " + mapReference.getName() + "...")
-        copyfile(mapReference.getPath() + mapReference.getName(), self.pathToMods + mapReference.getFName())
-        mapReference.addPath(self.pathToMods + getDir(mapReference.getFName()))
+        location = self.pathToMods + getDir(mapReference.getFName())
+        STORE.install(mapReference.getPath() + mapReference.getName(), self.pathToMods + mapReference.getFName(),
+                      mapReference.getDigest())
+        mapReference.addPath(location)
+        mapReference.setStat(location, stat(self.pathToMods + mapReference.getFName()))
         # todo:: self.writeToServer("Successfully installed " + mapReference.getName())
 
     def replaceMapReferenceWithMapFromReference(self, mapReference: Map, referencePath: str):
@@ -160,10 +309,11 @@ class ServerMapInterface:
 
                 note::  Author(s): Mitch """
 
-        self.backupMap(mapReference)
-        mapReference.setDigest(shaForFile(referencePath))
+        self.backupAnInstalledMapAndFreeItsReference(mapReference)
+        mapReference.setDigest(STORE.add(referencePath))
         for location in mapReference.getPaths():
-            copyfile(referencePath, location + mapReference.getName())
+            STORE.install(referencePath, location + mapReference.getName(), mapReference.getDigest())
+            mapReference.setStat(location, stat(location + mapReference.getName()))
 
     def replaceMapWithVariation(self, mapReference: Map, variationReference: Map):
         """ Function to replace a current version of a map with an already existing variation. For that we'll simply
@@ -174,12 +324,59 @@ class ServerMapInterface:
 
                 note::  Author(s): Mitch """
 
-        # Confirm that the variation is truly a variation of the map to be replaced
-        if mapReference.getFName() == variationReference.getFName():
-            self.backupMap(mapReference)
+        # Confirm that the variation is truly a variation of the map to be replaced, its reference is named like the map
+        # with a variation suffix
+        if mapReference.getFName() == sub(r'variation\d+$', '', variationReference.getFName()):
+            self.backupAnInstalledMapAndFreeItsReference(mapReference)
+            digestOfVariation = STORE.add(variationReference.getPath() + variationReference.getName(),
+                                          variationReference.getDigest())
             for location in mapReference.getPaths():
-                copyfile(variationReference.getPath() + variationReference.getName(), location + mapReference.getName())
+                STORE.install(variationReference.getPath() + variationReference.getName(),
+                              location + mapReference.getName(), digestOfVariation)
+                mapReference.setStat(location, stat(location + mapReference.getName()))
 
-            digestOfVariation = variationReference.getDigest()
             variationReference.delete()
             mapReference.setDigest(digestOfVariation)
+
+
+class MapWatcher(Thread):
+    """ Thread keeping the map catalog of a server current by scanning its installed maps in an interval. A scan only
+    stats the map files unless some changed, so watching is cheap.
+
+        :param mapInterface:    The map interface of the server to watch.
+        :param interval:        Seconds between two scans.
+        :param stopEvent:       Event that is set to stop watching.
+
+            note::  Author(s): Mitch """
+
+    def __init__(self, mapInterface: ServerMapInterface, interval: float = 30., stopEvent: Event = None):
+
+        super().__init__(daemon=True)
+        self.mapInterface = mapInterface
+        self.interval = interval
+        if stopEvent:
+            self.stopEvent = stopEvent
+        else:
+            self.stopEvent = Event()
+
+    def run(self):
+        """ Scans the installed maps until the watcher is stopped. A scan that fails, e.g. because a map was removed
+        while it was scanned, is logged and the next scan is done as usual.
+
+                note::  Author(s): Mitch """
+
+        while not self.stopEvent.wait(self.interval):
+            try:
+                diff = self.mapInterface.scanMaps()
+            except Exception as error:
+                log("Scanning the maps failed: " + repr(error), 3)
+                continue
+            if diff:
+                log("Map catalog changed: " + str(diff), 1)
+
+    def stop(self):
+        """ Stops watching.
+
+                note::  Author(s): Mitch """
+
+        self.stopEvent.set()
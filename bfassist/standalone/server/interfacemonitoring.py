@@ -19,12 +19,12 @@
 from glob import glob
 from datetime import datetime
 from os import remove
-from os.path import getmtime, getctime
-from subprocess import Popen, PIPE, TimeoutExpired
+from os.path import getmtime
 from time import sleep
 
 from bfassist.standalone.server import Server
 from bfassist.standalone import StatusMessenger, LogReader
+from bfassist.standalone.monitoring import EventLogTailer
 from bfassist.bfa_logging import log
 
 
@@ -53,8 +53,8 @@ class ServerMonitoringInterface:
             note::  Author(s): Mitch """
 
     def __init__(self, server: Server, local_monitoring: bool = False, creationTimeLastLog: datetime = None,
-                 eventLogFeed: Popen = None, statusMessenger: StatusMessenger = None, logReader: LogReader = None,
-                 greeting: bool = True):
+                 eventLogFeed: EventLogTailer = None, statusMessenger: StatusMessenger = None,
+                 logReader: LogReader = None, greeting: bool = True):
 
         self.server = server
         self.local_monitoring = local_monitoring
@@ -103,7 +103,7 @@ class ServerMonitoringInterface:
 
     def disconnect(self):
         """ Function that should be called when disconnecting the Server from the BFA-Framework. Importantly, shutting
-        down the SSH-Sessions tailing the logs.
+        down the tailer following the logs.
 
             :return:    True if successfully shut down. False if already offline.
 
@@ -117,11 +117,8 @@ class ServerMonitoringInterface:
         self.server.remoteConsole.disconnect()
         self.stopMonitoring()
         log("Closing feeds.")
-        try:
-            self.eventLogFeed.terminate()
-            self.eventLogFeed.communicate(timeout=5)
-            self.eventLogFeed = None
-        except TimeoutExpired:
+        if self.eventLogFeed:
+            self.eventLogFeed.close()
             self.eventLogFeed = None
 
         log("Server successfully disconnected.")
@@ -140,46 +137,71 @@ class ServerMonitoringInterface:
         log("Cleaned event logs on a server.", 1)
 
     def addEventLogFeed(self):
-        """ Starts tailing the newest event log and feeds it to the respective hook in the interface. Also calls clean
-        event logs at the start.
+        """ Starts following the newest event log with an event log tailer and feeds it to the respective hook in the
+        interface. Also calls clean event logs at the start.
 
                 note::  Author(s): Mitch """
 
         self.cleanEventLogs()
         log("Adding feed from event log.", 1)
-        logFileList = glob(self.server.getBFPath() + "mods/bf1942/logs/*.xml")
-        latest_file = max(logFileList, key=getmtime)
-        self.creationTimeLastLog = datetime.fromtimestamp(getctime(latest_file))
-        bashCommand = 'tail -f -n 1 ' + str(latest_file)
         if self.eventLogFeed:
-            try:
-                self.eventLogFeed.terminate()
-                self.eventLogFeed.communicate(timeout=5)
-                self.eventLogFeed = None
-            except TimeoutExpired:
-                self.eventLogFeed = None
-        self.eventLogFeed = Popen(bashCommand.split(), stdout=PIPE, stdin=PIPE, encoding="latin_1")
+            self.eventLogFeed.close()
+        self.eventLogFeed = EventLogTailer(self.server.getBFPath() + "mods/bf1942/logs/",
+                                           rotationHook=self.eventLogRotated)
+        self.eventLogFeed.open()
+        self.creationTimeLastLog = self.eventLogFeed.getCreationTime()
         self.logReader = LogReader(self.server, self.eventLogFeed)
         log("Added feed from event log.", 0)
 
+    def eventLogRotated(self, newLog: str):
+        """ Hook for the event log tailer that's called when the server started a new event log. Updates the creation
+        time of the last log and cleans old logs on the fly.
+
+            :param newLog:  Path to the new event log.
+
+                note::  Author(s): Mitch """
+
+        log("Event log of a server rotated to " + newLog + ".", 0)
+        self.creationTimeLastLog = self.eventLogFeed.getCreationTime()
+        self.cleanEventLogs()
+
     def renewEventFeed(self):
-        """ Renews the feeding of the event log when it's reached the end of a log. Also cleans old logs on the fly.
+        """ Renews the feeding of the event log in case the tailer ran into an error. The tailer is reopened in place
+        so the running log reader keeps reading from it.
 
                 note::  Author(s): Mitch """
 
         log("Renewing event feed of a server.", 1)
-        sleep(3)
-        self.addEventLogFeed()
+        if self.eventLogFeed:
+            self.eventLogFeed.open()
+            self.creationTimeLastLog = self.eventLogFeed.getCreationTime()
+        else:
+            self.addEventLogFeed()
         log("Finished renewing event feed of a server.", 0)
 
-    def bootPlayers(self):
+    def bootPlayers(self, wait: bool = True):
         """ Function to update the active players using the remote console output of game.listPlayers.
 
+            :param wait:    If False the player-list is only requested and the active players are updated once the
+                            console answered so the calling thread isn't blocked.
+
                 note::  Author(s): Mitch """
 
         log("Asking console for player-list on server.", 0)
-        playerList = self.server.ConsoleInterface.getPlayerList()
-        self.server.PlayerInterface.updateOnlinePlayers(playerList)
+        if wait:
+            self.updatePlayers(self.server.ConsoleInterface.getPlayerList())
+        else:
+            self.server.ConsoleInterface.requestPlayerList(self.updatePlayers)
+
+    def updatePlayers(self, playerList: set):
+        """ Function to update the active players with a parsed player-list.
+
+            :param playerList:  The player-list or None if obtaining it failed.
+
+                note::  Author(s): Mitch """
+
+        if playerList is not None:
+            self.server.PlayerInterface.updateOnlinePlayers(playerList)
 
     def startMonitoring(self):
         """ Starts the monitoring threads for the specified server.
@@ -196,6 +218,7 @@ class ServerMonitoringInterface:
         if not self.logReader.is_alive():
             self.logReader = LogReader(self.server, self.eventLogFeed)
         self.logReader.start()
+        self.server.MapInterface.watchMaps()
         log("Started monitoring for server.", 1)
 
     def stopMonitoring(self):
@@ -211,3 +234,4 @@ class ServerMonitoringInterface:
             self.local_monitoring = False
             log("Waiting for the log reader to join.")
             self.logReader.join(timeout=5)
+        self.server.MapInterface.stopWatchingMaps()
@@ -16,9 +16,6 @@
 
         note::  Author(s): Mitch last-check: 08.07.2021 """
 
-from random import randint
-from threading import Lock
-
 from bfassist.standalone.server import Server, RemoteConsole
 from bfassist.standalone.server.bfcutil import buildHenkCommand
 from bfassist.bfa_logging import log
@@ -39,14 +36,12 @@ class ServerRemoteConsoleInterface:
 
         :param server:              The server this interface belongs to.
         :param remoteConsole:       The remote console of this server for better readability.
-        :param consoleLock:         The lock object that should prevent current access to the console.
         :param hasHenkPatch:        A dictionary containing 'names' of henk patches and a boolean value to indicate if
                                     they area accessible.
 
             note::  Author(s): Mitch """
 
-    def __init__(self, server: Server, remoteConsole: RemoteConsole = None, consoleLock: Lock = None,
-                 hasHenkPatch: dict = None):
+    def __init__(self, server: Server, remoteConsole: RemoteConsole = None, hasHenkPatch: dict = None):
         self.server = server
 
         if remoteConsole:
@@ -54,11 +49,6 @@ class ServerRemoteConsoleInterface:
         else:
             self.remoteConsole = self.server.remoteConsole
 
-        if consoleLock:
-            self.consoleLock = consoleLock
-        else:
-            self.consoleLock = Lock()
-
         if hasHenkPatch:
             self.hasHenkPatch = hasHenkPatch
         else:
@@ -68,11 +58,11 @@ class ServerRemoteConsoleInterface:
                 'changeTeam': False
             }
 
-    def executeConsoleCommand(self, command: str, max_retries: int = 3):
-        """ Function to execute a command on the Remote Console.
+    def executeConsoleCommand(self, command: str):
+        """ Function to execute a command on the Remote Console and wait for its response. Commands of all callers are
+        queued by the remote console and executed in order.
 
             :param command:     Command readable by Refractor Engine to be executed.
-            :param max_retries: Maximum number of retries
 
             :return:            Response of Remote Console if there was any, otherwise None. False if execution failed.
 
@@ -84,26 +74,29 @@ class ServerRemoteConsoleInterface:
             log('Tried to execute commands on a server without console availability.', 3)
             return None
         else:
-            try:
-                self.consoleLock.acquire(timeout=randint(1, 10))
-                consoleResponse = self.remoteConsole.sendToConsole(command)
-                log("Executed Task.", 1)
-                return consoleResponse
-
-            except TimeoutError:
-                if max_retries == 0:
-                    log('Retried to execute the same command: ' + command + ". The maximum amount of times. But " +
-                        "console is still locked: " + str(self.consoleLock.locked()) +
-                        " Aborting any further attempts.", 3)
-                    return False
-                else:
-                    return self.executeConsoleCommand(command, max_retries-1)
-            finally:
-                self.consoleLock.release()
+            consoleResponse = self.remoteConsole.sendToConsole(command)
+            log("Executed Task.", 1)
+            return consoleResponse
+
+    def queueConsoleCommand(self, command: str, callback: callable = None):
+        """ Function to queue a command for the Remote Console without waiting for its response.
+
+            :param command:     Command readable by Refractor Engine to be executed.
+            :param callback:    Function that's called with the response once it arrived.
+
+            :return:            Future of the response of Remote Console. None if the console isn't available.
+
+                note::  Author(s): Mitch """
+
+        if not self.server.consoleIsAvailable:
+            log('Tried to queue commands on a server without console availability.', 3)
+            return None
+        else:
+            return self.remoteConsole.queueCommand(command, callback)
 
     def writeToServer(self, inMessage: str):
         """ Writes a BFA-Client server announcement to the server. Wraps lines with the word breaking the 64 char limit
-        to avoid tearing words apart.
+        to avoid tearing words apart. The lines are only queued so the caller doesn't wait for the console.
 
             :param inMessage:   Message to be announced to the server.
 
@@ -116,10 +109,10 @@ class ServerRemoteConsoleInterface:
         currentMessagePart, inMessage = (inMessage[:inMessage.rfind(' ', 0, 63 - len('[BFA-Client]: '))],
                                          inMessage[inMessage.rfind(' ', 0, 63 - len('[BFA-Client]: ')):])
         while inMessage != ' ':
-            self.executeConsoleCommand('game.sayAll \"[BFA-Client]: ' + currentMessagePart + "\"")
+            self.queueConsoleCommand('game.sayAll \"[BFA-Client]: ' + currentMessagePart + "\"")
             currentMessagePart, inMessage = (inMessage[:inMessage.rfind(' ', 0, 63 - len('[BFA-Client]: '))],
                                              inMessage[inMessage.rfind(' ', 0, 63 - len('[BFA-Client]: ')):])
-        self.executeConsoleCommand('game.sayAll \"[BFA-Client]: ' + currentMessagePart + "\"")
+        self.queueConsoleCommand('game.sayAll \"[BFA-Client]: ' + currentMessagePart + "\"")
 
         return True
 
@@ -131,9 +124,33 @@ class ServerRemoteConsoleInterface:
 
                 note::  Author(s): Mitch """
 
-        rawPlayerList = self.executeConsoleCommand('game.listPlayers')
+        return self.parsePlayerList(self.executeConsoleCommand('game.listPlayers'))
+
+    def requestPlayerList(self, callback: callable):
+        """ Function that queues the listPlayers method without waiting for its output. Once the output arrived it's
+        parsed and passed to the callback.
+
+            :param callback:    Function that's called with the parsed player-list.
+
+            :return:            Future of the raw output. None if the console isn't available.
+
+                note::  Author(s): Mitch """
+
+        return self.queueConsoleCommand('game.listPlayers',
+                                        lambda rawPlayerList: callback(self.parsePlayerList(rawPlayerList)))
+
+    @staticmethod
+    def parsePlayerList(rawPlayerList: str):
+        """ Function that parses the output of the listPlayers method to a python list containing a set of player
+        information of the list as a tuple.
+
+            :param rawPlayerList:   The output of the listPlayers method.
+
+            :return:                A list of tuples where each tuple represents one player dataset.
+
+                note::  Author(s): Mitch """
 
-        if rawPlayerList is None:
+        if rawPlayerList in (None, False):
             log("Obtaining player-list from server failed.", 3)
             return None
 
@@ -7,6 +7,12 @@
 #############################################################################
 """ This module handles interactions with the refractor remote console.
 
+The actual communication is done by an asyncio client per server running on a shared console event loop thread. Every
+client works through a queue of commands, writes up to a few of them at once and correlates the replies with the
+requests in the order they were sent. Broken connections are re-established with jittered exponential backoff. The
+remote console class is a synchronous facade for that client so callers can either wait for a reply or just queue a
+command and carry on.
+
     Dependencies:
 
         bfassist <- (standalone.server.)remoteconsole
@@ -16,9 +22,12 @@
 
         note::  Author(s): Mitch last-check: 08.07.2021 """
 
-from os import name
-from time import sleep
+from asyncio import AbstractEventLoop, Queue, Task, TimeoutError as AsyncTimeoutError, get_running_loop, \
+    new_event_loop, run_coroutine_threadsafe, sleep, wait_for
+from concurrent.futures import Future, ThreadPoolExecutor
+from random import uniform
 from socket import socket, AF_INET, SOCK_STREAM
+from threading import Lock, Thread
 
 import struct
 
@@ -35,267 +44,454 @@ def __postload__(forClient: bool = True):
     pass
 
 
-class RemoteConsole:
-    """ Python implementation of a bf 1942 remote console interface.
+class AsyncRemoteConsole:
+    """ Asyncio implementation of a bf 1942 remote console client. Has to be used from the console event loop.
 
-        :param user:            Username for the RemoteConsole login.
-        :param pw:              Password for the RemoteConsole login.
-        :param ip:              (Non-localhost) Ip the RemoteConsole listens on.
-        :param port:            Port the RemoteConsole listens on.
+        :param user:                Username for the RemoteConsole login.
+        :param pw:                  Password for the RemoteConsole login.
+        :param ip:                  (Non-localhost) Ip the RemoteConsole listens on.
+        :param port:                Port the RemoteConsole listens on.
+
+        :param rcSocket:            Non-blocking TCP-Socket for communicating with the RemoteConsole.
+        :param authenticated:       Status flag for authentication with the server.
+        :param receiveBuffer:       Preallocated buffer the replies of the console are received into.
+        :param maxFrameSize:        Maximum length of a single reply, anything longer is treated as a broken stream.
+        :param commandQueue:        Queue of the commands waiting to be sent with the futures of their replies.
+        :param worker:              The task working through the command queue.
 
-        :param rcSocket:         TCP-Socket for communicating with the RemoteConsole.
-        :param authenticated:   Status flag for authentication with the server.
+        :param pipelineDepth:       Maximum number of commands written before their replies are read.
+        :param timeout:             Seconds to wait for the console when connecting, sending or receiving.
+        :param maxRetries:          Number of times a connection is re-established before giving up on a command.
+        :param backoffBase:         Seconds to wait at most before the first reconnect.
+        :param backoffCap:          Seconds to wait at most before any reconnect.
 
             note::  Author(s): Mitch """
 
-    def __init__(self, user: str, pw: str, ip: str, port: str, authenticated: bool = False,
-                 rcSocket: socket = socket(AF_INET, SOCK_STREAM)):
+    def __init__(self, user: str, pw: str, ip: str, port: str, rcSocket: socket = None, authenticated: bool = False,
+                 receiveBuffer: bytearray = None, maxFrameSize: int = 1 << 20, commandQueue: Queue = None,
+                 worker: Task = None, pipelineDepth: int = 4, timeout: float = 5., maxRetries: int = 3,
+                 backoffBase: float = 1., backoffCap: float = 30.):
         self.user = user
         self.pw = pw
         self.ip = ip
         self.port = port
-        self.authenticated = authenticated
         self.rcSocket = rcSocket
+        self.authenticated = authenticated
 
-    def authenticate(self):
-        """ Uses the supplied login information to authenticate with the server.
+        if receiveBuffer:
+            self.receiveBuffer = receiveBuffer
+        else:
+            self.receiveBuffer = bytearray(16384)
 
-            :return: Returns True after successful authentication False otherwise.
+        self.maxFrameSize = maxFrameSize
+        self.commandQueue = commandQueue
+        self.worker = worker
+        self.pipelineDepth = pipelineDepth
+        self.timeout = timeout
+        self.maxRetries = maxRetries
+        self.backoffBase = backoffBase
+        self.backoffCap = backoffCap
+
+    async def send(self, data: bytes):
+        """ Sends data to the socket.
+
+            :param data:    The data to be sent.
+
+                note::  Author(s): Mitch """
+
+        await wait_for(get_running_loop().sock_sendall(self.rcSocket, data), self.timeout)
+
+    async def receiveInto(self, count: int):
+        """ Receives exactly count bytes from the socket into the receive buffer. Partial reads are continued until
+        the frame is complete.
+
+            :param count:   Number of bytes to receive.
+
+            :return:        Memoryview of the received bytes in the receive buffer. Only valid until the next receive.
+
+                note::  Author(s): Mitch """
+
+        if count > self.maxFrameSize:
+            raise ConnectionError("The RemoteConsole announced a frame of " + str(count) + " bytes.")
+        if count > len(self.receiveBuffer):
+            self.receiveBuffer = bytearray(max(count, 2 * len(self.receiveBuffer)))
+
+        view = memoryview(self.receiveBuffer)[:count]
+        received = 0
+        while received < count:
+            n = await wait_for(get_running_loop().sock_recv_into(self.rcSocket, view[received:]), self.timeout)
+            if not n:
+                raise ConnectionResetError("The RemoteConsole closed the connection.")
+            received += n
+        return view
+
+    async def receive(self, count: int):
+        """ Receives exactly count bytes from the socket.
+
+            :param count:   Number of bytes to receive.
+
+            :return:        The bytes received.
+
+                note::  Author(s): Mitch """
+
+        return bytes(await self.receiveInto(count))
+
+    async def receiveNum(self):
+        """ Receives 4 bytes treating it as a numerical value with little-endian-order.
+
+            :return:    The integer value.
 
                 note::  Author(s): Mitch - loosely based on a script by Kees Cook """
-        try:
-            if not self.authenticated:
 
-                data, addr = self.rcSocket.recvfrom(10)
-                # Receiving xor challenge
+        return int.from_bytes(await self.receiveInto(4), 'little')
+
+    async def receiveString(self):
+        """ Receives a String from the server. When calling this function you should already be expecting an incoming
+        string on the socket. The whole string is received before it's decoded at once.
+
+            :return:    String that arrived on the socket.
+
+                note::  Author(s): Mitch, henk - loosely based on a script by Kees Cook """
 
-                xor = struct.unpack("10c", data)
-                # Unpacking challenge
+        return str(await self.receiveInto(await self.receiveNum()), 'ISO-8859-1')
 
-                log('Received xor-Challenge pattern', 0)
+    async def connect(self):
+        """ Opens a new socket to the console.
 
-                self.sendNum(len(self.user)+1)
-                # Sending length of username
+            :return:    True if the connection was established, otherwise False.
 
-                response = struct.pack(str(len(self.user)+1)+"c", *XORencrypt(self.user, xor),
-                                       int(0).to_bytes(1, 'little'))
-                # Encoding and Encrypting username
+                note::  Author(s): Mitch """
 
-                self.rcSocket.send(response)
-                # Sending username cipher
+        self.disconnect()
+        self.rcSocket = socket(AF_INET, SOCK_STREAM)
+        self.rcSocket.setblocking(False)
+        try:
+            await wait_for(get_running_loop().sock_connect(self.rcSocket, (self.ip, int(self.port))), self.timeout)
+            return True
+        except (OSError, TypeError, ValueError, AsyncTimeoutError):
+            log("Connection was refused by the Remote Console.", 3)
+            self.disconnect()
+            return False
+
+    async def authenticate(self):
+        """ Uses the supplied login information to authenticate with the server.
 
-                self.sendNum(len(self.pw)+1)
-                # Sending length of password
+            :return:    Returns True after successful authentication False otherwise.
 
-                response = struct.pack(str(len(self.pw)+1) + "c", *XORencrypt(self.pw, xor),
-                                       int(0).to_bytes(1, 'little'))
-                # Encoding and Encrypting password
+                note::  Author(s): Mitch - loosely based on a script by Kees Cook """
 
-                self.rcSocket.send(response)
-                # Sending password cipher
+        if self.authenticated:
+            log('We were already authenticated!', 1)
+            return True
+        if self.rcSocket is None and not await self.connect():
+            return False
 
-                data, addr = self.rcSocket.recvfrom(1)
-                # Receive 1 byte
+        try:
+            xor = struct.unpack("10c", await self.receive(10))
+            log('Received xor-Challenge pattern', 0)
 
-                if len(data) > 0 and data[0] == 1:
-                    self.authenticated = True
-                    return True
-                else:
-                    log('Authentication with RemoteConsole failed.', 3)
-                    return False
+            await self.send(encodeCipher(self.user, xor) + encodeCipher(self.pw, xor))
 
+            data = await self.receive(1)
+            if data[0] == 1:
+                self.authenticated = True
+                return True
             else:
-                log('We were already authenticated!', 1)
+                log('Authentication with RemoteConsole failed.', 3)
+                return False
+        except (OSError, AsyncTimeoutError):
+            log("Receiver connection reset error while authenticating with the RemoteConsole.", 3)
+            self.disconnect()
+            return False
+
+    async def reconnect(self):
+        """ Re-establishes the connection to the console and authenticates again. Waits a random time of up to an
+        exponentially growing delay before every attempt.
+
+            :return:    True if authenticated again, otherwise False.
+
+                note::  Author(s): Mitch """
+
+        for attempt in range(self.maxRetries):
+            await sleep(uniform(0, min(self.backoffCap, self.backoffBase * 2 ** attempt)))
+            if await self.connect() and await self.authenticate():
                 return True
-        except ConnectionResetError:
-            log("Receiver connection reset error. Waiting and trying again.", 3)
-            sleep(5)
-            self.renewSocket()
-            return self.authenticate()
+        return False
 
-    def sendNum(self, inValue: int):
-        """ Sends a numeric value packed with little-endian-order to the socket.
+    def disconnect(self):
+        """ Closes the socket to the console.
 
-            :param inValue: Value to be sent.
+                note::  Author(s): Mitch """
 
-                note::  Author(s): Mitch - loosely based on a script by Kees Cook """
+        if self.rcSocket is not None:
+            self.rcSocket.close()
+            self.rcSocket = None
+        self.authenticated = False
 
-        self.rcSocket.send(inValue.to_bytes(4, 'little'))
+    async def close(self):
+        """ Waits until all queued commands were sent and closes the socket to the console afterwards.
 
-    def receiveNum(self):
-        """ Receives 4 bytes treating it as a numerical value with little-endian-order.
+                note::  Author(s): Mitch """
 
-            :return:    Returns the integer value of the first byte.
+        if self.commandQueue is not None and self.worker is not None and not self.worker.done():
+            await self.commandQueue.join()
+        self.disconnect()
 
-                note::  Author(s): Mitch - loosely based on a script by Kees Cook """
+    async def request(self, inCommand: str):
+        """ Queues a command and waits for its reply.
+
+            :param inCommand:   Command to be sent to the server. Optimally encoded with cp850 or ISO-8859-1.
 
-        data, addr = self.rcSocket.recvfrom(4)
+            :return:            Reply of the server if any. False if the command failed.
 
-        return int.from_bytes(data, 'little')
+                note::  Author(s): Mitch """
+
+        if self.commandQueue is None:
+            self.commandQueue = Queue()
+        if self.worker is None or self.worker.done():
+            self.worker = get_running_loop().create_task(self.run())
+
+        reply = get_running_loop().create_future()
+        await self.commandQueue.put((inCommand, reply))
+        return await reply
 
-    def sendString(self, inValue: str):
-        """ Sends a String by first transmitting length of the string + 1 then following up
-            with the encoded string + a null-string byte at the end.
+    async def run(self):
+        """ Works through the command queue. Up to pipeline depth commands waiting in the queue are written at once and
+        their replies are read afterwards in the same order.
+
+                note::  Author(s): Mitch """
 
-            :param inValue: String to be sent.
+        while True:
+            batch = [await self.commandQueue.get()]
+            while len(batch) < self.pipelineDepth and not self.commandQueue.empty():
+                batch.append(self.commandQueue.get_nowait())
+
+            try:
+                pending = [(inCommand, reply) for inCommand, reply in batch if not reply.done()]
+                if pending:
+                    await self.execute(pending)
+            finally:
+                for item in batch:
+                    self.commandQueue.task_done()
+
+    async def execute(self, batch: list):
+        """ Sends a batch of commands to the console and resolves the futures of their replies. If the connection breaks
+        it's re-established and the commands that weren't answered yet are sent again.
+
+            :param batch:   List of tuples of commands and the futures of their replies.
 
                 note::  Author(s): Mitch - loosely based on a script by Kees Cook """
 
-        self.sendNum(len(inValue) + 1)
-        # sending length of string
+        for attempt in range(self.maxRetries + 1):
+            if not self.authenticated and not await self.reconnect():
+                break
+
+            try:
+                await self.send(b''.join(int(2).to_bytes(4, 'little') + encodeString("ConsoleMessage 0") +
+                                         encodeString(inCommand) for inCommand, reply in batch))
+
+                while batch:
+                    inCommand, reply = batch[0]
+                    status = await self.receiveNum()
+                    ret = await self.receiveString()
+                    batch.pop(0)
+                    if status != 1:
+                        log("Executing command at console failed! " + ret, 3)
+                        ret = False
+                    if not reply.done():
+                        reply.set_result(ret)
+                return
+
+            except (OSError, AsyncTimeoutError):
+                self.disconnect()
+                log("Pipe to Console was broken! Maybe the server changed map or shut down? Retrying Connection.", 3)
+
+        log("Pipe to Console was irrevocably broken. Giving up console communication.", 4)
+        for inCommand, reply in batch:
+            if not reply.done():
+                reply.set_result(False)
+
+
+class RemoteConsole:
+    """ Python implementation of a bf 1942 remote console interface. Synchronous facade of the asyncio client that
+    runs on the console event loop.
 
-        for c in inValue:
-            if ord(c) > 255:
-                print(c)
+        :param user:            Username for the RemoteConsole login.
+        :param pw:              Password for the RemoteConsole login.
+        :param ip:              (Non-localhost) Ip the RemoteConsole listens on.
+        :param port:            Port the RemoteConsole listens on.
 
-        self.rcSocket.send(struct.pack(str(len(inValue) + 1) + 'c',
-                                       *[(ord(c) % 256).to_bytes(1, 'little') for c in inValue],
-                                       int(0).to_bytes(1, 'little')))
+        :param client:          The asyncio client doing the actual communication.
+        :param loop:            The console event loop the client runs on.
 
-    def receiveString(self):
-        """ Receives a String from the server. When calling this function you should already
-            be expecting an incoming string on the socket.
+            note::  Author(s): Mitch """
 
-            :return: String that arrived on the socket.
+    def __init__(self, user: str, pw: str, ip: str, port: str, authenticated: bool = False,
+                 client: AsyncRemoteConsole = None, loop: AbstractEventLoop = None):
+        self.user = user
+        self.pw = pw
+        self.ip = ip
+        self.port = port
 
-                note::  Author(s): Mitch, henk - loosely based on a script by Kees Cook """
+        if client:
+            self.client = client
+        else:
+            self.client = AsyncRemoteConsole(user, pw, ip, port, authenticated=authenticated)
 
-        strBytes = ""
-        strLen = self.receiveNum()
-        if name == 'nt':
-            while strLen > 0:
-                data = self.rcSocket.recv(strLen)
-                strBytes += data.decode('ISO-8859-1')
-                strLen -= 1400
-            return strBytes
+        if loop:
+            self.loop = loop
         else:
-            data = self.rcSocket.recv(strLen)
-            strBytes += data.decode('ISO-8859-1')
-            return strBytes
+            self.loop = getConsoleLoop()
+
+    @property
+    def authenticated(self):
+        return self.client.authenticated
+
+    def run(self, coroutine):
+        """ Runs a coroutine of the client on the console event loop and waits for its result.
+
+            :param coroutine:   The coroutine to run.
 
-    def sendToConsole(self, inCommand, count: int = 0):
-        """ Sends a command to the RemoteConsole. Can only be used post-authentication.
+            :return:            The result of the coroutine.
+
+                note::  Author(s): Mitch """
+
+        return run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def authenticate(self):
+        """ Uses the supplied login information to authenticate with the server.
+
+            :return: Returns True after successful authentication False otherwise.
+
+                note::  Author(s): Mitch """
+
+        return self.run(self.client.authenticate())
+
+    def queueCommand(self, inCommand: str, callback: callable = None):
+        """ Queues a command for the RemoteConsole without waiting for its reply.
 
             :param inCommand:   Command to be sent to the server. Optimally encoded with cp850 or ISO-8859-1.
-            :param count:       Number of retries for sending the inCommand.
+            :param callback:    Function that's called with the reply once it arrived. Callbacks are run one after
+                                another on a separate thread so they may use the console themselves.
 
-            :return:            Reply of the server if any. False if not authenticated.
+            :return:            Future of the reply of the server. False if the command failed.
 
-                note::  Author(s): Mitch - loosely based on a script by Kees Cook """
+                note::  Author(s): Mitch """
+
+        reply = run_coroutine_threadsafe(self.client.request(inCommand), self.loop)
+        if callback:
+            reply.add_done_callback(lambda done: consoleCallbacks.submit(runCallback, callback, done))
+        return reply
+
+    def sendToConsole(self, inCommand: str):
+        """ Sends a command to the RemoteConsole and waits for the reply. Commands of all callers are queued and sent
+        in order.
+
+            :param inCommand:   Command to be sent to the server. Optimally encoded with cp850 or ISO-8859-1.
+
+            :return:            Reply of the server if any. False if not authenticated or the command failed.
+
+                note::  Author(s): Mitch """
 
         if not self.authenticated:
             from bfassist.standalone import KERN
 
             log("Trying to send command to console without prior authentication.", 2)
-            if KERN.GLOBAL_MONITORING and count < 3:
-                self.renewSocket()
-                self.authenticate()
-                count += 1
-                return self.sendToConsole(inCommand, count)
-            else:
+            if not KERN.GLOBAL_MONITORING:
                 return False
-        else:
-
-            try:
-                self.sendNum(2)
-                self.sendString("ConsoleMessage 0")
-                self.sendString(inCommand)
-
-                if self.receiveNum() == 1:
-                    return self.receiveString()
-
-                else:
-                    ret = self.receiveString()
-                    log("Executing command at console failed! " + ret, 3)
-                    return False
-
-            except (BrokenPipeError, ConnectionRefusedError):
-                self.authenticated = False
-                self.rcSocket.close()
-                if count < 3:
-                    log("Pipe to Console was broken! Maybe the server changed map or shut down? Retrying Connection.",
-                        3)
-                    sleep(5)
-
-                    try:
-                        self.renewSocket()
-                        self.authenticate()
-                        return self.sendToConsole(inCommand, count + 1)
-
-                    except ConnectionRefusedError:
-                        self.authenticated = False
-                        self.rcSocket.close()
-                        if count < 3:
-                            log("Pipe to Console was broken! "
-                                "Maybe the server changed map or shut down? Retrying Connection.", 3)
-                            sleep(5)
-
-                            try:
-                                self.renewSocket()
-                                self.authenticate()
-                                return self.sendToConsole(inCommand, count + 1)
-
-                            except ConnectionRefusedError:
-                                self.authenticated = False
-                                self.rcSocket.close()
-                                log("Pipe to Console was irrevocably broken. Giving up console communication.", 4)
-                                return False
-
-                        else:
-                            log("Pipe to Console was irrevocably broken. Giving up console communication.", 4)
-                            return False
-
-                else:
-                    log("Pipe to Console was irrevocably broken. Giving up console communication.", 4)
-                    return False
-
-    def getConsoleInfoBuffer(self):
-        """ This works, however you have to constantly call it for it to provide any useful information.
-
-            :return: Server-buffer as a string.
-
-                note::  Author(s): Mitch """
 
-        self.sendNum(2)
-        self.sendString("ConsoleRun 0")
-        self.sendNum(2)
-        self.rcSocket.send(b'\x0d\x00')
-        rec = self.rcSocket.recv(1400)
-        return rec
+        return self.queueCommand(inCommand).result()
 
-    def connect(self, retries: int = 3):
+    def connect(self):
         """ Function to connect the socket to the console cleanly.
 
+            :return:    True if the connection was established, otherwise False.
+
                 note::  Author(s): Mitch """
 
-        try:
-            self.rcSocket.connect((self.ip, int(self.port)))
-        except (ConnectionRefusedError, OSError, TypeError):
-            if retries > 0:
-                log("Connection was refused by the Remote Console, trying again.", 3)
-                self.renewSocket(retries-1)
-            else:
-                log("Connection was refused three consecutive times! Giving up...", 5)
+        return self.run(self.client.connect())
 
     def disconnect(self):
-        """ Function to disconnect from the console cleanly.
+        """ Function to disconnect from the console cleanly after all queued commands were sent.
 
                 note::  Author(s): Mitch """
 
-        self.rcSocket.close()
-        sleep(5)
-        self.authenticated = False
+        self.run(self.client.close())
 
-    def renewSocket(self, retries: int = 3):
+    def renewSocket(self):
         """ Function to renew the console socket.
 
+            :return:    True if the connection was established, otherwise False.
+
                 note::  Author(s): Mitch """
 
         log("Renewing console socket.")
-        self.disconnect()
-        self.rcSocket = socket(AF_INET, SOCK_STREAM)
-        self.rcSocket.settimeout(2)
-        self.connect(retries)
+        return self.connect()
+
+
+consoleLoop = None
+consoleCallbacks = None
+consoleLoopLock = Lock()
+
+
+def getConsoleLoop():
+    """ Gets the event loop all remote console clients run on and starts it on its own thread if necessary.
+
+        :return:    The console event loop.
+
+            note::  Author(s): Mitch """
+
+    global consoleLoop, consoleCallbacks
+
+    try:
+        consoleLoopLock.acquire(True)
+        if consoleLoop is None:
+            consoleLoop = new_event_loop()
+            consoleCallbacks = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bfa-console-callbacks")
+            Thread(target=consoleLoop.run_forever, name="bfa-console-loop", daemon=True).start()
+        return consoleLoop
+    finally:
+        consoleLoopLock.release()
+
+
+def runCallback(callback: callable, reply: Future):
+    """ Runs the callback of a queued command with the reply of the server.
+
+        :param callback:    The callback to run.
+        :param reply:       The future of the reply.
+
+            note::  Author(s): Mitch """
+
+    try:
+        callback(reply.result())
+    except Exception as error:
+        log("Callback of a console command failed: " + repr(error), 3)
+
+
+def encodeString(inValue: str):
+    """ Encodes a String by prefixing the length of the string + 1 to the encoded string + a null-string byte.
+
+        :param inValue: String to be encoded.
+
+        :return:        The encoded string.
+
+            note::  Author(s): Mitch - loosely based on a script by Kees Cook """
+
+    return (len(inValue) + 1).to_bytes(4, 'little') + bytes(ord(c) % 256 for c in inValue) + b'\x00'
+
+
+def encodeCipher(clear: str, pattern: tuple):
+    """ Encodes a login String by prefixing the length of the string + 1 to the xor-encrypted string + a null-string
+    byte.
+
+        :param clear:   String to be encoded.
+        :param pattern: The xor-challenge pattern of the server.
+
+        :return:        The encoded cipher.
+
+            note::  Author(s): Mitch - loosely based on a script by Kees Cook """
+
+    return (len(clear) + 1).to_bytes(4, 'little') + b''.join(XORencrypt(clear, pattern)) + b'\x00'
 
 
 def XORencrypt(clear, pattern):
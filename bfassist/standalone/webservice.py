@@ -54,10 +54,9 @@ class BFA_API_RequestHandler(RequestHandler):
 
                 note::  Author(s): Mitch """
 
-        content_length = int(self.headers['Content-Length'])
+        body = self.readBody()
         parameters = {}
-        if content_length > 0:
-            body = self.rfile.read(content_length)
+        if body:
             parameters = json.loads(body)
 
         return parameters
@@ -96,7 +95,6 @@ class BFA_API_RequestHandler(RequestHandler):
         while potentialAPIcall:
             currentLevel = potentialAPIcall.pop(0)
             if currentLevel not in func:
-                self.do_HANDLE_INVALID_API_REQUEST()
                 return None
             else:
                 func = func[currentLevel]
@@ -26,7 +26,7 @@ from os.path import exists
 from http.server import ThreadingHTTPServer
 from uuid import getnode
 from random import randint
-from ssl import wrap_socket
+from ssl import SSLContext, PROTOCOL_TLS_SERVER
 
 from bfassist.bfa_logging import log
 from bfassist.certificates import generateCert
@@ -81,11 +81,14 @@ class WebService:
             self.pemchain = 'bfassist/certificates/standalone_bfa.pem'
 
     def run(self):
-        """ Function to start the web service in its own thread.
+        """ Function to start the web service in its own thread. The TLS handshake of a connection is left to the thread
+        serving it, so accepting connections doesn't wait for slow clients.
 
                 note::  Author(s): Mitch """
 
-        self.httpd.socket = wrap_socket(self.httpd.socket, certfile=self.pemchain, server_side=True)
+        context = SSLContext(PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.pemchain)
+        self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True, do_handshake_on_connect=False)
         self.requestHandler.sessionManager.start()
         self.httpd.serve_forever()
         self.running = True
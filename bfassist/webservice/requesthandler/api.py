@@ -16,6 +16,7 @@
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
 import json
+from collections.abc import Iterator
 
 from bfassist.webservice.requesthandler import PUT_RequestHandler
 from bfassist.api import FunctionApiMixIn
@@ -37,7 +38,8 @@ class API_RequestHandler(PUT_RequestHandler):
             note::  Author(s): Mitch """
 
     def do_API_PROCESS(self, api_f: FunctionApiMixIn, parameters: dict):
-        """ Performs API request and sends reply of API.
+        """ Performs API request and sends reply of API. An API function returning an iterator has its items sent in
+        chunks as json lines as they are produced.
 
             :param api_f:       The function to call.
             :param parameters:  The arguments to pass to the function as dictionary.
@@ -50,11 +52,13 @@ class API_RequestHandler(PUT_RequestHandler):
             ret = api_f.func(**parameters)
 
         self.send_response(200)
-        self.end_headers()
         if isinstance(ret, str):
             self.do_SEND_SIMPLE_RESPONSE(ret)
+        elif isinstance(ret, Iterator):
+            self.do_SEND_CHUNKED_RESPONSE((json.dumps(item).encode('utf-8') + b'\n' for item in ret),
+                                          'application/x-ndjson')
         else:
-            self.do_SEND_SIMPLE_RESPONSE(json.dumps(ret))
+            self.do_SEND_BODY(json.dumps(ret).encode('utf-8'), 'application/json')
 
     def do_API_GET(self, api_f: FunctionApiMixIn, parameters: dict):
         """ Performs API request and sends reply of API.
@@ -93,5 +97,4 @@ class API_RequestHandler(PUT_RequestHandler):
                 note::  Author(s): Mitch """
 
         self.send_response(400)
-        self.end_headers()
         self.do_SEND_SIMPLE_RESPONSE('Bad Request: The API could not handle your request.')
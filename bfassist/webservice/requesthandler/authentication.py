@@ -152,7 +152,7 @@ class AuthenticationRequestHandler(CoreRequestHandler):
                         now = datetime.now(timezone.utc)
                         sessionCookie = self.createSessionCookie(now)
                         self.sessionManager.addClient(self.client_address, user, sessionCookie, now)
-                        self.do_HANDLE_SUCCESSFUL_REQUEST('Success: You successfully logged in!')
+                        self.do_SEND_SIMPLE_RESPONSE('200 - Success: You successfully logged in!')
 
     def do_HANDLE_INITIAL_PUT_REQUEST(self):
         """ Handles an initial put request. This should be a login or registration attempt if used correctly.
@@ -161,22 +161,19 @@ class AuthenticationRequestHandler(CoreRequestHandler):
 
         if self.path != '/register' and self.path != '/login':
             self.send_response(400)
-            self.end_headers()
             self.do_SEND_SIMPLE_RESPONSE('Bad Request: Please register or login first!')
         else:
             if self.path == '/register':
-                content_length = int(self.headers['Content-Length'])
-                if content_length == 0:
+                body = self.readBody()
+                if not body:
                     self.do_HANDLE_INVALID_REQUEST(400, 'Missing registration information.')
                 else:
-                    body = self.rfile.read(content_length)
                     bodyDict = json.loads(body)
                     self.do_PROCESS_REGISTRATION_REQUEST(bodyDict)
             else:   # Implies that: self.path == '/login'
-                content_length = int(self.headers['Content-Length'])
-                if content_length == 0:
+                body = self.readBody()
+                if not body:
                     self.do_HANDLE_INVALID_REQUEST(400, 'Missing login information.')
                 else:
-                    body = self.rfile.read(content_length)
                     bodyDict = json.loads(body)
                     self.do_PROCESS_LOGIN_REQUEST(bodyDict)
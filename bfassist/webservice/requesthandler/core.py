@@ -5,19 +5,25 @@
 #
 #
 #############################################################################
-""" This provides the core request handling functionality for the webservice.
+""" This provides the core request handling functionality for the webservice. Connections are persistent (HTTP/1.1), so
+the web client sends all requests of a page over one TLS connection instead of paying a handshake per request. For that
+every response states its length, or is sent in chunks if its length isn't known beforehand, and the body of every
+request is read completely even if it isn't used. A connection that stays idle for longer than the timeout is closed.
 
     Dependencies:
 
         bfassist <- (webservice.)requesthandler <- core
             |
+            |-> bfa_logging
             \-> webgen
              -> webservice -> requesthandler -> sessionmanagement
 
         note::  Author(s): Mitch last-check: 07.07.2021 """
 
+from collections.abc import Iterable
 from http.server import BaseHTTPRequestHandler
 
+from bfassist.bfa_logging import log
 from bfassist.webgen import View
 from bfassist.webservice.requesthandler.sessionmanagement import User
 
@@ -35,9 +41,78 @@ def __postload__(forClient: bool = True):
 class CoreRequestHandler(BaseHTTPRequestHandler):
     """ The core of the request handler. Delegates between the different parts of the request handler.
 
+        :param protocol_version:    The HTTP version of the responses, HTTP/1.1 keeps connections open between requests.
+        :param timeout:             Seconds a connection may stay idle before it's closed.
+        :param maxBodyLength:       The maximum length of a request body in bytes.
+        :param body:                The body of the current request once it was read.
+
             note::  Author(s): Mitch """
 
     favIcon = None
+    protocol_version = 'HTTP/1.1'
+    timeout = 60
+    maxBodyLength = 2 ** 20
+    body = None
+
+    def handle(self):
+        """ Handles the requests coming in on a connection until the client closes it or it stays idle for longer than
+        the timeout. A TLS connection is only established here, so slow clients don't hold up accepting connections.
+
+                note::  Author(s): Mitch """
+
+        try:
+            if hasattr(self.connection, 'do_handshake'):
+                self.connection.do_handshake()
+            super().handle()
+        except OSError as error:
+            self.close_connection = True
+            log("Closing the connection to " + str(self.client_address) + ": " + repr(error), 0)
+
+    def parse_request(self):
+        """ Parses the request line and headers of the next request on the connection and forgets the body of the
+        previous one.
+
+            :return:    True if the request could be parsed, False if an error was sent instead.
+
+                note::  Author(s): Mitch """
+
+        self.body = None
+        return super().parse_request()
+
+    def readBody(self):
+        """ Function to read the body of the current request. The body is read only once, further calls return it
+        again. Bodies without a valid length can't be told apart from the next request, so the connection is closed
+        after the response to them.
+
+            :return:    The body as bytes, empty if the request doesn't have one.
+
+                note::  Author(s): Mitch """
+
+        if self.body is None:
+            self.body = b''
+            if 'Transfer-Encoding' in self.headers:
+                self.close_connection = True
+            else:
+                try:
+                    contentLength = int(self.headers.get('Content-Length', 0))
+                except ValueError:
+                    contentLength = -1
+                if contentLength < 0 or contentLength > self.maxBodyLength:
+                    self.close_connection = True
+                elif contentLength:
+                    self.body = self.rfile.read(contentLength)
+        return self.body
+
+    def end_headers(self):
+        """ Finishes the headers of the response. The request body is read before, so the next request on the
+        connection starts right after it, even if the handler didn't need the body.
+
+                note::  Author(s): Mitch """
+
+        self.readBody()
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        super().end_headers()
 
     def do_PREPARE_STANDARD_WEBSITE_HEADERS(self):
         """ Function for the standard webserver response headers.
@@ -45,9 +120,9 @@ class CoreRequestHandler(BaseHTTPRequestHandler):
                 note::  Author(s): Mitch """
 
         self.send_response(200)
-        self.headers.add_header('accept-ranges', 'bytes')
-        self.headers.add_header('X-Content-Type-Options', 'nosniff')
-        self.headers.add_header('X-Frame-Options', 'sameorigin')
+        self.send_header('Accept-Ranges', 'none')
+        self.send_header('X-Content-Type-Options', 'nosniff')
+        self.send_header('X-Frame-Options', 'sameorigin')
 
     # noinspection PyUnusedLocal
     def do_REPLY_WITH_VIEW(self, view: View = None, issuingUser: User = None):
@@ -58,33 +133,62 @@ class CoreRequestHandler(BaseHTTPRequestHandler):
 
                 note::  Author(s): Mitch """
 
-        fType = 'html'
         if self.path.endswith('.css'):
-            response = view.serveCSS().encode('utf-8')
-            fType = 'css'
+            self.do_SEND_BODY(view.serveCSS().encode('utf-8'), 'text/css; charset=utf-8')
         elif self.path.endswith('.js'):
-            response = view.serveJS().encode('utf-8')
-            fType = 'javascript'
+            self.do_SEND_BODY(view.serveJS().encode('utf-8'), 'text/javascript; charset=utf-8')
         elif self.path.endswith('.ico'):
-            if self.favIcon:
-                self.headers.add_header('innerHTML-type', 'image/vnd.microsoft.icon')
-                self.end_headers()
-                self.wfile.write(self.favIcon)
-            return
+            self.do_SEND_BODY(self.favIcon or b'', 'image/vnd.microsoft.icon')
         else:
-            response = view.serveHTML().encode('utf-8')
-        self.headers.add_header('innerHTML-type', 'text/' + fType)
-        self.headers.add_header('innerHTML-length', str(len(response)))
+            self.do_SEND_BODY(view.serveHTML().encode('utf-8'), 'text/html; charset=utf-8')
+
+    def do_SEND_BODY(self, body: bytes, contentType: str):
+        """ Function to finish the headers of a response with the type and length of its body and send the body.
+
+            :param body:        The body of the response.
+            :param contentType: The media type of the body.
+
+                note::  Author(s): Mitch """
+
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(response)
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_SEND_CHUNKED_RESPONSE(self, chunks: Iterable, contentType: str):
+        """ Function to finish the headers of a response whose length isn't known beforehand and send its body in
+        chunks as they are produced. Clients that only speak HTTP/1.0 get the body unframed and the connection is closed
+        afterwards.
+
+            :param chunks:      Iterable of the parts of the body as bytes.
+            :param contentType: The media type of the body.
+
+                note::  Author(s): Mitch """
+
+        chunked = self.request_version != 'HTTP/1.0'
+        self.send_header('Content-Type', contentType)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        for chunk in chunks:
+            if chunk:
+                self.wfile.write(b'%X\r\n' % len(chunk) + chunk + b'\r\n' if chunked else chunk)
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
 
     def do_SEND_SIMPLE_RESPONSE(self, response: str):
-        """ Simple function to send a simple response text to the client.
+        """ Simple function to send a simple response text to the client. Finishes the headers of the response.
 
             :param response:    Containing the simple response text.
 
                 note::  Author(s): Mitch """
-        self.wfile.write(response.encode('utf-8'))
+
+        self.do_SEND_BODY(response.encode('utf-8'), 'text/plain; charset=utf-8')
 
     def do_HANDLE_INVALID_REQUEST(self, statusCode: int = 400, statusResponse: str = "Invalid request."):
         """ Function for handling an invalid registration request.
@@ -92,7 +196,6 @@ class CoreRequestHandler(BaseHTTPRequestHandler):
                 note::  Author(s): Mitch """
 
         self.send_response(statusCode)
-        self.end_headers()
         self.do_SEND_SIMPLE_RESPONSE(str(statusCode) + " - " + statusResponse)
 
     def do_HANDLE_SUCCESSFUL_REQUEST(self, statusResponse: str = "Success."):
@@ -101,7 +204,6 @@ class CoreRequestHandler(BaseHTTPRequestHandler):
                 note::  Author(s): Mitch """
 
         self.send_response(200)
-        self.end_headers()
         self.do_SEND_SIMPLE_RESPONSE('200 - ' + statusResponse)
 
     def do_HANDLE_EXPIRED_SESSION(self, userWithExpiredSession: User):
@@ -111,5 +213,5 @@ class CoreRequestHandler(BaseHTTPRequestHandler):
 
                 note::  Author(s): Mitch """
 
-        self.do_HANDLE_LOGOUT(userWithExpiredSession)
+        self.sessionManager.removeClient(userWithExpiredSession)
         self.do_HANDLE_INVALID_REQUEST(440, 'Login Time-out: Your session timed out! Please login again.')
@@ -47,8 +47,8 @@ class PUT_RequestHandler(POST_RequestHandler):
                 self.do_PUT_ON_VALID_SESSION(user)
             else:
                 if self.path == '/register' or self.path == '/login':
-                    self.do_HANDLE_LOGOUT(user)
-                    self.do_HANDLE_INITIAL_PUT_REQUEST(user)
+                    self.sessionManager.removeClient(user)
+                    self.do_HANDLE_INITIAL_PUT_REQUEST()
                 else:
                     self.do_HANDLE_EXPIRED_SESSION(user)
 
@@ -70,6 +70,6 @@ class PUT_RequestHandler(POST_RequestHandler):
                 note::  Author(s): Mitch """
 
         if self.path == '/logout':
-            self.do_HANDLE_LOGOUT()
+            self.do_HANDLE_LOGOUT(issuingUser)
         else:
             self.do_PROCESS_POTENTIAL_API_PUT_REQUEST(issuingUser)